@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Movie, UserFavoriteMovie, MovieRating
+from .models import InteractionEvent, Movie, UserFavoriteMovie, MovieRating, MovieRatingSummary
 
 
 @admin.register(Movie)
@@ -41,3 +41,20 @@ class MovieRatingAdmin(admin.ModelAdmin):
     list_filter = ['rating', 'created_at', 'user']
     search_fields = ['user__username', 'movie__title', 'review']
     readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(MovieRatingSummary)
+class MovieRatingSummaryAdmin(admin.ModelAdmin):
+    """Admin interface for MovieRatingSummary model."""
+    list_display = ['movie', 'rating_count', 'rating_sum', 'updated_at']
+    search_fields = ['movie__title']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(InteractionEvent)
+class InteractionEventAdmin(admin.ModelAdmin):
+    """Admin interface for InteractionEvent model."""
+    list_display = ['user', 'movie', 'kind', 'rating', 'processed', 'created_at']
+    list_filter = ['kind', 'processed', 'created_at']
+    search_fields = ['user__username', 'movie__title']
+    readonly_fields = ['created_at']
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MoviesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.movies'
+    
+    def ready(self):
+        from . import autocomplete  # noqa: F401  (connects signal receivers)
+        from .recommender import content, events  # noqa: F401  (connects signal receivers)
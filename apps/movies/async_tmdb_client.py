@@ -0,0 +1,202 @@
+"""
+Asynchronous TMDb API client for concurrent fan-out fetches.
+"""
+import asyncio
+import time
+import logging
+import httpx
+from django.conf import settings
+from django.core.cache import cache
+
+from .rate_limit import BATCH, get_rate_limiter
+from .cache_codec import decode_entry, encode_entry
+from .tmdb_client import RETRY_STATUS_CODES, make_cache_entry, retry_delay, within_retry_budget
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTMDbClient:
+    """
+    Async counterpart of TMDbClient.
+    
+    Uses one pooled httpx.AsyncClient and a semaphore that bounds how many
+    TMDb requests are in flight at once. Cache keys match TMDbClient so both
+    clients share cached payloads. Use as an async context manager:
+        
+        async with AsyncTMDbClient() as client:
+            pages = await client.get_popular_movies_pages(10)
+    """
+    
+    def __init__(self, concurrency=None, transport=None, priority=BATCH):
+        self.api_key = settings.TMDB_API_KEY
+        self.base_url = settings.TMDB_BASE_URL
+        self.timeout = settings.TMDB_TIMEOUT
+        self.concurrency = concurrency or settings.TMDB_ASYNC_CONCURRENCY
+        self.priority = priority
+        self._transport = transport
+        self._client = None
+        self._semaphore = None
+    
+    async def __aenter__(self):
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            headers={'Accept': 'application/json'},
+            transport=self._transport,
+            limits=httpx.Limits(
+                max_connections=self.concurrency,
+                max_keepalive_connections=self.concurrency,
+            ),
+        )
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._client.aclose()
+        self._client = None
+    
+    async def _make_request(self, endpoint, params=None):
+        """
+        Make a request to TMDb API.
+        
+        Args:
+            endpoint: API endpoint path
+            params: Query parameters
+        
+        Returns:
+            Response data or None if request fails
+        """
+        if not self.api_key:
+            logger.error("TMDB_API_KEY not configured")
+            return None
+        
+        params = dict(params or {})
+        params['api_key'] = self.api_key
+        url = f"{self.base_url}{endpoint}"
+        
+        rate_limiter = get_rate_limiter()
+        started = time.monotonic()
+        
+        for attempt in range(settings.TMDB_MAX_RETRIES + 1):
+            if rate_limiter and not await rate_limiter.acquire_async(self.priority):
+                logger.warning(f"TMDb request to {endpoint} shed by rate limiter")
+                return None
+            
+            response = None
+            try:
+                async with self._semaphore:
+                    response = await self._client.get(url, params=params)
+                if response.status_code not in RETRY_STATUS_CODES:
+                    response.raise_for_status()
+                    return response.json()
+            except httpx.HTTPStatusError as e:
+                logger.error(f"TMDb API request failed: {str(e)}")
+                return None
+            except httpx.HTTPError as e:
+                logger.warning(f"TMDb API request error: {str(e)}")
+            
+            if attempt < settings.TMDB_MAX_RETRIES:
+                delay = retry_delay(attempt, response)
+                if not within_retry_budget(self.priority, started, delay):
+                    break
+                await asyncio.sleep(delay)
+        
+        logger.error(f"TMDb API request failed after retries: {endpoint}")
+        return None
+    
+    async def _cached_request(self, cache_key, endpoint, params, endpoint_name):
+        """
+        Return the fresh cached payload for cache_key or fetch and cache it.
+        
+        Stale entries are refetched rather than served, since batch callers
+        want current data.
+        """
+        entry = decode_entry(await cache.aget(cache_key))
+        if entry and entry['soft_expires'] > time.time():
+            return entry['data']
+        
+        data = await self._make_request(endpoint, params)
+        if data:
+            entry, timeout = make_cache_entry(data, endpoint_name)
+            await cache.aset(cache_key, encode_entry(entry), timeout)
+            return entry['data']
+        return None
+    
+    async def get_trending_movies(self, time_window='week', page=1):
+        """Get trending movies for 'day' or 'week'."""
+        return await self._cached_request(
+            f"trending_movies_{time_window}_page_{page}",
+            f"/trending/movie/{time_window}",
+            {'page': page},
+            'trending',
+        )
+    
+    async def get_popular_movies(self, page=1):
+        """Get popular movies."""
+        return await self._cached_request(
+            f"popular_movies_page_{page}", "/movie/popular", {'page': page}, 'popular'
+        )
+    
+    async def get_top_rated_movies(self, page=1):
+        """Get top-rated movies."""
+        return await self._cached_request(
+            f"top_rated_movies_page_{page}", "/movie/top_rated", {'page': page}, 'top_rated'
+        )
+    
+    async def get_recommended_movies(self, movie_id, page=1):
+        """Get recommended movies based on a specific movie."""
+        return await self._cached_request(
+            f"recommended_movies_{movie_id}_page_{page}",
+            f"/movie/{movie_id}/recommendations",
+            {'page': page},
+            'recommended',
+        )
+    
+    async def get_movie_details(self, movie_id):
+        """Get detailed information about a specific movie."""
+        return await self._cached_request(
+            f"movie_details_{movie_id}", f"/movie/{movie_id}", None, 'details'
+        )
+    
+    async def search_movies(self, query, page=1):
+        """Search for movies by title."""
+        return await self._cached_request(
+            f"search_movies_{query}_page_{page}",
+            "/search/movie",
+            {'query': query, 'page': page},
+            'search',
+        )
+    
+    async def get_trending_movies_pages(self, time_window='week', pages=1):
+        """
+        Fetch trending pages 1..pages concurrently.
+        
+        Returns:
+            List of page payloads (None for failed pages) in page order
+        """
+        return await asyncio.gather(*(
+            self.get_trending_movies(time_window, page)
+            for page in range(1, pages + 1)
+        ))
+    
+    async def get_popular_movies_pages(self, pages=1):
+        """Fetch popular pages 1..pages concurrently, in page order."""
+        return await asyncio.gather(*(
+            self.get_popular_movies(page) for page in range(1, pages + 1)
+        ))
+    
+    async def get_top_rated_movies_pages(self, pages=1):
+        """Fetch top-rated pages 1..pages concurrently, in page order."""
+        return await asyncio.gather(*(
+            self.get_top_rated_movies(page) for page in range(1, pages + 1)
+        ))
+    
+    async def get_movie_details_many(self, movie_ids):
+        """
+        Fetch details for several TMDb movie IDs concurrently.
+        
+        Returns:
+            List of detail payloads (None for failures) in the order of movie_ids
+        """
+        return await asyncio.gather(*(
+            self.get_movie_details(movie_id) for movie_id in movie_ids
+        ))
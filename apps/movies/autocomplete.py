@@ -0,0 +1,379 @@
+"""
+In-memory title index for search-box autocomplete.
+
+Every worker holds a sorted array of (normalized title suffix, movie id)
+keys, one per word start, so "wars" finds "Star Wars". A prefix lookup is
+two bisects plus a popularity sort over the matching slice; the top hits for
+very short prefixes, whose slices are large, are precomputed. Lookups never
+touch the database or the network.
+
+The index is built at worker startup (gunicorn post_worker_init) or lazily
+on first use, and ingestion keeps it current: this worker folds ingested
+movies in directly, then bumps a shared generation and stores the ingested
+IDs under it in the cache. Other workers notice the new generation and fold
+the same movies in from a background thread, rebuilding from the database
+only when they fell too far behind.
+"""
+import heapq
+import logging
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.dispatch import receiver
+
+from .models import Movie
+from .signals import movies_ingested
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = 'autocomplete_generation'
+
+# Workers further behind than this rebuild instead of replaying changes
+MAX_PENDING_GENERATIONS = 100
+
+# Sorts after every character a normalized key can contain
+PREFIX_END = '\U0010ffff'
+
+
+def changes_key(generation):
+    return f"autocomplete_changes_{generation}"
+
+
+def normalize(text):
+    """
+    Lowercase text, strip accents and collapse punctuation to single spaces.
+    
+    Args:
+        text: Title or query string
+    
+    Returns:
+        Normalized string
+    """
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    chars = [
+        char if char.isalnum() else ' '
+        for char in decomposed.lower()
+        if not unicodedata.combining(char)
+    ]
+    return ' '.join(''.join(chars).split())
+
+
+def title_keys(title):
+    """Return the normalized title suffixes starting at each word."""
+    words = normalize(title).split(' ')
+    return {' '.join(words[start:]) for start in range(len(words)) if words[start]}
+
+
+class TitleIndex:
+    """
+    Sorted prefix index over movie titles, ranked by popularity.
+    
+    The key list, movie dict and top-hit dict are replaced rather than
+    mutated, so a lookup only holds the lock long enough to read them.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._keys = []
+        self._movies = {}
+        self._top = {}
+        self._stale = set()
+        self._version = 0
+        self._built = False
+        self._generation = None
+        self._generation_checked = 0.0
+        self._updating = False
+        self._refreshing = False
+    
+    def __len__(self):
+        return len(self._movies)
+    
+    @property
+    def built(self):
+        return self._built
+    
+    def build(self):
+        """Load every movie from the database and replace the index."""
+        movies = {}
+        keys = []
+        rows = Movie.objects.values_list(
+            'id', 'tmdb_id', 'title', 'popularity', 'release_date', 'poster_path'
+        ).iterator(chunk_size=5000)
+        for movie_id, tmdb_id, title, popularity, release_date, poster_path in rows:
+            movies[movie_id] = self._entry(movie_id, tmdb_id, title, popularity, release_date, poster_path)
+            keys.extend((key, movie_id) for key in title_keys(title))
+        keys.sort()
+        top = self._compute_top(keys, movies, self._short_prefixes(keys))
+        
+        with self._lock:
+            self._keys, self._movies, self._top = keys, movies, top
+            self._stale = set()
+            self._version += 1
+            self._built = True
+        logger.info(f"Built autocomplete index with {len(movies)} titles")
+    
+    def add(self, movies):
+        """
+        Insert or update movies in this worker's index.
+        
+        Only keys whose title changed are moved. Precomputed top hits are
+        merged with the changed movies; a prefix whose full top list lost a
+        movie (renamed, or less popular than before) is dropped and
+        recomputed in a background thread, and answered by a slice scan
+        until then.
+        
+        Args:
+            movies: Iterable of Movie instances
+        """
+        with self._write_lock:
+            if not self._built:
+                return
+            keys, entries, top = self._keys, dict(self._movies), dict(self._top)
+            removed, added = [], []
+            gained, lost = defaultdict(set), defaultdict(set)
+            for movie in movies:
+                old = entries.get(movie.pk)
+                entry = self._entry(
+                    movie.pk, movie.tmdb_id, movie.title, movie.popularity,
+                    movie.release_date, movie.poster_path,
+                )
+                entries[movie.pk] = entry
+                old_keys = title_keys(old['title']) if old is not None else set()
+                new_keys = title_keys(movie.title)
+                removed.extend((key, movie.pk) for key in old_keys - new_keys)
+                added.extend((key, movie.pk) for key in new_keys - old_keys)
+                
+                new_prefixes = self._prefixes_of_keys(new_keys)
+                old_prefixes = self._prefixes_of_keys(old_keys)
+                if old is not None and entry['popularity'] < old['popularity']:
+                    dropped = old_prefixes
+                else:
+                    dropped = old_prefixes - new_prefixes
+                for prefix in new_prefixes:
+                    gained[prefix].add(movie.pk)
+                for prefix in dropped:
+                    lost[prefix].add(movie.pk)
+            
+            if removed or added:
+                keys = self._merge_keys(keys, removed, added)
+            stale = set()
+            limit = settings.AUTOCOMPLETE_MAX_LIMIT
+            for prefix in gained.keys() | lost.keys():
+                current = top.get(prefix, [])
+                # A short top list holds every match; a full one can only be
+                # merged into if none of its movies may have dropped out
+                if prefix in self._stale or (len(current) >= limit and lost[prefix] & set(current)):
+                    stale.add(prefix)
+                    top.pop(prefix, None)
+                    continue
+                candidates = (set(current) - lost[prefix]) | gained[prefix]
+                top[prefix] = heapq.nlargest(limit, candidates, key=self._rank_key(entries))
+            
+            with self._lock:
+                self._keys, self._movies, self._top = keys, entries, top
+                self._stale |= stale
+                self._version += 1
+                refresh = bool(self._stale) and not self._refreshing
+                if refresh:
+                    self._refreshing = True
+        if refresh:
+            threading.Thread(target=self._refresh_top, daemon=True).start()
+    
+    def search(self, query, limit):
+        """
+        Return the most popular movies with a title word starting with query.
+        
+        Args:
+            query: Prefix typed so far
+            limit: Maximum number of results
+        
+        Returns:
+            List of movie dicts, most popular first
+        """
+        self.ensure_current()
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        
+        with self._lock:
+            keys, movies, top = self._keys, self._movies, self._top
+        hits = top.get(prefix)
+        if hits is not None and limit <= settings.AUTOCOMPLETE_MAX_LIMIT:
+            return [movies[movie_id] for movie_id in hits[:limit]]
+        movie_ids = self._matching_ids(keys, prefix)
+        ranked = heapq.nlargest(limit, movie_ids, key=self._rank_key(movies))
+        return [movies[movie_id] for movie_id in ranked]
+    
+    def ensure_current(self):
+        """
+        Build the index on first use and catch up when another worker ingested.
+        
+        The shared generation is read at most every AUTOCOMPLETE_CHECK_INTERVAL
+        seconds; a changed generation triggers a background catch_up while the
+        current index keeps serving.
+        """
+        if not self._built:
+            self._generation = cache.get(GENERATION_KEY, 0)
+            self._generation_checked = time.monotonic()
+            self.build()
+            return
+        
+        now = time.monotonic()
+        if now - self._generation_checked < settings.AUTOCOMPLETE_CHECK_INTERVAL:
+            return
+        self._generation_checked = now
+        
+        generation = cache.get(GENERATION_KEY, 0)
+        if generation == self._generation or self._updating:
+            return
+        self._updating = True
+        
+        def update():
+            try:
+                self.catch_up(generation)
+            finally:
+                self._updating = False
+        
+        threading.Thread(target=update, daemon=True).start()
+    
+    def catch_up(self, generation):
+        """
+        Apply the movies other workers ingested up to a shared generation.
+        
+        Each generation's movie IDs are read back from the cache and reloaded
+        with one query. The index is rebuilt instead when a generation's IDs
+        have expired or more than MAX_PENDING_GENERATIONS were missed.
+        
+        Args:
+            generation: Shared generation to bring this worker up to
+        """
+        try:
+            movie_ids = self._published_changes(self._generation, generation)
+            if movie_ids is None:
+                self.build()
+            else:
+                self.add(Movie.objects.filter(pk__in=movie_ids))
+            self._generation = generation
+        except Exception as e:
+            logger.error(f"Autocomplete index update failed: {str(e)}")
+    
+    def mark_changed(self, movie_ids):
+        """
+        Bump the shared generation and publish the movies it covers.
+        
+        Args:
+            movie_ids: Primary keys of the movies this worker just added
+        """
+        if cache.add(GENERATION_KEY, 1, None):
+            generation = 1
+        else:
+            generation = cache.incr(GENERATION_KEY)
+        cache.set(changes_key(generation), list(movie_ids), settings.AUTOCOMPLETE_CHANGES_TTL)
+        # Another worker's bump in between still has to be caught up on
+        if self._generation is not None and generation == self._generation + 1:
+            self._generation = generation
+    
+    def clear(self):
+        """Drop the index so the next lookup rebuilds it."""
+        with self._lock:
+            self._keys, self._movies, self._top = [], {}, {}
+            self._stale = set()
+            self._version += 1
+            self._built = False
+    
+    def _refresh_top(self):
+        """Recompute stale top hits until a pass finishes without a concurrent change."""
+        while True:
+            with self._lock:
+                stale, version = set(self._stale), self._version
+                keys, movies = self._keys, self._movies
+                if not stale:
+                    self._refreshing = False
+                    return
+            top = self._compute_top(keys, movies, stale)
+            with self._lock:
+                if self._version == version:
+                    self._top = {**self._top, **top}
+                    self._stale -= stale
+    
+    @staticmethod
+    def _published_changes(since, generation):
+        """Union of the movie IDs published after since, or None if a rebuild is needed."""
+        if since is None or not 0 < generation - since <= MAX_PENDING_GENERATIONS:
+            return None
+        keys = [changes_key(number) for number in range(since + 1, generation + 1)]
+        published = cache.get_many(keys)
+        if len(published) < len(keys):
+            return None
+        return set().union(*published.values())
+    
+    @staticmethod
+    def _merge_keys(keys, removed, added):
+        """Return a sorted copy of keys without removed and with added."""
+        keys = list(keys)
+        for key in removed:
+            position = bisect_left(keys, key)
+            if position < len(keys) and keys[position] == key:
+                del keys[position]
+        for key in added:
+            insort(keys, key)
+        return keys
+    
+    @staticmethod
+    def _entry(movie_id, tmdb_id, title, popularity, release_date, poster_path):
+        return {
+            'id': movie_id,
+            'tmdb_id': tmdb_id,
+            'title': title,
+            'year': release_date.year if release_date else None,
+            'poster_path': poster_path,
+            'popularity': popularity,
+        }
+    
+    @staticmethod
+    def _rank_key(movies):
+        """Sort key for popularity order, breaking ties by lowest id."""
+        return lambda movie_id: (movies[movie_id]['popularity'], -movie_id)
+    
+    @staticmethod
+    def _matching_ids(keys, prefix):
+        start = bisect_left(keys, (prefix,))
+        end = bisect_left(keys, (prefix + PREFIX_END,))
+        return {movie_id for _, movie_id in keys[start:end]}
+    
+    @staticmethod
+    def _prefixes_of(key):
+        return {key[:length] for length in range(1, settings.AUTOCOMPLETE_SHORT_PREFIX + 1)}
+    
+    def _prefixes_of_keys(self, keys):
+        prefixes = set()
+        for key in keys:
+            prefixes.update(self._prefixes_of(key))
+        return prefixes
+    
+    def _short_prefixes(self, keys):
+        return self._prefixes_of_keys(key for key, _ in keys)
+    
+    def _compute_top(self, keys, movies, prefixes):
+        limit = settings.AUTOCOMPLETE_MAX_LIMIT
+        top = {}
+        for prefix in prefixes:
+            movie_ids = self._matching_ids(keys, prefix)
+            top[prefix] = heapq.nlargest(limit, movie_ids, key=self._rank_key(movies))
+        return top
+
+
+title_index = TitleIndex()
+
+
+@receiver(movies_ingested, dispatch_uid='autocomplete_index_update')
+def update_title_index(sender, movies, **kwargs):
+    """Fold ingested movies into this worker's index and publish them to other workers."""
+    title_index.add(movies)
+    title_index.mark_changed(movie.pk for movie in movies)
@@ -0,0 +1,195 @@
+"""
+Bulk rating and favorite writes for history imports.
+
+Items are validated one by one so a bad entry does not sink the batch, then
+the valid ones are written with one upsert statement inside one transaction.
+bulk_create skips model signals, so rating aggregates and interaction
+events for upserted rows are updated here explicitly, in batch.
+"""
+from django.db import transaction
+from django.db.models import Q
+
+from .models import InteractionEvent, Movie, MovieRating, UserFavoriteMovie
+from .rating_aggregates import apply_rating_changes, lock_summaries
+from .recommender.events import record_events
+from .serializers import BulkRatingItemSerializer, MovieReferenceSerializer
+
+CREATED = 'created'
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+REMOVED = 'removed'
+ERROR = 'error'
+
+
+def resolve_movies(references):
+    """
+    Map movie references to stored movie IDs with one query.
+    
+    Args:
+        references: Validated dicts holding movie_id or tmdb_id
+    
+    Returns:
+        List of movie primary keys, or None for references that are not stored
+    """
+    movie_ids = {ref['movie_id'] for ref in references if 'movie_id' in ref}
+    tmdb_ids = {ref['tmdb_id'] for ref in references if 'tmdb_id' in ref}
+    if not movie_ids and not tmdb_ids:
+        return []
+    
+    by_pk, by_tmdb_id = set(), {}
+    rows = Movie.objects.filter(Q(pk__in=movie_ids) | Q(tmdb_id__in=tmdb_ids)).values_list('pk', 'tmdb_id')
+    for pk, tmdb_id in rows:
+        by_pk.add(pk)
+        by_tmdb_id[tmdb_id] = pk
+    
+    resolved = []
+    for ref in references:
+        if 'movie_id' in ref:
+            resolved.append(ref['movie_id'] if ref['movie_id'] in by_pk else None)
+        else:
+            resolved.append(by_tmdb_id.get(ref['tmdb_id']))
+    return resolved
+
+
+def summarize(results):
+    """Count per-item results by status."""
+    summary = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+    return summary
+
+
+def validate_items(items, serializer_class):
+    """
+    Validate each item and resolve its movie.
+    
+    Returns:
+        (results, valid) where results holds one result dict per item, with
+        errors filled in, and valid lists (index, movie_id, data) for the
+        last valid entry per movie
+    """
+    results = [{'index': index} for index in range(len(items))]
+    validated = []
+    for index, item in enumerate(items):
+        serializer = serializer_class(data=item)
+        if serializer.is_valid():
+            validated.append((index, serializer.validated_data))
+        else:
+            results[index].update(status=ERROR, errors=serializer.errors)
+    
+    movie_ids = resolve_movies([data for _, data in validated])
+    valid = {}
+    for (index, data), movie_id in zip(validated, movie_ids):
+        if movie_id is None:
+            results[index].update(status=ERROR, errors={'movie': ['Movie not found.']})
+            continue
+        results[index]['movie_id'] = movie_id
+        if movie_id in valid:
+            earlier = valid[movie_id][0]
+            results[earlier].update(status=ERROR, errors={'movie': ['Superseded by a later entry.']})
+        valid[movie_id] = (index, movie_id, data)
+    return results, list(valid.values())
+
+
+def bulk_rate(user, items):
+    """
+    Create or update many of a user's ratings in one transaction.
+    
+    Args:
+        user: User whose ratings are written
+        items: Raw request entries of {movie_id|tmdb_id, rating, review}
+    
+    Returns:
+        List of per-item result dicts in request order
+    """
+    results, valid = validate_items(items, BulkRatingItemSerializer)
+    if not valid:
+        return results
+    
+    movie_ids = [movie_id for _, movie_id, _ in valid]
+    with transaction.atomic():
+        lock_summaries(movie_ids)
+        existing = {
+            movie_id: (rating, review)
+            for movie_id, rating, review in MovieRating.objects.select_for_update().filter(
+                user=user, movie_id__in=movie_ids
+            ).values_list('movie_id', 'rating', 'review')
+        }
+        
+        rows, changes = [], []
+        for index, movie_id, data in valid:
+            previous = existing.get(movie_id)
+            # An entry without a review keeps the one already stored
+            review = data['review'] if 'review' in data else (previous[1] if previous else None)
+            if previous == (data['rating'], review):
+                results[index]['status'] = UNCHANGED
+                continue
+            results[index]['status'] = UPDATED if previous else CREATED
+            rows.append(MovieRating(user=user, movie_id=movie_id, rating=data['rating'], review=review))
+            changes.append((movie_id, previous[0] if previous else None, data['rating']))
+        
+        if rows:
+            MovieRating.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['user', 'movie'],
+                update_fields=['rating', 'review', 'updated_at'],
+            )
+            apply_rating_changes(changes)
+            record_events(
+                (user.pk, movie_id, InteractionEvent.RATING, rating)
+                for movie_id, _, rating in changes
+            )
+    return results
+
+
+def bulk_favorite(user, add, remove):
+    """
+    Add and remove many of a user's favorites in one transaction.
+    
+    Args:
+        user: User whose favorites are written
+        add: Raw movie references to favorite
+        remove: Raw movie references to unfavorite
+    
+    Returns:
+        Dict with 'add' and 'remove' lists of per-item results
+    """
+    add_results, to_add = validate_items(add, MovieReferenceSerializer)
+    remove_results, to_remove = validate_items(remove, MovieReferenceSerializer)
+    add_ids = [movie_id for _, movie_id, _ in to_add]
+    remove_ids = [movie_id for _, movie_id, _ in to_remove]
+    
+    with transaction.atomic():
+        favorites = UserFavoriteMovie.objects.filter(user=user)
+        existing = set(favorites.filter(movie_id__in=add_ids).values_list('movie_id', flat=True))
+        # Locked so a concurrent removal cannot delete them first
+        present = set(
+            favorites.select_for_update().filter(movie_id__in=remove_ids).values_list('movie_id', flat=True)
+        )
+        
+        created_ids = set()
+        rows = [
+            UserFavoriteMovie(user=user, movie_id=movie_id)
+            for movie_id in add_ids if movie_id not in existing
+        ]
+        if rows:
+            UserFavoriteMovie.objects.bulk_create(rows, ignore_conflicts=True)
+            # Rows another request inserted first were skipped and keep their
+            # own created_at, so only rows stamped with ours were created here
+            stamped = {row.movie_id: row.created_at for row in rows}
+            inserted = favorites.filter(movie_id__in=stamped).values_list('movie_id', 'created_at')
+            created_ids = {
+                movie_id for movie_id, created_at in inserted if created_at == stamped[movie_id]
+            }
+            record_events((user.pk, movie_id, InteractionEvent.FAVORITE, None) for movie_id in created_ids)
+        
+        if present:
+            # A queryset delete() still sends post_delete, which records the events
+            favorites.filter(movie_id__in=present).delete()
+    
+    for index, movie_id, _ in to_add:
+        add_results[index]['status'] = CREATED if movie_id in created_ids else UNCHANGED
+    for index, movie_id, _ in to_remove:
+        remove_results[index]['status'] = REMOVED if movie_id in present else UNCHANGED
+    return {'add': add_results, 'remove': remove_results}
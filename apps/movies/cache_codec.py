@@ -0,0 +1,147 @@
+"""
+Compact serialized format for cached TMDb payloads.
+
+TMDb list pages carry many fields we never read. Before caching, each page
+is projected down to the fields Movie and the serializers need, and the
+entry is pickled as is: decoding is a single pickle.loads that yields the
+dicts callers use, with no per-movie rebuild. Optionally
+(TMDB_CACHE_COMPRESS) bodies above a size threshold are also
+zlib-compressed.
+
+Overview text dominates a page, so projection alone saves little Redis
+memory; compression cuts it by roughly two thirds but makes every decode
+slower, so it is off by default and only worth enabling when Redis memory
+matters more than per-hit latency. Run the benchmark_cache_codec command
+to see the trade-off on your hardware.
+
+Layout: one flag byte followed by the pickled [version, soft_expires, data]
+body (compressed if flagged). django-redis pickles these bytes again, which
+only copies them.
+"""
+import sys
+import zlib
+import pickle
+import hashlib
+import msgpack
+from django.conf import settings
+
+FORMAT_VERSION = 2
+
+FLAG_COMPRESSED = 0x01
+
+PAGE_FIELDS = ('page', 'total_pages', 'total_results', 'fingerprint')
+
+MOVIE_FIELDS = (
+    'id',
+    'title',
+    'overview',
+    'release_date',
+    'poster_path',
+    'backdrop_path',
+    'popularity',
+    'vote_average',
+    'vote_count',
+    'original_language',
+    'genre_ids',
+)
+
+
+def is_page(data):
+    """Check whether a TMDb payload is a paginated list of movies."""
+    return isinstance(data, dict) and isinstance(data.get('results'), list)
+
+
+def project_page(data):
+    """
+    Return a copy of a TMDb list page reduced to the fields we use.
+    
+    Every movie gets all of MOVIE_FIELDS, with None for fields TMDb left
+    out, matching what decode_entry returns. The page also gets a
+    fingerprint of its results so ingestion can tell pages it has already
+    saved.
+    """
+    projected = {field: data.get(field) for field in PAGE_FIELDS}
+    projected['results'] = [
+        {field: movie.get(field) for field in MOVIE_FIELDS}
+        for movie in data['results']
+    ]
+    projected['fingerprint'] = fingerprint_results(projected['results'])
+    return projected
+
+
+def fingerprint_results(results):
+    """Return a short content hash of projected movie results."""
+    rows = [[movie.get(field) for field in MOVIE_FIELDS] for movie in results]
+    return hashlib.blake2b(msgpack.packb(rows, use_bin_type=True), digest_size=12).hexdigest()
+
+
+def encode_entry(entry, compress=None):
+    """
+    Encode a cache entry ({'data': payload, 'soft_expires': timestamp}).
+    
+    Args:
+        entry: Cache entry to encode
+        compress: Whether to zlib-compress bodies of at least
+            TMDB_CACHE_COMPRESS_MIN_BYTES (default: TMDB_CACHE_COMPRESS)
+    
+    Returns:
+        Encoded bytes
+    """
+    if compress is None:
+        compress = settings.TMDB_CACHE_COMPRESS
+    
+    flags = 0
+    body = [FORMAT_VERSION, entry['soft_expires'], entry['data']]
+    
+    packed = pickle.dumps(body, pickle.HIGHEST_PROTOCOL)
+    if compress and len(packed) >= settings.TMDB_CACHE_COMPRESS_MIN_BYTES:
+        flags |= FLAG_COMPRESSED
+        packed = zlib.compress(packed, settings.TMDB_CACHE_COMPRESSION_LEVEL)
+    
+    return bytes([flags]) + packed
+
+
+def decode_entry(raw):
+    """
+    Decode bytes produced by encode_entry.
+    
+    Returns:
+        The cache entry, or None if raw is corrupt or not in a format we
+        understand, so the read counts as a cache miss
+    """
+    if not isinstance(raw, (bytes, bytearray)) or not raw:
+        return None
+    
+    try:
+        flags = raw[0]
+        packed = raw[1:]
+        if flags & FLAG_COMPRESSED:
+            packed = zlib.decompress(packed)
+        
+        body = pickle.loads(packed)
+        if not isinstance(body, list) or len(body) != 3 or body[0] != FORMAT_VERSION:
+            return None
+        version, soft_expires, data = body
+    except Exception:
+        # Garbled pickles can raise almost anything, not just UnpicklingError
+        return None
+    
+    return {'data': data, 'soft_expires': soft_expires}
+
+
+def decoded_size(value):
+    """
+    Approximate the memory held by a decoded payload, in bytes.
+    
+    Walks dicts, lists and tuples summing sys.getsizeof, which is what the
+    L1 cache actually keeps alive; the encoded length undercounts it
+    several times over.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += sys.getsizeof(key) + decoded_size(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            size += decoded_size(item)
+    return size
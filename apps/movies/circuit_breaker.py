@@ -0,0 +1,104 @@
+"""
+Circuit breaker for TMDb calls.
+
+After repeated failures or slow responses the breaker opens and TMDb calls
+fail immediately instead of tying up sync workers for the full request
+timeout. After a cool-down one trial call is let through (half-open); if it
+succeeds the breaker closes again, otherwise it re-opens.
+"""
+import time
+import threading
+import logging
+from django.conf import settings
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Per-process circuit breaker counting consecutive failed or slow calls."""
+    
+    def __init__(self, failure_threshold=None, slow_call_seconds=None, reset_timeout=None):
+        self._failure_threshold = failure_threshold
+        self._slow_call_seconds = slow_call_seconds
+        self._reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+    
+    @property
+    def failure_threshold(self):
+        return self._failure_threshold or settings.TMDB_CIRCUIT_FAILURE_THRESHOLD
+    
+    @property
+    def slow_call_seconds(self):
+        return self._slow_call_seconds or settings.TMDB_CIRCUIT_SLOW_CALL_SECONDS
+    
+    @property
+    def reset_timeout(self):
+        return self._reset_timeout or settings.TMDB_CIRCUIT_RESET_TIMEOUT
+    
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+    
+    @property
+    def is_open(self):
+        return self.state != CLOSED
+    
+    def allow_request(self):
+        """Check whether a call may go out now."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = HALF_OPEN
+                self._trial_in_flight = False
+            if self._state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+        
+        metrics.incr('circuit.rejected')
+        return False
+    
+    def release(self):
+        """Give back a half-open trial slot for a call that never reached TMDb."""
+        with self._lock:
+            self._trial_in_flight = False
+    
+    def record_success(self, duration):
+        """Record a completed call; calls slower than the threshold count as failures."""
+        if duration > self.slow_call_seconds:
+            metrics.incr('circuit.slow_calls')
+            self.record_failure()
+            return
+        
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info("TMDb circuit breaker closed")
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+    
+    def record_failure(self):
+        """Record a failed call, opening the breaker past the threshold."""
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    logger.warning("TMDb circuit breaker opened")
+                    metrics.incr('circuit.opened')
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+
+breaker = CircuitBreaker()
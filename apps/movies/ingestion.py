@@ -0,0 +1,124 @@
+"""
+Bulk ingestion of TMDb movie results into the Movie table.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics
+from .local_cache import local_cache
+from .models import Movie
+from .signals import movies_ingested
+
+UPDATE_FIELDS = [
+    'title',
+    'overview',
+    'release_date',
+    'poster_path',
+    'backdrop_path',
+    'popularity',
+    'vote_average',
+    'vote_count',
+    'original_language',
+    'genre_ids',
+    'updated_at',
+]
+
+
+def movie_from_tmdb(movie_data):
+    """Build an unsaved Movie from one TMDb result."""
+    return Movie(
+        tmdb_id=movie_data['id'],
+        title=movie_data.get('title') or '',
+        overview=movie_data.get('overview') or '',
+        release_date=movie_data.get('release_date') or None,
+        poster_path=movie_data.get('poster_path'),
+        backdrop_path=movie_data.get('backdrop_path'),
+        popularity=movie_data.get('popularity') or 0,
+        vote_average=movie_data.get('vote_average') or 0,
+        vote_count=movie_data.get('vote_count') or 0,
+        original_language=movie_data.get('original_language'),
+        genre_ids=movie_data.get('genre_ids') or [],
+    )
+
+
+def upsert_movies(results, batch_size=500):
+    """
+    Insert or update TMDb results with a single upsert statement per batch.
+    
+    Uses INSERT ... ON CONFLICT (tmdb_id) DO UPDATE, which Django supports
+    on both PostgreSQL and SQLite. Sends movies_ingested with the saved rows.
+    
+    Args:
+        results: Iterable of TMDb movie result dicts
+        batch_size: Maximum rows per INSERT statement
+    
+    Returns:
+        List of saved Movie rows in TMDb order, without duplicates
+    """
+    movies_by_tmdb_id = {}
+    for movie_data in results:
+        if movie_data.get('id') is not None and movie_data['id'] not in movies_by_tmdb_id:
+            movies_by_tmdb_id[movie_data['id']] = movie_from_tmdb(movie_data)
+    
+    if not movies_by_tmdb_id:
+        return []
+    
+    Movie.objects.bulk_create(
+        movies_by_tmdb_id.values(),
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['tmdb_id'],
+        update_fields=UPDATE_FIELDS,
+    )
+    
+    movies = load_movies(list(movies_by_tmdb_id))
+    movies_ingested.send(sender=Movie, movies=movies)
+    return movies
+
+
+def _ingested_key(fingerprint):
+    return f"ingested_page_{fingerprint}"
+
+
+def load_movies(tmdb_ids):
+    """Return stored Movie rows for tmdb_ids in the given order, skipping unknown ids."""
+    saved = Movie.objects.in_bulk(tmdb_ids, field_name='tmdb_id')
+    return [saved[tmdb_id] for tmdb_id in tmdb_ids if tmdb_id in saved]
+
+
+def ingest_page(data):
+    """
+    Save a cached TMDb page unless an identical page was already saved.
+    
+    Pages coming from TMDbClient carry a fingerprint of their results. Once a
+    page has been upserted its fingerprint is remembered in the cache, so
+    later requests for the same cached page only read the rows back with a
+    single tmdb_id__in query instead of writing them again.
+    
+    Args:
+        data: TMDb page payload
+    
+    Returns:
+        List of Movie rows in TMDb order
+    """
+    results = data.get('results', [])
+    fingerprint = data.get('fingerprint')
+    
+    if fingerprint:
+        key = _ingested_key(fingerprint)
+        if local_cache.get(key) or cache.get(key):
+            tmdb_ids = list(dict.fromkeys(
+                movie_data['id'] for movie_data in results if movie_data.get('id') is not None
+            ))
+            movies = load_movies(tmdb_ids)
+            if len(movies) == len(tmdb_ids):
+                metrics.incr('ingestion.pages_skipped')
+                return movies
+    
+    movies = upsert_movies(results)
+    metrics.incr('ingestion.pages_written')
+    
+    if fingerprint:
+        cache.set(key, True, settings.TMDB_INGESTED_PAGE_TTL)
+        local_cache.set(key, True, len(key))
+    return movies
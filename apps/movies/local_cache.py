@@ -0,0 +1,135 @@
+"""
+In-process LRU cache that sits in front of the shared Django cache.
+
+A handful of TMDb pages (trending day/week page 1, popular page 1) make up
+most traffic. Keeping them in worker memory saves a Redis round trip and
+an unpickle on every hit. Entries live for a short TTL, and the whole tier
+is invalidated across workers by bumping a generation number stored in the
+shared cache.
+"""
+import time
+import threading
+import uuid
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics
+
+GENERATION_KEY = 'tmdb_l1_generation'
+
+
+class LocalLRUCache:
+    """Bounded LRU cache with entry-count, byte-size and TTL limits."""
+    
+    def __init__(self, max_entries=None, max_bytes=None, ttl=None):
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._generation = None
+        self._generation_checked = 0.0
+    
+    @property
+    def max_entries(self):
+        return self._max_entries or settings.TMDB_L1_MAX_ENTRIES
+    
+    @property
+    def max_bytes(self):
+        return self._max_bytes or settings.TMDB_L1_MAX_BYTES
+    
+    @property
+    def ttl(self):
+        return self._ttl or settings.TMDB_L1_TTL
+    
+    def get(self, key):
+        """Return the value stored under key, or None if missing or expired."""
+        self._check_generation()
+        now = time.monotonic()
+        
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                expires, size, value = item
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    metrics.incr('l1.hits')
+                    return value
+                self._remove(key)
+        
+        metrics.incr('l1.misses')
+        return None
+    
+    def set(self, key, value, size):
+        """
+        Store value under key.
+        
+        Args:
+            key: Cache key
+            value: Value to store
+            size: Approximate size of value in bytes
+        """
+        if size > self.max_bytes:
+            return
+        
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires, size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                metrics.incr('l1.evictions')
+    
+    def delete(self, key):
+        """Remove key from this worker's cache."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+    
+    def clear(self):
+        """Remove every entry from this worker's cache."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+    
+    def stats(self):
+        """Return the number of entries and bytes currently held."""
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes}
+    
+    def _remove(self, key):
+        expires, size, value = self._entries.pop(key)
+        self._bytes -= size
+    
+    def _check_generation(self):
+        """Drop all entries if another worker bumped the shared generation."""
+        now = time.monotonic()
+        if now - self._generation_checked < settings.TMDB_L1_GENERATION_CHECK_INTERVAL:
+            return
+        self._generation_checked = now
+        
+        generation = cache.get(GENERATION_KEY, 0)
+        if generation != self._generation:
+            if self._generation is not None:
+                self.clear()
+            self._generation = generation
+
+
+def invalidate_all():
+    """
+    Invalidate the in-process cache of every worker.
+    
+    The generation is a random token rather than a counter, so a bump is
+    still seen after the shared cache was cleared and a counter would have
+    restarted at a value workers already hold.
+    """
+    cache.set(GENERATION_KEY, uuid.uuid4().hex, None)
+    local_cache.clear()
+
+
+local_cache = LocalLRUCache()
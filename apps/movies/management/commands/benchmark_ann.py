@@ -0,0 +1,65 @@
+"""
+Management command to benchmark the IVF ANN index against exact search.
+"""
+
+import time
+import numpy as np
+from django.core.management.base import BaseCommand
+from apps.movies.recommender.ann import IVFIndex, exact_search
+
+
+class Command(BaseCommand):
+    help = 'Report build time, recall@k and QPS of the IVF index against exact search on synthetic vectors'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--vectors', type=int, default=100000, help='Number of stored vectors')
+        parser.add_argument('--dim', type=int, default=32, help='Vector dimensions')
+        parser.add_argument('--queries', type=int, default=500, help='Number of queries')
+        parser.add_argument('--lists', type=int, default=None, help='IVF cells (default: sqrt(vectors))')
+        parser.add_argument(
+            '--probes',
+            default='1,4,8,16,32',
+            help='Comma-separated n_probe values to measure'
+        )
+        parser.add_argument('--k', type=int, default=10, help='Neighbours per query')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    
+    def synthetic_vectors(self, n, dim, rng):
+        """Unit vectors drawn around random cluster centres, like embeddings of related movies."""
+        centres = rng.standard_normal((max(1, n // 500), dim)).astype(np.float32)
+        vectors = centres[rng.integers(0, len(centres), n)]
+        vectors += rng.standard_normal((n, dim)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors
+    
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        k = options['k']
+        data = self.synthetic_vectors(options['vectors'] + options['queries'], options['dim'], rng)
+        vectors, queries = data[:options['vectors']], data[options['vectors']:]
+        ids = np.arange(len(vectors), dtype=np.int64)
+        
+        started = time.perf_counter()
+        index = IVFIndex.build(ids, vectors, n_lists=options['lists'], seed=options['seed'])
+        build_seconds = time.perf_counter() - started
+        
+        started = time.perf_counter()
+        exact_ids = np.vstack([exact_search(vectors, ids, query[None, :], k)[0] for query in queries])
+        exact_qps = len(queries) / (time.perf_counter() - started)
+        
+        self.stdout.write(
+            f'{len(vectors)} vectors x {options["dim"]} dims, {index.n_lists} lists, '
+            f'built in {build_seconds:.2f}s'
+        )
+        self.stdout.write(f'{"exact":>10}  recall@{k} 1.0000  {exact_qps:10.0f} QPS')
+        
+        for n_probe in [int(value) for value in options['probes'].split(',')]:
+            started = time.perf_counter()
+            # One query at a time, as the serving path would issue them
+            found = np.vstack([index.search(query, k, n_probe)[0] for query in queries])
+            qps = len(queries) / (time.perf_counter() - started)
+            hits = sum(
+                len(np.intersect1d(found[row], exact_ids[row])) for row in range(len(queries))
+            )
+            recall = hits / exact_ids.size
+            self.stdout.write(f'{f"nprobe={n_probe}":>10}  recall@{k} {recall:.4f}  {qps:10.0f} QPS')
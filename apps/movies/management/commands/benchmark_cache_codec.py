@@ -0,0 +1,101 @@
+"""
+Management command to compare the compact TMDb cache format with pickle.
+"""
+
+import time
+import pickle
+import random
+from django.core.management.base import BaseCommand
+from apps.movies.cache_codec import decode_entry, encode_entry
+from apps.movies.tmdb_client import make_cache_entry
+
+
+class Command(BaseCommand):
+    help = 'Benchmark cache size and decode time of the TMDb cache codec against pickle'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=20000,
+            help='Number of decode iterations per format'
+        )
+    
+    def build_page(self):
+        """Build a synthetic TMDb list page with the fields TMDb returns."""
+        words = (
+            'a an the of to in on at for with from by after before during while his her their '
+            'young old man woman family friend father mother daughter son brother sister team '
+            'city town village island planet world kingdom war battle mission journey secret '
+            'discovers must find save stop escape protect survive fight love lose return face '
+            'dangerous mysterious powerful ancient future past dark new last first final hidden '
+            'detective soldier agent thief scientist king queen student teacher doctor pilot '
+            'when who where how but and or as only soon begins learns decides becomes'
+        ).split()
+        return {
+            'page': 1,
+            'total_pages': 500,
+            'total_results': 10000,
+            'results': [
+                {
+                    'adult': False,
+                    'backdrop_path': f'/backdrop{i}.jpg',
+                    'genre_ids': random.sample([12, 14, 16, 18, 28, 35, 53, 80], 3),
+                    'id': 1000 + i,
+                    'media_type': 'movie',
+                    'original_language': 'en',
+                    'original_title': f'Movie {i}',
+                    'overview': ' '.join(random.choice(words) for _ in range(60)),
+                    'popularity': random.uniform(10, 500),
+                    'poster_path': f'/poster{i}.jpg',
+                    'release_date': '2024-05-01',
+                    'title': f'Movie {i}',
+                    'video': False,
+                    'vote_average': random.uniform(1, 10),
+                    'vote_count': random.randint(0, 30000),
+                }
+                for i in range(20)
+            ],
+        }
+    
+    @staticmethod
+    def store(raw):
+        """Serialize codec bytes the way django-redis stores them."""
+        return pickle.dumps(raw, pickle.HIGHEST_PROTOCOL)
+    
+    @staticmethod
+    def decode_stored(raw):
+        """Read codec bytes back the way TMDBClient does on a cache hit."""
+        return decode_entry(pickle.loads(raw))
+    
+    def time_decode(self, decode, raw, iterations):
+        """Return microseconds per decode call."""
+        started = time.perf_counter()
+        for _ in range(iterations):
+            decode(raw)
+        return (time.perf_counter() - started) / iterations * 1e6
+    
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        page = self.build_page()
+        
+        entry, timeout = make_cache_entry(page, 'popular')
+        # django-redis pickles every value, so codec bytes are pickled again
+        formats = [
+            ('pickle (raw)', pickle.loads,
+             pickle.dumps({'data': page, 'soft_expires': time.time()}, pickle.HIGHEST_PROTOCOL)),
+            ('projected + pickle', pickle.loads, pickle.dumps(entry, pickle.HIGHEST_PROTOCOL)),
+            ('codec', self.decode_stored, self.store(encode_entry(entry, compress=False))),
+            ('codec + zlib', self.decode_stored, self.store(encode_entry(entry, compress=True))),
+        ]
+        
+        self.stdout.write(f'{"format":<20}{"bytes":>10}{"decode (us)":>14}{"vs pickle":>12}')
+        baseline_bytes = baseline_us = None
+        for name, decode, raw in formats:
+            decode_us = self.time_decode(decode, raw, iterations)
+            if baseline_bytes is None:
+                baseline_bytes, baseline_us = len(raw), decode_us
+            self.stdout.write(
+                f'{name:<20}{len(raw):>10}{decode_us:>14.1f}'
+                f'{f"{len(raw) / baseline_bytes:.0%} / {decode_us / baseline_us:.0%}":>12}'
+            )
@@ -0,0 +1,41 @@
+"""
+Management command to build or update the content-based similarity index.
+"""
+
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.movies.recommender.content import build_content_index, update_content_index
+
+
+class Command(BaseCommand):
+    help = 'Vectorize movie genres and overviews and publish the content similarity index'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            default=None,
+            help='Neighbours kept per movie for a full build (default: RECOMMENDER_TOP_K)'
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Only add movies created since the last build'
+        )
+    
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        
+        if options['incremental']:
+            version = update_content_index()
+        else:
+            version = build_content_index(options['top_k'] or settings.RECOMMENDER_TOP_K)
+        
+        elapsed = time.perf_counter() - started
+        if version is None:
+            self.stdout.write(self.style.SUCCESS('Content index is up to date.'))
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f'Published content index version {version} in {elapsed:.2f}s')
+            )
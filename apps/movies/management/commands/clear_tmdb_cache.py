@@ -0,0 +1,31 @@
+"""
+Management command to purge cached TMDb payloads from every cache tier.
+"""
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from apps.movies.local_cache import invalidate_all
+
+TMDB_KEY_PATTERNS = [
+    'trending_movies_*',
+    'popular_movies_*',
+    'top_rated_movies_*',
+    'recommended_movies_*',
+    'movie_details_*',
+    'search_movies_*',
+]
+
+
+class Command(BaseCommand):
+    help = 'Delete cached TMDb responses from the shared cache and every worker\'s L1 cache'
+    
+    def handle(self, *args, **options):
+        if hasattr(cache, 'delete_pattern'):
+            deleted = sum(cache.delete_pattern(pattern) for pattern in TMDB_KEY_PATTERNS)
+            self.stdout.write(f'Deleted {deleted} shared cache entries')
+        else:
+            cache.clear()
+            self.stdout.write('Cache backend has no pattern delete; cleared the whole cache')
+        
+        invalidate_all()
+        self.stdout.write(self.style.SUCCESS('Invalidated L1 caches on all workers'))
@@ -2,9 +2,13 @@
 Management command to fetch popular movies from TMDb API.
 """
 
+import asyncio
 from django.core.management.base import BaseCommand
 from apps.movies.models import Movie
-from apps.movies.tmdb_client import TMDbClient
+from apps.movies.async_tmdb_client import AsyncTMDbClient
+from apps.movies.ingestion import upsert_movies
+from apps.movies.local_cache import invalidate_all
+from apps.movies.recommender.content import run_content_update
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,6 +24,17 @@ class Command(BaseCommand):
             default=1,
             help='Number of pages to fetch'
         )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=None,
+            help='Maximum concurrent TMDb requests (default: TMDB_ASYNC_CONCURRENCY)'
+        )
+    
+    async def fetch_pages(self, pages, concurrency):
+        """Fetch pages 1..pages concurrently, returned in page order."""
+        async with AsyncTMDbClient(concurrency=concurrency) as client:
+            return await client.get_popular_movies_pages(pages)
     
     def handle(self, *args, **options):
         pages = options['pages']
@@ -28,44 +43,28 @@ class Command(BaseCommand):
             self.style.SUCCESS('Fetching popular movies...')
         )
         
-        tmdb_client = TMDbClient()
-        movies_created = 0
-        movies_updated = 0
+        pages_data = asyncio.run(
+            self.fetch_pages(pages, options['concurrency'])
+        )
+        # The pages were refreshed in the shared cache; drop workers' older L1 copies
+        invalidate_all()
         
-        for page in range(1, pages + 1):
-            data = tmdb_client.get_popular_movies(page)
-            
+        results = []
+        for page, data in enumerate(pages_data, start=1):
             if not data:
                 self.stdout.write(
                     self.style.ERROR(f'Failed to fetch page {page}')
                 )
                 continue
-            
-            for movie_data in data.get('results', []):
-                movie, created = Movie.objects.get_or_create(
-                    tmdb_id=movie_data['id'],
-                    defaults={
-                        'title': movie_data.get('title', ''),
-                        'overview': movie_data.get('overview', ''),
-                        'release_date': movie_data.get('release_date'),
-                        'poster_path': movie_data.get('poster_path'),
-                        'backdrop_path': movie_data.get('backdrop_path'),
-                        'popularity': movie_data.get('popularity', 0),
-                        'vote_average': movie_data.get('vote_average', 0),
-                        'vote_count': movie_data.get('vote_count', 0),
-                        'original_language': movie_data.get('original_language'),
-                        'genre_ids': movie_data.get('genre_ids', []),
-                    }
-                )
-                
-                if created:
-                    movies_created += 1
-                else:
-                    movies_updated += 1
-                    movie.popularity = movie_data.get('popularity', 0)
-                    movie.vote_average = movie_data.get('vote_average', 0)
-                    movie.vote_count = movie_data.get('vote_count', 0)
-                    movie.save()
+            results.extend(data.get('results', []))
+        
+        tmdb_ids = {movie_data['id'] for movie_data in results if movie_data.get('id') is not None}
+        existing = Movie.objects.filter(tmdb_id__in=tmdb_ids).count()
+        movies = upsert_movies(results)
+        # Fold the new movies into the content index before exiting
+        run_content_update()
+        movies_created = len(movies) - existing
+        movies_updated = existing
         
         self.stdout.write(
             self.style.SUCCESS(
@@ -0,0 +1,68 @@
+"""
+Management command to rebuild movie rating summaries from user ratings.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from apps.movies.models import MovieRatingSummary
+from apps.movies.rating_aggregates import SCORES, compute_summaries
+
+SUMMARY_FIELDS = ['rating_sum', 'rating_count'] + [f'count_{score}' for score in SCORES]
+
+
+class Command(BaseCommand):
+    help = 'Recompute MovieRatingSummary rows from MovieRating and fix any drift'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drifted summaries without writing them'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Rows per bulk write'
+        )
+    
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            expected = compute_summaries()
+            current = {
+                summary.movie_id: summary
+                for summary in MovieRatingSummary.objects.select_for_update()
+            }
+            
+            drifted = []
+            for movie_id, summary in expected.items():
+                stored = current.get(movie_id)
+                if stored is None or any(
+                    getattr(stored, field) != getattr(summary, field) for field in SUMMARY_FIELDS
+                ):
+                    drifted.append(summary)
+            
+            orphaned = [
+                movie_id for movie_id, stored in current.items()
+                if movie_id not in expected and stored.rating_count
+            ]
+            
+            if not options['dry_run']:
+                MovieRatingSummary.objects.bulk_create(
+                    drifted,
+                    batch_size=options['batch_size'],
+                    update_conflicts=True,
+                    unique_fields=['movie'],
+                    update_fields=SUMMARY_FIELDS,
+                )
+                MovieRatingSummary.objects.filter(movie_id__in=orphaned).update(
+                    **{field: 0 for field in SUMMARY_FIELDS}
+                )
+        
+        verb = 'Found' if options['dry_run'] else 'Fixed'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{verb} {len(drifted)} drifted and {len(orphaned)} orphaned rating summaries '
+                f'({len(expected)} rated movies checked).'
+            )
+        )
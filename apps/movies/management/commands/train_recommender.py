@@ -0,0 +1,166 @@
+"""
+Management command to train ALS latent factors from user ratings.
+"""
+
+import os
+import time
+import resource
+import numpy as np
+from scipy import sparse
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.movies.recommender.als import load_ratings, rmse, train_als
+from apps.movies.recommender.ann import IVFIndex
+from apps.movies.recommender.store import als_store
+
+
+class Command(BaseCommand):
+    help = 'Train ALS user/movie factors from MovieRating and publish them to the model store'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--factors',
+            type=int,
+            default=None,
+            help='Latent dimensions (default: RECOMMENDER_ALS_FACTORS)'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=None,
+            help='ALS sweeps (default: RECOMMENDER_ALS_ITERATIONS)'
+        )
+        parser.add_argument(
+            '--regularization',
+            type=float,
+            default=None,
+            help='L2 penalty (default: RECOMMENDER_ALS_REGULARIZATION)'
+        )
+        parser.add_argument(
+            '--implicit',
+            action='store_true',
+            help='Treat ratings as implicit-feedback confidences'
+        )
+        parser.add_argument(
+            '--alpha',
+            type=float,
+            default=40.0,
+            help='Confidence scale for --implicit'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Solver processes'
+        )
+        parser.add_argument(
+            '--holdout',
+            type=float,
+            default=0.1,
+            help='Fraction of ratings held out to report RMSE'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=10000,
+            help='Ratings fetched per database round trip'
+        )
+        parser.add_argument(
+            '--ann-lists',
+            type=int,
+            default=None,
+            help='IVF cells for the item factor ANN index (default: sqrt(movies)); '
+                 'built when there are at least RECOMMENDER_ANN_MIN_ITEMS movies'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed for the holdout split and initial factors'
+        )
+    
+    def handle(self, *args, **options):
+        factors = options['factors'] or settings.RECOMMENDER_ALS_FACTORS
+        iterations = options['iterations'] or settings.RECOMMENDER_ALS_ITERATIONS
+        regularization = options['regularization'] or settings.RECOMMENDER_ALS_REGULARIZATION
+        implicit = options['implicit']
+        started = time.perf_counter()
+        
+        users, movies, ratings = load_ratings(options['chunk_size'])
+        if len(ratings) == 0:
+            self.stdout.write(self.style.WARNING('No ratings to train on.'))
+            return
+        
+        user_ids, rows = np.unique(users, return_inverse=True)
+        movie_ids, cols = np.unique(movies, return_inverse=True)
+        
+        rng = np.random.default_rng(options['seed'])
+        test = rng.random(len(ratings)) < options['holdout']
+        train = ~test
+        
+        # Explicit ratings are fitted around the global mean; implicit mode
+        # uses the raw ratings as confidences.
+        mean = float(ratings[train].mean()) if train.any() else 0.0
+        offset = 0.0 if implicit else mean
+        matrix = sparse.csr_matrix(
+            (ratings[train] - offset, (rows[train], cols[train])),
+            shape=(len(user_ids), len(movie_ids)),
+            dtype=np.float32,
+        )
+        
+        user_factors, item_factors = train_als(
+            matrix,
+            factors=factors,
+            iterations=iterations,
+            regularization=regularization,
+            implicit=implicit,
+            alpha=options['alpha'],
+            workers=options['workers'],
+            seed=options['seed'],
+        )
+        elapsed = time.perf_counter() - started
+        
+        holdout_rmse = None
+        if not implicit:
+            holdout_rmse = rmse(user_factors, item_factors, rows[test], cols[test], ratings[test], offset)
+        
+        arrays = {
+            'user_ids': user_ids,
+            'movie_ids': movie_ids,
+            'user_factors': user_factors,
+            'item_factors': item_factors,
+        }
+        if len(movie_ids) >= settings.RECOMMENDER_ANN_MIN_ITEMS:
+            # ids stored in the ANN index are rows of item_factors
+            ann = IVFIndex.build(
+                np.arange(len(movie_ids)), item_factors,
+                n_lists=options['ann_lists'], seed=options['seed'],
+            )
+            arrays.update(ann.to_arrays(prefix='ann_'))
+        
+        version = als_store.publish(
+            arrays,
+            {
+                'factors': factors,
+                'iterations': iterations,
+                'regularization': regularization,
+                'implicit': implicit,
+                'alpha': options['alpha'],
+                'mean': offset,
+                'ratings': int(train.sum()),
+                'holdout_rmse': holdout_rmse,
+            },
+        )
+        
+        peak_kb = max(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+        )
+        rmse_text = f'{holdout_rmse:.4f}' if holdout_rmse is not None else 'n/a'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Trained {factors} factors for {len(user_ids)} users x {len(movie_ids)} movies '
+                f'in {elapsed:.2f}s. Holdout RMSE: {rmse_text} ({int(test.sum())} ratings). '
+                f'Peak RSS: {peak_kb / 1024:.1f} MiB. Published version {version}'
+            )
+        )
@@ -0,0 +1,80 @@
+"""
+Management command to fold rating and favorite events into recommendation data.
+"""
+
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from apps.movies.recommender.events import (
+    UPDATER_LOCK_KEY,
+    process_events,
+    purge_processed_events,
+    rebuild_all,
+)
+
+# How often the --loop updater deletes expired folded events (seconds)
+PURGE_INTERVAL = 60 * 5
+
+
+class Command(BaseCommand):
+    help = 'Fold new rating/favorite events into co-occurrence counts and taste profiles'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Events folded per transaction'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running, polling for events every RECOMMENDER_UPDATE_INTERVAL seconds'
+        )
+        parser.add_argument(
+            '--retention',
+            type=int,
+            default=None,
+            help='Seconds to keep folded events (default: RECOMMENDER_EVENT_RETENTION)'
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recompute co-occurrence counts and profiles for all users from scratch'
+        )
+    
+    def handle(self, *args, **options):
+        lock_timeout = max(60, int(settings.RECOMMENDER_UPDATE_INTERVAL * 30))
+        if not cache.add(UPDATER_LOCK_KEY, True, lock_timeout):
+            self.stdout.write(self.style.WARNING('Another updater is running.'))
+            return
+        
+        try:
+            if options['rebuild']:
+                users = rebuild_all(options['batch_size'])
+                purge_processed_events(options['retention'])
+                self.stdout.write(self.style.SUCCESS(f'Rebuilt recommendation data for {users} users.'))
+                return
+            
+            purged_at = None
+            while True:
+                processed = 0
+                while True:
+                    count = process_events(options['batch_size'])
+                    processed += count
+                    if count < options['batch_size']:
+                        break
+                if processed:
+                    self.stdout.write(self.style.SUCCESS(f'Folded {processed} events.'))
+                if purged_at is None or time.monotonic() - purged_at >= PURGE_INTERVAL:
+                    purged = purge_processed_events(options['retention'])
+                    purged_at = time.monotonic()
+                    if purged:
+                        self.stdout.write(f'Deleted {purged} expired events.')
+                if not options['loop']:
+                    break
+                cache.touch(UPDATER_LOCK_KEY, lock_timeout)
+                time.sleep(settings.RECOMMENDER_UPDATE_INTERVAL)
+        finally:
+            cache.delete(UPDATER_LOCK_KEY)
@@ -0,0 +1,29 @@
+"""
+In-process counters for cache and TMDb client instrumentation.
+
+Counters are per worker process; the admin-only ``/api/movies/stats/``
+endpoint reports the values of the worker that served the request.
+"""
+import threading
+from collections import defaultdict
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+
+
+def incr(name, amount=1):
+    """Increment the counter called name."""
+    with _lock:
+        _counters[name] += amount
+
+
+def snapshot():
+    """Return a copy of all counters."""
+    with _lock:
+        return dict(_counters)
+
+
+def reset():
+    """Reset all counters to zero."""
+    with _lock:
+        _counters.clear()
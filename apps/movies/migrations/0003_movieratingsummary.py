@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_summaries(apps, schema_editor):
+    MovieRating = apps.get_model('movies', 'MovieRating')
+    MovieRatingSummary = apps.get_model('movies', 'MovieRatingSummary')
+    rows = MovieRating.objects.order_by().values('movie_id').annotate(
+        rating_sum=models.Sum('rating'),
+        rating_count=models.Count('id'),
+        **{
+            f'count_{score}': models.Count('id', filter=models.Q(rating=score))
+            for score in range(1, 11)
+        }
+    )
+    MovieRatingSummary.objects.bulk_create(
+        [MovieRatingSummary(**row) for row in rows], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovieRatingSummary',
+            fields=[
+                ('movie', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating_summary', serialize=False, to='movies.movie')),
+                ('rating_sum', models.IntegerField(default=0)),
+                ('rating_count', models.IntegerField(default=0)),
+                ('count_1', models.IntegerField(default=0)),
+                ('count_2', models.IntegerField(default=0)),
+                ('count_3', models.IntegerField(default=0)),
+                ('count_4', models.IntegerField(default=0)),
+                ('count_5', models.IntegerField(default=0)),
+                ('count_6', models.IntegerField(default=0)),
+                ('count_7', models.IntegerField(default=0)),
+                ('count_8', models.IntegerField(default=0)),
+                ('count_9', models.IntegerField(default=0)),
+                ('count_10', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
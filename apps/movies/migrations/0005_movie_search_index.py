@@ -0,0 +1,96 @@
+"""
+Full-text search indexes over movie titles and overviews.
+
+PostgreSQL gets a weighted tsvector expression index plus a pg_trgm index on
+title for typo-tolerant matches. SQLite (PythonAnywhere and test settings)
+gets an external-content FTS5 table kept in sync by triggers. Other backends
+are left alone and fall back to icontains in apps.movies.search.
+"""
+from django.db import migrations
+
+
+# Must stay identical to apps.movies.search.PG_DOCUMENT so the planner uses the index
+PG_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(overview, '')), 'B')"
+)
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS movies_movie_search_idx ON movies_movie USING GIN (({PG_DOCUMENT}))",
+    "CREATE INDEX IF NOT EXISTS movies_movie_title_trgm_idx ON movies_movie USING GIN (title gin_trgm_ops)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS movies_movie_title_trgm_idx",
+    "DROP INDEX IF EXISTS movies_movie_search_idx",
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS movies_movie_fts USING fts5(
+        title, overview, content='movies_movie', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movies_movie_fts_insert AFTER INSERT ON movies_movie BEGIN
+        INSERT INTO movies_movie_fts(rowid, title, overview)
+        VALUES (new.id, new.title, coalesce(new.overview, ''));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movies_movie_fts_delete AFTER DELETE ON movies_movie BEGIN
+        INSERT INTO movies_movie_fts(movies_movie_fts, rowid, title, overview)
+        VALUES ('delete', old.id, old.title, coalesce(old.overview, ''));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movies_movie_fts_update AFTER UPDATE OF title, overview ON movies_movie BEGIN
+        INSERT INTO movies_movie_fts(movies_movie_fts, rowid, title, overview)
+        VALUES ('delete', old.id, old.title, coalesce(old.overview, ''));
+        INSERT INTO movies_movie_fts(rowid, title, overview)
+        VALUES (new.id, new.title, coalesce(new.overview, ''));
+    END
+    """,
+    "INSERT INTO movies_movie_fts(movies_movie_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS movies_movie_fts_update",
+    "DROP TRIGGER IF EXISTS movies_movie_fts_delete",
+    "DROP TRIGGER IF EXISTS movies_movie_fts_insert",
+    "DROP TABLE IF EXISTS movies_movie_fts",
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_FORWARD)
+    elif vendor == 'sqlite':
+        _run(schema_editor, SQLITE_FORWARD)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_REVERSE)
+    elif vendor == 'sqlite':
+        _run(schema_editor, SQLITE_REVERSE)
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('movies', '0004_interaction_events'),
+    ]
+    
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0005_movie_search_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='movie',
+            name='movies_movi_popular_3c541f_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='userfavoritemovie',
+            name='movies_user_user_id_f49065_idx',
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['-popularity', '-id'], name='movies_movi_popular_b2629e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movierating',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='movies_movi_user_id_eba0c4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userfavoritemovie',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='movies_user_user_id_a06387_idx'),
+        ),
+    ]
@@ -24,7 +24,7 @@ class Movie(models.Model):
         ordering = ['-popularity']
         indexes = [
             models.Index(fields=['tmdb_id']),
-            models.Index(fields=['-popularity']),
+            models.Index(fields=['-popularity', '-id']),
             models.Index(fields=['-vote_average']),
         ]
     
@@ -53,7 +53,7 @@ class UserFavoriteMovie(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['user', 'movie']),
-            models.Index(fields=['user', '-created_at']),
+            models.Index(fields=['user', '-created_at', '-id']),
         ]
     
     def __str__(self):
@@ -85,7 +85,136 @@ class MovieRating(models.Model):
         indexes = [
             models.Index(fields=['user', 'movie']),
             models.Index(fields=['movie', '-rating']),
+            models.Index(fields=['user', '-created_at', '-id']),
         ]
     
     def __str__(self):
         return f"{self.user.username} - {self.movie.title} ({self.rating}/10)"
+
+
+class MovieRatingSummary(models.Model):
+    """
+    Denormalized rating aggregates for a movie.
+    
+    Maintained incrementally by the rating write paths so the average and
+    histogram can be read without scanning MovieRating.
+    """
+    movie = models.OneToOneField(
+        Movie,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='rating_summary'
+    )
+    rating_sum = models.IntegerField(default=0)
+    rating_count = models.IntegerField(default=0)
+    count_1 = models.IntegerField(default=0)
+    count_2 = models.IntegerField(default=0)
+    count_3 = models.IntegerField(default=0)
+    count_4 = models.IntegerField(default=0)
+    count_5 = models.IntegerField(default=0)
+    count_6 = models.IntegerField(default=0)
+    count_7 = models.IntegerField(default=0)
+    count_8 = models.IntegerField(default=0)
+    count_9 = models.IntegerField(default=0)
+    count_10 = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    @property
+    def average(self):
+        """Average rating, or None when the movie has no ratings."""
+        if self.rating_count:
+            return round(self.rating_sum / self.rating_count, 2)
+        return None
+    
+    @property
+    def histogram(self):
+        """Number of ratings for each score 1-10."""
+        return {score: getattr(self, f'count_{score}') for score in range(1, 11)}
+    
+    def __str__(self):
+        return f"{self.movie.title} ({self.rating_count} ratings)"
+
+
+class InteractionEvent(models.Model):
+    """
+    Append-only log of rating and favorite writes.
+    
+    The recommendation updater folds unprocessed events into co-occurrence
+    counts and taste profiles.
+    """
+    RATING = 'rating'
+    RATING_REMOVED = 'rating_removed'
+    FAVORITE = 'favorite'
+    FAVORITE_REMOVED = 'favorite_removed'
+    KIND_CHOICES = [
+        (RATING, 'Rating set'),
+        (RATING_REMOVED, 'Rating removed'),
+        (FAVORITE, 'Favorite added'),
+        (FAVORITE_REMOVED, 'Favorite removed'),
+    ]
+    
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    movie = models.ForeignKey(
+        Movie,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    rating = models.SmallIntegerField(blank=True, null=True)
+    processed = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['processed', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} {self.kind} {self.movie_id}"
+
+
+class MovieCooccurrence(models.Model):
+    """
+    Number of users who liked both movies, stored once per pair with movie_a <= movie_b.
+    
+    The diagonal (movie_a == movie_b) holds the number of users who liked
+    the movie, so cosine similarity is count(a, b) / sqrt(count(a, a) * count(b, b)).
+    """
+    movie_a = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='+')
+    movie_b = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='+')
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        unique_together = ('movie_a', 'movie_b')
+        indexes = [
+            models.Index(fields=['movie_b']),
+        ]
+    
+    def __str__(self):
+        return f"{self.movie_a_id} & {self.movie_b_id}: {self.count}"
+
+
+class UserTasteProfile(models.Model):
+    """
+    Last folded state of a user's history, kept by the recommendation updater.
+    
+    history maps movie id to interaction weight and genres maps genre id to
+    the summed weight of the user's movies in that genre.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='taste_profile'
+    )
+    history = models.JSONField(default=dict)
+    genres = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Taste profile of {self.user_id}"
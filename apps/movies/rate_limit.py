@@ -0,0 +1,191 @@
+"""
+Token-bucket rate limiting for outbound TMDb calls.
+
+Every gunicorn worker and the fetch_* commands draw from one shared bucket
+so that together they stay under TMDb's per-key request limit. The bucket
+lives in Redis when the default cache is django-redis; otherwise (tests,
+PythonAnywhere/Render local-memory cache) an in-process bucket stands in.
+
+Interactive requests may drain the bucket completely. Batch requests leave
+a reserve of tokens for interactive traffic and are allowed to queue for
+longer. A caller that cannot get a token within its wait budget is shed.
+"""
+import time
+import asyncio
+import threading
+import logging
+from django.conf import settings
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
+
+BUCKET_KEY = 'tmdb_rate_limit_bucket'
+
+# Refill the bucket, then take one token if more than `reserve` remain.
+# Returns 0 when a token was taken, otherwise milliseconds until one frees up.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local reserve = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens - 1 >= reserve then
+    tokens = tokens - 1
+else
+    wait = math.ceil((reserve + 1 - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return wait
+"""
+
+
+class LocalTokenBucket:
+    """In-process token bucket with the same semantics as the Redis bucket."""
+    
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._timestamp = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def try_acquire(self, reserve=0):
+        """
+        Take a token if more than reserve tokens are available.
+        
+        Returns:
+            0 if a token was taken, otherwise seconds until one is available
+        """
+        with self._lock:
+            now = time.monotonic()
+            elapsed = max(0.0, now - self._timestamp)
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._timestamp = now
+            if self._tokens - 1 >= reserve:
+                self._tokens -= 1
+                return 0
+            return (reserve + 1 - self._tokens) / self.rate
+
+
+class RedisTokenBucket:
+    """Token bucket shared by all processes through a Redis Lua script."""
+    
+    def __init__(self, rate, capacity, connection):
+        self.rate = rate
+        self.capacity = capacity
+        self._script = connection.register_script(TOKEN_BUCKET_SCRIPT)
+    
+    def try_acquire(self, reserve=0):
+        """
+        Take a token if more than reserve tokens are available.
+        
+        Returns:
+            0 if a token was taken, otherwise seconds until one is available
+        """
+        wait_ms = self._script(
+            keys=[BUCKET_KEY],
+            args=[self.rate, self.capacity, time.time(), reserve],
+        )
+        return int(wait_ms) / 1000
+
+
+class RateLimiter:
+    """Priority-aware front end over a token bucket."""
+    
+    def __init__(self, bucket):
+        self.bucket = bucket
+    
+    def _reserve(self, priority):
+        if priority == BATCH:
+            return self.bucket.capacity * settings.TMDB_RATE_LIMIT_BATCH_RESERVE
+        return 0
+    
+    def _attempt(self, priority, reserve, deadline):
+        """
+        Try once to take a token.
+        
+        Returns:
+            Tuple of (acquired, wait): wait is None once the outcome is
+            settled, otherwise the seconds to sleep before trying again
+        """
+        try:
+            wait = self.bucket.try_acquire(reserve)
+        except Exception as e:
+            logger.error(f"TMDb rate limiter unavailable: {str(e)}")
+            return True, None
+        
+        if wait == 0:
+            return True, None
+        if time.monotonic() + wait > deadline:
+            metrics.incr(f'rate_limit.shed.{priority}')
+            return False, None
+        
+        metrics.incr(f'rate_limit.waits.{priority}')
+        return False, wait
+    
+    def acquire(self, priority=INTERACTIVE):
+        """
+        Wait for a token, up to the wait budget of priority.
+        
+        Args:
+            priority: INTERACTIVE or BATCH
+        
+        Returns:
+            True if a token was taken, False if the call should be shed
+        """
+        reserve = self._reserve(priority)
+        deadline = time.monotonic() + settings.TMDB_RATE_LIMIT_MAX_WAIT[priority]
+        
+        while True:
+            acquired, wait = self._attempt(priority, reserve, deadline)
+            if wait is None:
+                return acquired
+            time.sleep(wait)
+    
+    async def acquire_async(self, priority=BATCH):
+        """Async variant of acquire() that yields to the event loop while waiting."""
+        reserve = self._reserve(priority)
+        deadline = time.monotonic() + settings.TMDB_RATE_LIMIT_MAX_WAIT[priority]
+        
+        while True:
+            acquired, wait = self._attempt(priority, reserve, deadline)
+            if wait is None:
+                return acquired
+            await asyncio.sleep(wait)
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def build_bucket():
+    """Create a Redis-backed bucket when the default cache is Redis, else a local one."""
+    rate = settings.TMDB_RATE_LIMIT_RATE
+    capacity = settings.TMDB_RATE_LIMIT_BURST
+    
+    if 'django_redis' in settings.CACHES['default']['BACKEND']:
+        from django_redis import get_redis_connection
+        return RedisTokenBucket(rate, capacity, get_redis_connection('default'))
+    return LocalTokenBucket(rate, capacity)
+
+
+def get_rate_limiter():
+    """Return the process-wide TMDb rate limiter, or None when disabled."""
+    global _rate_limiter
+    
+    if not settings.TMDB_RATE_LIMIT_ENABLED:
+        return None
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = RateLimiter(build_bucket())
+    return _rate_limiter
@@ -0,0 +1,134 @@
+"""
+Incremental maintenance of MovieRatingSummary rows.
+"""
+from django.db.models import Case, Count, F, IntegerField, Q, Sum, Value, When
+
+from .models import MovieRating, MovieRatingSummary
+
+SCORES = range(1, 11)
+
+
+def lock_summaries(movie_ids):
+    """
+    Create any missing summary rows and lock them until the transaction ends.
+    
+    Rating writers call this before reading the previous rating, so two
+    first-time ratings of one movie are serialized rather than both seeing
+    no previous rating and counting twice. Rows are locked in primary key
+    order so bulk writers cannot deadlock each other.
+    
+    Args:
+        movie_ids: Primary keys of the movies about to be rated
+    """
+    movie_ids = sorted(set(movie_ids))
+    if not movie_ids:
+        return
+    MovieRatingSummary.objects.bulk_create(
+        [MovieRatingSummary(movie_id=movie_id) for movie_id in movie_ids],
+        ignore_conflicts=True,
+    )
+    list(
+        MovieRatingSummary.objects.select_for_update()
+        .filter(movie_id__in=movie_ids)
+        .order_by('movie_id')
+        .values_list('movie_id', flat=True)
+    )
+
+
+def apply_rating_change(movie_id, old_rating=None, new_rating=None):
+    """
+    Update a movie's rating summary for one rating being added, changed or removed.
+    
+    Uses F() expressions so concurrent writers do not lose updates. Call it
+    inside the same transaction as the MovieRating write, with old_rating
+    read after lock_summaries().
+    
+    Args:
+        movie_id: Primary key of the rated movie
+        old_rating: Previous score, or None for a new rating
+        new_rating: New score, or None when the rating was removed
+    """
+    if old_rating == new_rating:
+        return
+    
+    updates = {}
+    if old_rating is not None:
+        updates['rating_sum'] = F('rating_sum') - old_rating
+        updates['rating_count'] = F('rating_count') - 1
+        updates[f'count_{old_rating}'] = F(f'count_{old_rating}') - 1
+    if new_rating is not None:
+        updates['rating_sum'] = updates.get('rating_sum', F('rating_sum')) + new_rating
+        updates['rating_count'] = updates.get('rating_count', F('rating_count')) + 1
+        updates[f'count_{new_rating}'] = F(f'count_{new_rating}') + 1
+    
+    MovieRatingSummary.objects.get_or_create(movie_id=movie_id)
+    MovieRatingSummary.objects.filter(movie_id=movie_id).update(**updates)
+
+
+def apply_rating_changes(changes):
+    """
+    Update rating summaries for many rating changes with one UPDATE.
+    
+    Deltas are summed per movie and applied with F() + CASE expressions, so
+    a bulk import touches each summary row once. Call it inside the same
+    transaction as the MovieRating writes, with the old ratings read after
+    lock_summaries().
+    
+    Args:
+        changes: Iterable of (movie_id, old_rating, new_rating), with None
+            for a missing old or new rating as in apply_rating_change
+    """
+    deltas = {}
+    for movie_id, old_rating, new_rating in changes:
+        if old_rating == new_rating:
+            continue
+        movie_deltas = deltas.setdefault(movie_id, {})
+        for rating, step in ((old_rating, -1), (new_rating, 1)):
+            if rating is None:
+                continue
+            movie_deltas['rating_sum'] = movie_deltas.get('rating_sum', 0) + step * rating
+            movie_deltas['rating_count'] = movie_deltas.get('rating_count', 0) + step
+            field = f'count_{rating}'
+            movie_deltas[field] = movie_deltas.get(field, 0) + step
+    if not deltas:
+        return
+    
+    MovieRatingSummary.objects.bulk_create(
+        [MovieRatingSummary(movie_id=movie_id) for movie_id in deltas],
+        ignore_conflicts=True,
+    )
+    
+    fields = {field for movie_deltas in deltas.values() for field in movie_deltas}
+    updates = {}
+    for field in fields:
+        whens = [
+            When(movie_id=movie_id, then=Value(movie_deltas[field]))
+            for movie_id, movie_deltas in deltas.items()
+            if movie_deltas.get(field)
+        ]
+        if whens:
+            updates[field] = F(field) + Case(*whens, default=Value(0), output_field=IntegerField())
+    if updates:
+        MovieRatingSummary.objects.filter(movie_id__in=list(deltas)).update(**updates)
+
+
+def compute_summaries(movie_ids=None):
+    """
+    Recompute rating summaries from MovieRating.
+    
+    Args:
+        movie_ids: Restrict to these movies, or None for all rated movies
+    
+    Returns:
+        Dict of movie_id to unsaved MovieRatingSummary
+    """
+    ratings = MovieRating.objects.all()
+    if movie_ids is not None:
+        ratings = ratings.filter(movie_id__in=movie_ids)
+    
+    rows = ratings.order_by().values('movie_id').annotate(
+        rating_sum=Sum('rating'),
+        rating_count=Count('id'),
+        **{f'count_{score}': Count('id', filter=Q(rating=score)) for score in SCORES}
+    )
+    return {row['movie_id']: MovieRatingSummary(**row) for row in rows}
@@ -0,0 +1,19 @@
+"""
+Local recommendation engine built from our own users' ratings and favorites.
+"""
+from .factors import FactorModel, get_factor_model
+from .index import NeighborIndex, get_neighbor_index
+from .matrix import build_interaction_matrix
+from .personalized import invalidate_for_you, rank_for_user
+from .similarity import item_item_neighbors
+
+__all__ = [
+    'FactorModel',
+    'NeighborIndex',
+    'build_interaction_matrix',
+    'get_factor_model',
+    'get_neighbor_index',
+    'invalidate_for_you',
+    'item_item_neighbors',
+    'rank_for_user',
+]
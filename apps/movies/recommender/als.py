@@ -0,0 +1,144 @@
+"""
+Alternating least squares matrix factorization over MovieRating.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from scipy import sparse
+
+from ..models import MovieRating
+
+
+def load_ratings(chunk_size=10000):
+    """
+    Stream MovieRating into (user_ids, movie_ids, ratings) arrays.
+    
+    Args:
+        chunk_size: Rows fetched per database round trip
+    """
+    users, movies, ratings = [], [], []
+    rows = MovieRating.objects.order_by().values_list('user_id', 'movie_id', 'rating')
+    for user_id, movie_id, rating in rows.iterator(chunk_size=chunk_size):
+        users.append(user_id)
+        movies.append(movie_id)
+        ratings.append(rating)
+    return (
+        np.asarray(users, dtype=np.int64),
+        np.asarray(movies, dtype=np.int64),
+        np.asarray(ratings, dtype=np.float32),
+    )
+
+
+def _solve_block(args):
+    """
+    Solve the regularized least squares problem for a block of rows.
+    
+    Module level so it can be sent to worker processes.
+    
+    Args:
+        args: (indptr, indices, data, fixed, regularization, implicit, alpha)
+            where indptr/indices/data are the CSR slice for the block and
+            fixed is the factor matrix held constant this half-step
+    
+    Returns:
+        (n_rows, factors) array
+    """
+    indptr, indices, data, fixed, regularization, implicit, alpha = args
+    n_factors = fixed.shape[1]
+    identity = regularization * np.eye(n_factors, dtype=np.float64)
+    gram = fixed.T @ fixed if implicit else None
+    block = np.zeros((len(indptr) - 1, n_factors), dtype=np.float32)
+    
+    for row in range(len(indptr) - 1):
+        start, end = indptr[row], indptr[row + 1]
+        if start == end:
+            continue
+        columns = indices[start:end]
+        values = data[start:end].astype(np.float64)
+        factors = fixed[columns].astype(np.float64)
+        if implicit:
+            confidence = alpha * values
+            lhs = gram + (factors.T * confidence) @ factors + identity
+            rhs = factors.T @ (1.0 + confidence)
+        else:
+            lhs = factors.T @ factors + identity * (end - start)
+            rhs = factors.T @ values
+        block[row] = np.linalg.solve(lhs, rhs)
+    return block
+
+
+def _half_step(matrix, fixed, regularization, implicit, alpha, executor, block_size):
+    """Recompute the factors for every row of matrix holding fixed constant."""
+    tasks = []
+    for start in range(0, matrix.shape[0], block_size):
+        stop = min(start + block_size, matrix.shape[0])
+        offset = matrix.indptr[start]
+        end = matrix.indptr[stop]
+        tasks.append((
+            matrix.indptr[start:stop + 1] - offset,
+            matrix.indices[offset:end],
+            matrix.data[offset:end],
+            fixed,
+            regularization,
+            implicit,
+            alpha,
+        ))
+    solver = executor.map if executor else map
+    blocks = list(solver(_solve_block, tasks))
+    if not blocks:
+        return np.zeros((0, fixed.shape[1]), dtype=np.float32)
+    return np.vstack(blocks)
+
+
+def train_als(matrix, factors=32, iterations=10, regularization=0.1, implicit=False,
+              alpha=40.0, workers=1, block_size=256, seed=0):
+    """
+    Factorize a user x movie matrix with alternating least squares.
+    
+    Explicit mode fits the stored values directly (with weighted-lambda
+    regularization); implicit mode treats them as confidences as in
+    Hu, Koren and Volinsky. User and item half-steps are split into row
+    blocks solved in parallel across a process pool.
+    
+    Args:
+        matrix: User x movie csr_matrix
+        factors: Latent dimensions
+        iterations: Number of full user + item sweeps
+        regularization: L2 penalty
+        implicit: Use implicit-feedback confidence weighting
+        alpha: Confidence scale for implicit mode
+        workers: Worker processes, 1 to solve in this process
+        block_size: Rows per solver task
+        seed: Seed for the initial item factors
+    
+    Returns:
+        Tuple of (user_factors, item_factors) float32 arrays
+    """
+    matrix = sparse.csr_matrix(matrix, dtype=np.float32)
+    transposed = matrix.T.tocsr()
+    rng = np.random.default_rng(seed)
+    item_factors = (rng.standard_normal((matrix.shape[1], factors)) * 0.01).astype(np.float32)
+    user_factors = np.zeros((matrix.shape[0], factors), dtype=np.float32)
+    
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for _ in range(iterations):
+            user_factors = _half_step(
+                matrix, item_factors, regularization, implicit, alpha, executor, block_size
+            )
+            item_factors = _half_step(
+                transposed, user_factors, regularization, implicit, alpha, executor, block_size
+            )
+    finally:
+        if executor:
+            executor.shutdown()
+    return user_factors, item_factors
+
+
+def rmse(user_factors, item_factors, rows, cols, values, offset=0.0):
+    """Root mean squared error of offset + u.v against values."""
+    if len(values) == 0:
+        return None
+    predictions = offset + np.einsum('ij,ij->i', user_factors[rows], item_factors[cols])
+    predictions = np.clip(predictions, 1, 10)
+    return float(np.sqrt(np.mean((predictions - values) ** 2)))
+
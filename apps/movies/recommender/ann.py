@@ -0,0 +1,209 @@
+"""
+Approximate nearest-neighbour search over dense movie vectors.
+
+IVFIndex is an inverted-file index: k-means centroids split the vectors into
+n_lists cells, and a query only scores the vectors in the n_probe cells
+whose centroids match it best. n_probe trades recall for latency: n_probe ==
+n_lists is an exact search. Scores are inner products, so normalise
+vectors first for cosine similarity; ALS factors can be searched as is.
+"""
+import os
+import numpy as np
+
+ARRAY_NAMES = ('centroids', 'list_offsets', 'ids', 'vectors')
+
+
+def _top_k(scores, k):
+    """Positions of the k largest scores, best first."""
+    if len(scores) > k:
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind='stable')]
+
+
+def kmeans(vectors, n_clusters, iterations=10, seed=0, chunk_size=8192):
+    """
+    Lloyd's k-means with squared L2 distance.
+    
+    Args:
+        vectors: (n, dim) float32 array
+        n_clusters: Number of centroids
+        iterations: Assignment/update rounds
+        seed: Seed for initial centroids and re-seeding empty clusters
+        chunk_size: Rows assigned per matrix product
+    
+    Returns:
+        (n_clusters, dim) float32 centroids
+    """
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].astype(np.float32)
+    
+    for _ in range(iterations):
+        assignments = assign(vectors, centroids, chunk_size)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=n_clusters).astype(np.float32)
+        empty = counts == 0
+        centroids = sums / np.maximum(counts, 1)[:, None]
+        if empty.any():
+            centroids[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+    return centroids
+
+
+def assign(vectors, centroids, chunk_size=8192):
+    """Index of the nearest centroid (squared L2) for every vector."""
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), chunk_size):
+        chunk = vectors[start:start + chunk_size]
+        distances = centroid_norms[None, :] - 2.0 * chunk @ centroids.T
+        assignments[start:start + chunk_size] = distances.argmin(axis=1)
+    return assignments
+
+
+def exact_search(vectors, ids, queries, k, chunk_size=1024):
+    """
+    Brute-force top-k inner product search.
+    
+    Returns:
+        Tuple of (ids, scores) shaped (n_queries, k), padded with -1 / -inf
+    """
+    k = min(k, len(vectors))
+    result_ids = np.full((len(queries), k), -1, dtype=np.int64)
+    result_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+    for start in range(0, len(queries), chunk_size):
+        scores = queries[start:start + chunk_size] @ vectors.T
+        if k < len(vectors):
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(len(vectors)), scores.shape)
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        result_ids[start:start + chunk_size] = ids[np.take_along_axis(top, order, axis=1)]
+        result_scores[start:start + chunk_size] = np.take_along_axis(top_scores, order, axis=1)
+    return result_ids, result_scores
+
+
+class IVFIndex:
+    """
+    Inverted-file ANN index over dense vectors.
+    
+    Vectors are stored grouped by cell: the vectors and ids of cell c are
+    rows list_offsets[c]:list_offsets[c + 1], so each probe is a contiguous
+    slice that works directly on memory-mapped arrays.
+    
+    Args:
+        centroids: (n_lists, dim) cell centroids
+        list_offsets: (n_lists + 1,) row offsets of each cell
+        ids: Ids of the stored vectors, grouped by cell
+        vectors: Stored vectors, grouped by cell
+        n_probe: Default number of cells scored per query
+    """
+    
+    def __init__(self, centroids, list_offsets, ids, vectors, n_probe=8):
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.ids = ids
+        self.vectors = vectors
+        self.n_probe = n_probe
+    
+    @classmethod
+    def build(cls, ids, vectors, n_lists=None, n_probe=8, iterations=10, seed=0, train_size=None):
+        """
+        Train centroids on (a sample of) vectors and add every vector.
+        
+        Args:
+            ids: (n,) ids of the vectors
+            vectors: (n, dim) vectors
+            n_lists: Number of cells (default: about sqrt(n))
+            n_probe: Default cells scored per query
+            iterations: k-means rounds
+            seed: Random seed
+            train_size: Vectors sampled for k-means (default: 64 per cell)
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        ids = np.asarray(ids, dtype=np.int64)
+        n_lists = n_lists or max(1, int(np.sqrt(len(vectors))))
+        train_size = train_size or 64 * n_lists
+        
+        rng = np.random.default_rng(seed)
+        sample = vectors
+        if len(vectors) > train_size:
+            sample = vectors[rng.choice(len(vectors), train_size, replace=False)]
+        centroids = kmeans(sample, n_lists, iterations=iterations, seed=seed)
+        
+        assignments = assign(vectors, centroids)
+        order = np.argsort(assignments, kind='stable')
+        counts = np.bincount(assignments, minlength=len(centroids))
+        list_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        return cls(centroids, list_offsets, ids[order], vectors[order], n_probe=n_probe)
+    
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+    
+    def __len__(self):
+        return len(self.ids)
+    
+    def search(self, queries, k=10, n_probe=None):
+        """
+        Approximate top-k inner product search.
+        
+        Args:
+            queries: (m, dim) or (dim,) query vectors
+            k: Results per query
+            n_probe: Cells scored per query (default: self.n_probe)
+        
+        Returns:
+            Tuple of (ids, scores) shaped (m, k), padded with -1 / -inf
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+        
+        coarse = queries @ self.centroids.T
+        if n_probe < self.n_lists:
+            probes = np.argpartition(-coarse, n_probe - 1, axis=1)[:, :n_probe]
+        else:
+            probes = np.tile(np.arange(self.n_lists), (len(queries), 1))
+        
+        result_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        result_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        offsets = self.list_offsets
+        for row, query in enumerate(queries):
+            rows = np.concatenate([
+                np.arange(offsets[cell], offsets[cell + 1]) for cell in probes[row]
+            ])
+            if not len(rows):
+                continue
+            scores = self.vectors[rows] @ query
+            top = _top_k(scores, k)
+            result_ids[row, :len(top)] = self.ids[rows[top]]
+            result_scores[row, :len(top)] = scores[top]
+        return result_ids, result_scores
+    
+    def to_arrays(self, prefix=''):
+        """Arrays for ModelStore.publish, optionally prefixed."""
+        return {f'{prefix}{name}': getattr(self, name) for name in ARRAY_NAMES}
+    
+    @classmethod
+    def from_arrays(cls, arrays, prefix='', n_probe=8):
+        """Rebuild an index from to_arrays() output or a LoadedModel."""
+        return cls(*(arrays[f'{prefix}{name}'] for name in ARRAY_NAMES), n_probe=n_probe)
+    
+    def save(self, path):
+        """Write the index as .npy files under path."""
+        os.makedirs(path, exist_ok=True)
+        for name, array in self.to_arrays().items():
+            np.save(os.path.join(path, f'{name}.npy'), array)
+    
+    @classmethod
+    def load(cls, path, n_probe=8, mmap=True):
+        """Load an index written by save(), memory-mapped by default."""
+        mode = 'r' if mmap else None
+        arrays = {
+            name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mode)
+            for name in ARRAY_NAMES
+        }
+        return cls.from_arrays(arrays, n_probe=n_probe)
@@ -0,0 +1,409 @@
+"""
+Content-based movie similarity from genres and overview text.
+
+Each movie becomes a sparse vector that combines a multi-hot genre part and a
+hashed TF-IDF part over its overview. Both parts are L2-normalised
+separately, blended with RECOMMENDER_CONTENT_GENRE_WEIGHT and normalised
+again, so cosine similarity is a plain dot product. Features are hashed
+with crc32 into RECOMMENDER_CONTENT_DIM buckets, so no vocabulary or
+external model is needed and vectors are stable across processes.
+"""
+import re
+import math
+import zlib
+import logging
+import threading
+import numpy as np
+from scipy import sparse
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.dispatch import receiver
+
+from ..models import Movie
+from ..signals import movies_ingested
+from .index import NeighborIndex
+from .similarity import top_k_per_row
+from .store import ModelStore
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+STOP_WORDS = frozenset(
+    'a an and are as at be but by for from has have he her his in into is it its '
+    'of on or she that the their them they this to was were when where which who '
+    'will with after before while about over than then there these those'.split()
+)
+UPDATE_LOCK_KEY = 'content_index_update_lock'
+UPDATE_LOCK_TIMEOUT = 60 * 10
+
+content_store = ModelStore('content')
+
+
+def tokenize(text):
+    """Lowercase word tokens of text without stop words or single characters."""
+    return [
+        token for token in TOKEN_RE.findall((text or '').lower())
+        if len(token) > 1 and token not in STOP_WORDS
+    ]
+
+
+def _bucket(feature, dim):
+    return zlib.crc32(feature.encode('utf-8')) % dim
+
+
+class ContentVectorizer:
+    """
+    Hashed genre + TF-IDF vectorizer whose document frequencies can grow.
+    
+    Args:
+        dim: Number of hash buckets
+        genre_weight: Weight of the genre part relative to the text part
+        df: Document frequency per bucket, or None to start empty
+        n_docs: Number of documents counted in df
+    """
+    
+    def __init__(self, dim=None, genre_weight=None, df=None, n_docs=0):
+        self.dim = dim or settings.RECOMMENDER_CONTENT_DIM
+        self.genre_weight = (
+            genre_weight if genre_weight is not None else settings.RECOMMENDER_CONTENT_GENRE_WEIGHT
+        )
+        self.df = np.zeros(self.dim, dtype=np.float32) if df is None else np.array(df, dtype=np.float32)
+        self.n_docs = n_docs
+    
+    def _text_buckets(self, overview):
+        counts = {}
+        for token in tokenize(overview):
+            column = _bucket(f'w:{token}', self.dim)
+            counts[column] = counts.get(column, 0) + 1
+        return counts
+    
+    def partial_fit(self, docs):
+        """
+        Add document frequencies for docs.
+        
+        Args:
+            docs: Iterable of (genre_ids, overview)
+        """
+        for _, overview in docs:
+            columns = list(self._text_buckets(overview))
+            self.df[columns] += 1
+            self.n_docs += 1
+        return self
+    
+    def transform(self, docs):
+        """
+        Vectorize docs with the current document frequencies.
+        
+        Args:
+            docs: Sequence of (genre_ids, overview)
+        
+        Returns:
+            L2-normalised csr_matrix of shape (len(docs), dim), float32
+        """
+        rows, cols, values = [], [], []
+        for row, (genre_ids, overview) in enumerate(docs):
+            genre_columns = sorted({_bucket(f'g:{genre}', self.dim) for genre in genre_ids or []})
+            if genre_columns:
+                weight = self.genre_weight / math.sqrt(len(genre_columns))
+                rows.extend([row] * len(genre_columns))
+                cols.extend(genre_columns)
+                values.extend([weight] * len(genre_columns))
+            
+            counts = self._text_buckets(overview)
+            if counts:
+                text_cols = np.fromiter(counts, dtype=np.int64, count=len(counts))
+                tf = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+                idf = np.log((1.0 + self.n_docs) / (1.0 + self.df[text_cols])) + 1.0
+                weights = tf * idf
+                weights /= np.linalg.norm(weights)
+                rows.extend([row] * len(text_cols))
+                cols.extend(text_cols.tolist())
+                values.extend(weights.tolist())
+        
+        matrix = sparse.csr_matrix(
+            (np.asarray(values, dtype=np.float32), (rows, cols)),
+            shape=(len(docs), self.dim),
+            dtype=np.float32,
+        )
+        matrix.sum_duplicates()
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1))).ravel()
+        norms[norms == 0] = 1.0
+        return (sparse.diags(1.0 / norms) @ matrix).tocsr().astype(np.float32)
+
+
+def content_neighbors(queries, matrix, top_k, self_offset=None, chunk_size=1000):
+    """
+    Top-K cosine neighbours of each query row among the rows of matrix.
+    
+    Args:
+        queries: csr_matrix of normalised query vectors
+        matrix: csr_matrix of normalised vectors to search
+        top_k: Neighbours kept per query
+        self_offset: Row of matrix matching queries[0] when the queries are
+            part of matrix, so each query's own row is skipped
+        chunk_size: Query rows multiplied at once
+    
+    Returns:
+        Tuple of (rows, scores) shaped (n_queries, top_k), rows indexing matrix
+    """
+    transposed = matrix.T.tocsc()
+    neighbor_blocks, score_blocks = [], []
+    for start in range(0, queries.shape[0], chunk_size):
+        similarity = (queries[start:start + chunk_size] @ transposed).tocoo()
+        keep = similarity.data > 0
+        if self_offset is not None:
+            keep &= similarity.col != similarity.row + self_offset + start
+        similarity = sparse.csr_matrix(
+            (similarity.data[keep], (similarity.row[keep], similarity.col[keep])),
+            shape=similarity.shape,
+        )
+        neighbors, scores = top_k_per_row(similarity, top_k)
+        neighbor_blocks.append(neighbors)
+        score_blocks.append(scores)
+    if not neighbor_blocks:
+        return np.zeros((0, top_k), dtype=np.int32), np.zeros((0, top_k), dtype=np.float32)
+    return np.vstack(neighbor_blocks), np.vstack(score_blocks)
+
+
+class ContentIndex(NeighborIndex):
+    """
+    Content neighbours for indexed movies plus on-the-fly scoring of others.
+    """
+    
+    ARRAYS = NeighborIndex.ARRAYS + ('indptr', 'indices', 'data', 'df')
+    
+    def __init__(self, movie_ids, neighbor_ids, scores, indptr, indices, data, df,
+                 version=None, meta=None):
+        super().__init__(movie_ids, neighbor_ids, scores, version=version)
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.df = df
+        self.meta = meta or {}
+        self._matrix = None
+    
+    @classmethod
+    def from_model(cls, model):
+        return cls(*(model[name] for name in cls.ARRAYS), version=model.version, meta=model.meta)
+    
+    @property
+    def matrix(self):
+        if self._matrix is None:
+            self._matrix = sparse.csr_matrix(
+                (self.data, self.indices, self.indptr),
+                shape=(len(self.movie_ids), self.meta['dim']),
+            )
+        return self._matrix
+    
+    def vectorizer(self):
+        return ContentVectorizer(
+            dim=self.meta['dim'],
+            genre_weight=self.meta['genre_weight'],
+            df=self.df,
+            n_docs=self.meta['n_docs'],
+        )
+    
+    def similar_to(self, movie, limit=10):
+        """
+        Score a movie that is not in the index yet against every indexed movie.
+        
+        Args:
+            movie: Movie instance
+            limit: Maximum neighbours returned
+        
+        Returns:
+            [(movie_id, score), ...] most similar first
+        """
+        query = self.vectorizer().transform([(movie.genre_ids, movie.overview)])
+        neighbors, scores = content_neighbors(query, self.matrix, limit)
+        valid = neighbors[0] >= 0
+        ids = self.movie_ids[neighbors[0][valid]]
+        return [
+            (movie_id, score)
+            for movie_id, score in zip(ids.tolist(), scores[0][valid].tolist())
+            if movie_id != movie.pk
+        ]
+
+
+def _load_docs(queryset, chunk_size=2000):
+    ids, docs = [], []
+    rows = queryset.order_by('pk').values_list('pk', 'genre_ids', 'overview')
+    for movie_id, genre_ids, overview in rows.iterator(chunk_size=chunk_size):
+        ids.append(movie_id)
+        docs.append((genre_ids, overview))
+    return np.asarray(ids, dtype=np.int64), docs
+
+
+def _publish(movie_ids, neighbor_ids, scores, matrix, vectorizer, top_k):
+    return content_store.publish(
+        {
+            'movie_ids': movie_ids,
+            'neighbor_ids': neighbor_ids,
+            'scores': scores,
+            'indptr': matrix.indptr.astype(np.int64),
+            'indices': matrix.indices.astype(np.int32),
+            'data': matrix.data.astype(np.float32),
+            'df': vectorizer.df,
+        },
+        {
+            'dim': vectorizer.dim,
+            'genre_weight': vectorizer.genre_weight,
+            'n_docs': vectorizer.n_docs,
+            'top_k': top_k,
+        },
+    )
+
+
+def build_content_index(top_k=None):
+    """
+    Vectorize every movie, compute top-K neighbours and publish a new version.
+    
+    Returns:
+        The published version
+    """
+    top_k = top_k or settings.RECOMMENDER_TOP_K
+    movie_ids, docs = _load_docs(Movie.objects.all())
+    vectorizer = ContentVectorizer().partial_fit(docs)
+    matrix = vectorizer.transform(docs)
+    neighbors, scores = content_neighbors(matrix, matrix, top_k, self_offset=0)
+    neighbor_ids = np.where(neighbors >= 0, movie_ids[neighbors] if len(movie_ids) else -1, -1)
+    return _publish(movie_ids, neighbor_ids.astype(np.int64), scores, matrix, vectorizer, top_k)
+
+
+def update_content_index():
+    """
+    Fold movies created since the last build into the content index.
+    
+    New movies are vectorized with the updated document frequencies and get
+    their own top-K lists; existing movies only have their lists merged
+    with the new candidates, so the cost grows with the number of new movies
+    rather than the catalog squared. Existing vectors keep the IDF weights
+    they were built with until the next full build.
+    
+    Returns:
+        The published version, or None if there was nothing to add
+    """
+    index = get_content_index()
+    if index is None:
+        return build_content_index()
+    
+    max_indexed = int(index.movie_ids[-1]) if len(index.movie_ids) else 0
+    new_ids, docs = _load_docs(Movie.objects.filter(pk__gt=max_indexed))
+    if not len(new_ids):
+        return None
+    
+    top_k = index.meta['top_k']
+    n_old = len(index.movie_ids)
+    vectorizer = index.vectorizer().partial_fit(docs)
+    new_matrix = vectorizer.transform(docs)
+    matrix = sparse.vstack([index.matrix, new_matrix]).tocsr()
+    movie_ids = np.concatenate([np.asarray(index.movie_ids), new_ids])
+    
+    new_neighbors, new_scores = content_neighbors(new_matrix, matrix, top_k, self_offset=n_old)
+    new_neighbor_ids = np.where(new_neighbors >= 0, movie_ids[new_neighbors], -1)
+    
+    old_neighbor_ids = np.array(index.neighbor_ids)
+    old_scores = np.array(index.scores)
+    cross = (index.matrix @ new_matrix.T).tocsr()
+    for row in np.flatnonzero(np.diff(cross.indptr)):
+        start, end = cross.indptr[row], cross.indptr[row + 1]
+        ids = np.concatenate([old_neighbor_ids[row], new_ids[cross.indices[start:end]]])
+        scores = np.concatenate([old_scores[row], cross.data[start:end]])
+        order = np.argsort(-scores, kind='stable')[:top_k]
+        old_neighbor_ids[row] = np.where(scores[order] > 0, ids[order], -1)
+        old_scores[row] = np.where(scores[order] > 0, scores[order], 0)
+    
+    return _publish(
+        movie_ids,
+        np.vstack([old_neighbor_ids, new_neighbor_ids]).astype(np.int64),
+        np.vstack([old_scores, new_scores]).astype(np.float32),
+        matrix,
+        vectorizer,
+        top_k,
+    )
+
+
+_cached = (None, None)
+
+
+def get_content_index():
+    """Return the content index served by this process, or None if none was built."""
+    global _cached
+    
+    model = content_store.get()
+    if model is None:
+        return None
+    cached_model, index = _cached
+    if cached_model is not model:
+        index = ContentIndex.from_model(model)
+        _cached = (model, index)
+    return index
+
+
+_timer_lock = threading.Lock()
+_timer = None
+
+
+@receiver(movies_ingested, dispatch_uid='content_index_update')
+def schedule_content_update(sender, movies, **kwargs):
+    """
+    Fold newly ingested movies into the content index after a short delay.
+    
+    Every update republishes the whole index, so ingestion bursts are
+    coalesced: the first trigger takes a shared lock and starts a daemon
+    timer for RECOMMENDER_CONTENT_UPDATE_DELAY seconds, and triggers from
+    any worker while it is pending are dropped, since the update will pick
+    their movies up.
+    """
+    global _timer
+    
+    if not settings.RECOMMENDER_CONTENT_AUTO_UPDATE:
+        return
+    index = get_content_index()
+    if index is None or not len(index.movie_ids):
+        return
+    max_indexed = int(index.movie_ids[-1])
+    if all(movie.pk <= max_indexed for movie in movies):
+        return
+    delay = settings.RECOMMENDER_CONTENT_UPDATE_DELAY
+    if not cache.add(UPDATE_LOCK_KEY, True, delay + UPDATE_LOCK_TIMEOUT):
+        return
+    
+    with _timer_lock:
+        _timer = threading.Timer(delay, _run_scheduled_update)
+        _timer.daemon = True
+        _timer.start()
+
+
+def _run_scheduled_update():
+    try:
+        run_content_update()
+    finally:
+        close_old_connections()
+
+
+def run_content_update():
+    """
+    Run this process's pending content index update now, if it has one.
+    
+    Management commands that ingest call this before exiting, since the
+    daemon timer would not outlive them.
+    
+    Returns:
+        The published version, or None
+    """
+    global _timer
+    
+    with _timer_lock:
+        timer, _timer = _timer, None
+    if timer is None:
+        return None
+    timer.cancel()
+    try:
+        return update_content_index()
+    except Exception as e:
+        logger.error(f"Content index update failed: {str(e)}")
+        return None
+    finally:
+        cache.delete(UPDATE_LOCK_KEY)
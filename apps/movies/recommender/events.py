@@ -0,0 +1,260 @@
+"""
+Incremental recommendation updates from rating and favorite events.
+
+Rating and favorite writes append an InteractionEvent and immediately drop
+the user's cached "for you" ranking and taste profile. update_recommendations
+then folds
+unprocessed events in batches: for every user with new events it compares
+the user's current history with the last folded UserTasteProfile and applies
+only the difference to MovieCooccurrence, so the work per event is bounded
+by the user's history rather than the whole dataset. Folded events are
+deleted once they are RECOMMENDER_EVENT_RETENTION seconds old.
+"""
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from ..models import (
+    InteractionEvent,
+    Movie,
+    MovieCooccurrence,
+    MovieRating,
+    UserFavoriteMovie,
+    UserTasteProfile,
+)
+from .personalized import (
+    genre_profile,
+    invalidate_for_you,
+    invalidate_history,
+    taste_profile_cache_key,
+    user_histories,
+)
+
+logger = logging.getLogger(__name__)
+
+UPDATER_LOCK_KEY = 'recommendation_updater_lock'
+
+
+def record_events(events):
+    """
+    Append events and drop the affected users' cached rankings.
+    
+    Args:
+        events: Iterable of (user_id, movie_id, kind, rating)
+    """
+    rows = [
+        InteractionEvent(user_id=user_id, movie_id=movie_id, kind=kind, rating=rating)
+        for user_id, movie_id, kind, rating in events
+    ]
+    InteractionEvent.objects.bulk_create(rows)
+    
+    def invalidate():
+        for user_id in {row.user_id for row in rows}:
+            invalidate_history(user_id)
+    
+    # After commit, so a concurrent request cannot re-cache the old ranking
+    transaction.on_commit(invalidate)
+
+
+def _is_cascade(sender, origin):
+    """
+    True when a post_delete comes from deleting a user or movie.
+    
+    The cascaded user or movie row is about to disappear, so an event
+    pointing at it would fail its foreign key at commit. Its co-occurrence
+    contribution is left for update_recommendations --rebuild.
+    """
+    if origin is None:
+        return False
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model is not sender
+
+
+@receiver(post_save, sender=MovieRating, dispatch_uid='rating_saved_event')
+def rating_saved(sender, instance, **kwargs):
+    record_events([(instance.user_id, instance.movie_id, InteractionEvent.RATING, instance.rating)])
+
+
+@receiver(post_delete, sender=MovieRating, dispatch_uid='rating_deleted_event')
+def rating_deleted(sender, instance, origin=None, **kwargs):
+    if _is_cascade(sender, origin):
+        return
+    record_events([(instance.user_id, instance.movie_id, InteractionEvent.RATING_REMOVED, None)])
+
+
+@receiver(post_save, sender=UserFavoriteMovie, dispatch_uid='favorite_saved_event')
+def favorite_saved(sender, instance, created, **kwargs):
+    if created:
+        record_events([(instance.user_id, instance.movie_id, InteractionEvent.FAVORITE, None)])
+
+
+@receiver(post_delete, sender=UserFavoriteMovie, dispatch_uid='favorite_deleted_event')
+def favorite_deleted(sender, instance, origin=None, **kwargs):
+    if _is_cascade(sender, origin):
+        return
+    record_events([(instance.user_id, instance.movie_id, InteractionEvent.FAVORITE_REMOVED, None)])
+
+
+def _pair(a, b):
+    return (a, b) if a <= b else (b, a)
+
+
+def _pair_deltas(before, after):
+    """
+    Co-occurrence changes when a user's liked set goes from before to after.
+    
+    Every pair inside after gains one and every pair inside before loses
+    one; pairs in both cancel out, so only pairs touching an added or
+    removed movie are visited. The diagonal counts the movie itself.
+    """
+    deltas = {}
+    for liked, changed, step in ((after, after - before, 1), (before, before - after, -1)):
+        for movie_id in changed:
+            for other_id in liked:
+                # Visit pairs of two changed movies once
+                if other_id in changed and other_id < movie_id:
+                    continue
+                pair = _pair(movie_id, other_id)
+                deltas[pair] = deltas.get(pair, 0) + step
+    return {pair: delta for pair, delta in deltas.items() if delta}
+
+
+def _apply_deltas(deltas):
+    """Add deltas to MovieCooccurrence, creating and deleting rows as needed."""
+    if not deltas:
+        return
+    firsts = {a for a, _ in deltas}
+    seconds = {b for _, b in deltas}
+    existing = {
+        (row.movie_a_id, row.movie_b_id): row
+        for row in MovieCooccurrence.objects.filter(movie_a_id__in=firsts, movie_b_id__in=seconds)
+    }
+    
+    to_update, to_create, to_delete = [], [], []
+    for pair, delta in deltas.items():
+        row = existing.get(pair)
+        if row is None:
+            if delta > 0:
+                to_create.append(MovieCooccurrence(movie_a_id=pair[0], movie_b_id=pair[1], count=delta))
+            continue
+        row.count += delta
+        if row.count > 0:
+            to_update.append(row)
+        else:
+            to_delete.append(row.pk)
+    
+    MovieCooccurrence.objects.bulk_update(to_update, ['count'], batch_size=500)
+    MovieCooccurrence.objects.bulk_create(to_create, batch_size=500)
+    MovieCooccurrence.objects.filter(pk__in=to_delete).delete()
+
+
+def fold_users(user_ids):
+    """
+    Bring co-occurrence counts and taste profiles up to date for users.
+    
+    Returns:
+        Number of co-occurrence pairs changed
+    """
+    user_ids = list(user_ids)
+    histories = user_histories(user_ids)
+    profiles = UserTasteProfile.objects.in_bulk(user_ids)
+    
+    movie_ids = {movie_id for history in histories.values() for movie_id in history}
+    genres_by_id = dict(Movie.objects.filter(pk__in=movie_ids).values_list('pk', 'genre_ids'))
+    
+    deltas = {}
+    updated_profiles = []
+    for user_id, history in histories.items():
+        previous = profiles.get(user_id)
+        before = {
+            int(movie_id) for movie_id, weight in (previous.history if previous else {}).items()
+            if weight > 0
+        }
+        after = {movie_id for movie_id, weight in history.items() if weight > 0}
+        for pair, delta in _pair_deltas(before, after).items():
+            deltas[pair] = deltas.get(pair, 0) + delta
+        
+        updated_profiles.append(UserTasteProfile(
+            user_id=user_id,
+            history={str(movie_id): weight for movie_id, weight in history.items()},
+            genres={str(genre): weight for genre, weight in genre_profile(history, genres_by_id).items()},
+        ))
+    
+    _apply_deltas({pair: delta for pair, delta in deltas.items() if delta})
+    UserTasteProfile.objects.bulk_create(
+        updated_profiles,
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=['history', 'genres', 'updated_at'],
+    )
+    
+    for profile in updated_profiles:
+        cache.set(
+            taste_profile_cache_key(profile.user_id),
+            {'history': profile.history, 'genres': profile.genres},
+            settings.RECOMMENDER_FOR_YOU_TTL,
+        )
+        invalidate_for_you(profile.user_id)
+    return len(deltas)
+
+
+def process_events(batch_size=1000):
+    """
+    Fold up to batch_size unprocessed events.
+    
+    Returns:
+        Number of events processed
+    """
+    with transaction.atomic():
+        events = list(
+            InteractionEvent.objects.filter(processed=False)
+            .order_by('id').values_list('id', 'user_id')[:batch_size]
+        )
+        if not events:
+            return 0
+        fold_users({user_id for _, user_id in events})
+        InteractionEvent.objects.filter(pk__in=[event_id for event_id, _ in events]).update(processed=True)
+    return len(events)
+
+
+def purge_processed_events(retention=None):
+    """
+    Delete folded events older than retention seconds.
+    
+    Args:
+        retention: Seconds to keep folded events (default:
+            RECOMMENDER_EVENT_RETENTION); 0 deletes all of them
+    
+    Returns:
+        Number of events deleted
+    """
+    retention = settings.RECOMMENDER_EVENT_RETENTION if retention is None else retention
+    cutoff = timezone.now() - timedelta(seconds=retention)
+    deleted, _ = InteractionEvent.objects.filter(processed=True, created_at__lt=cutoff).delete()
+    return deleted
+
+
+def rebuild_all(batch_size=1000):
+    """
+    Recompute co-occurrence counts and profiles for every user from scratch.
+    
+    Returns:
+        Number of users folded
+    """
+    user_ids = set(MovieRating.objects.values_list('user_id', flat=True).distinct())
+    user_ids.update(UserFavoriteMovie.objects.values_list('user_id', flat=True).distinct())
+    user_ids = sorted(user_ids)
+    
+    with transaction.atomic():
+        MovieCooccurrence.objects.all().delete()
+        UserTasteProfile.objects.all().delete()
+        for start in range(0, len(user_ids), batch_size):
+            fold_users(user_ids[start:start + batch_size])
+        InteractionEvent.objects.filter(processed=False).update(processed=True)
+    return len(user_ids)
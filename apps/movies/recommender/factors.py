@@ -0,0 +1,122 @@
+"""
+Serving side of the ALS model published by train_recommender.
+
+A user's affinity for a movie is the inner product of their factor rows.
+Explicit models are fitted around the global rating mean, so a positive
+score means "predicted above average"; implicit models give a preference
+strength. Either way only the ordering matters for ranking.
+
+When train_recommender also published an IVF index over the item factors
+(catalogs of at least RECOMMENDER_ANN_MIN_ITEMS movies), top-item queries
+probe RECOMMENDER_ANN_NPROBE cells of it instead of scoring every movie.
+"""
+import numpy as np
+from django.conf import settings
+
+from .ann import IVFIndex, exact_search
+from .store import als_store, lookup
+
+
+class FactorModel:
+    """
+    ALS user and item factors keyed by primary key.
+    
+    user_ids and movie_ids are sorted, so finding a factor row is one
+    binary search. The arrays may be read-only memory maps from the store.
+    ann, when present, is an IVFIndex whose ids are rows of item_factors.
+    """
+    
+    ARRAYS = ('user_ids', 'movie_ids', 'user_factors', 'item_factors')
+    ANN_PREFIX = 'ann_'
+    
+    def __init__(self, user_ids, movie_ids, user_factors, item_factors, version=None, ann=None):
+        self.user_ids = user_ids
+        self.movie_ids = movie_ids
+        self.user_factors = user_factors
+        self.item_factors = item_factors
+        self.version = version
+        self.ann = ann
+    
+    @classmethod
+    def from_model(cls, model):
+        """Wrap a LoadedModel from the model store, with its ANN index if it has one."""
+        ann = None
+        if f'{cls.ANN_PREFIX}centroids' in model.arrays:
+            ann = IVFIndex.from_arrays(
+                model.arrays, prefix=cls.ANN_PREFIX, n_probe=settings.RECOMMENDER_ANN_NPROBE
+            )
+        return cls(*(model[name] for name in cls.ARRAYS), version=model.version, ann=ann)
+    
+    def user_vector(self, user_id):
+        """Factor row of a user, or None if the model has not seen them."""
+        position = int(lookup(self.user_ids, user_id))
+        return self.user_factors[position] if position >= 0 else None
+    
+    def scores(self, user_id, movie_ids):
+        """
+        Predicted affinity of a user for movies.
+        
+        Args:
+            user_id: User primary key
+            movie_ids: Movie primary keys to score
+        
+        Returns:
+            {movie_id: score} for the movies the model knows, empty when it
+            does not know the user
+        """
+        vector = self.user_vector(user_id)
+        movie_ids = np.asarray(list(movie_ids), dtype=np.int64)
+        if vector is None or not len(movie_ids):
+            return {}
+        positions = lookup(self.movie_ids, movie_ids)
+        known = positions >= 0
+        scores = self.item_factors[positions[known]] @ vector
+        return dict(zip(movie_ids[known].tolist(), scores.tolist()))
+    
+    def recommend(self, user_id, limit):
+        """
+        Movies with the highest predicted affinity for a user.
+        
+        Returns:
+            [(movie_id, score), ...] best first, empty for unknown users
+        """
+        vector = self.user_vector(user_id)
+        if vector is None or not len(self.movie_ids):
+            return []
+        return self.top_items(vector, limit)
+    
+    def top_items(self, query, limit):
+        """
+        Movies whose item factors have the largest inner product with query.
+        
+        Uses the ANN index when the model has one, otherwise an exact scan.
+        
+        Returns:
+            [(movie_id, score), ...] best first
+        """
+        if self.ann is not None:
+            rows, scores = self.ann.search(query, limit)
+            valid = rows[0] >= 0
+            ids = np.asarray(self.movie_ids)[rows[0][valid]]
+        else:
+            ids, scores = exact_search(self.item_factors, np.asarray(self.movie_ids), query[None, :], limit)
+            valid = ids[0] >= 0
+            ids = ids[0][valid]
+        return list(zip(ids.tolist(), scores[0][valid].tolist()))
+
+
+_cached = (None, None)
+
+
+def get_factor_model():
+    """Return the ALS model served by this process, or None if none was trained."""
+    global _cached
+    
+    model = als_store.get()
+    if model is None:
+        return None
+    cached_model, factors = _cached
+    if cached_model is not model:
+        factors = FactorModel.from_model(model)
+        _cached = (model, factors)
+    return factors
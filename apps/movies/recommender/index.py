@@ -0,0 +1,93 @@
+"""
+Precomputed item-item neighbour index.
+"""
+import numpy as np
+
+from .store import lookup, neighbor_store
+
+
+class NeighborIndex:
+    """
+    Top-K similar movies for every movie, keyed by Movie primary key.
+    
+    movie_ids is sorted so a lookup is one binary search plus a row slice.
+    neighbor_ids holds Movie primary keys padded with -1. The arrays may be
+    read-only memory maps from the model store.
+    """
+    
+    ARRAYS = ('movie_ids', 'neighbor_ids', 'scores')
+    
+    def __init__(self, movie_ids, neighbor_ids, scores, version=None):
+        self.movie_ids = movie_ids
+        self.neighbor_ids = neighbor_ids
+        self.scores = scores
+        self.version = version
+    
+    @classmethod
+    def from_matrix(cls, movie_ids, neighbors, scores):
+        """
+        Build an index from column-indexed neighbours.
+        
+        Args:
+            movie_ids: Sorted Movie primary keys, one per matrix column
+            neighbors: Column indices from item_item_neighbors
+            scores: Similarity scores from item_item_neighbors
+        """
+        neighbor_ids = np.where(neighbors >= 0, movie_ids[neighbors], -1).astype(np.int64)
+        return cls(np.asarray(movie_ids, dtype=np.int64), neighbor_ids, scores.astype(np.float32))
+    
+    @classmethod
+    def from_model(cls, model):
+        """Wrap a LoadedModel from the model store."""
+        return cls(*(model[name] for name in cls.ARRAYS), version=model.version)
+    
+    def to_arrays(self):
+        return {name: getattr(self, name) for name in self.ARRAYS}
+    
+    def __len__(self):
+        return len(self.movie_ids)
+    
+    def __contains__(self, movie_id):
+        return self._row(movie_id) is not None
+    
+    def _row(self, movie_id):
+        position = int(lookup(self.movie_ids, movie_id))
+        return position if position >= 0 else None
+    
+    def neighbors(self, movie_id, limit=None):
+        """
+        Return [(movie_id, score), ...] most similar first.
+        
+        Args:
+            movie_id: Movie primary key
+            limit: Maximum neighbours returned
+        """
+        row = self._row(movie_id)
+        if row is None:
+            return []
+        ids = self.neighbor_ids[row, :limit]
+        scores = self.scores[row, :limit]
+        valid = ids >= 0
+        return list(zip(ids[valid].tolist(), scores[valid].tolist()))
+
+
+_cached = (None, None)
+
+
+def get_neighbor_index():
+    """
+    Return the neighbour index served by this process, or None if none was built.
+    
+    Follows the model store, so a newly published index is picked up
+    without restarting the worker.
+    """
+    global _cached
+    
+    model = neighbor_store.get()
+    if model is None:
+        return None
+    cached_model, index = _cached
+    if cached_model is not model:
+        index = NeighborIndex.from_model(model)
+        _cached = (model, index)
+    return index
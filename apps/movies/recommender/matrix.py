@@ -0,0 +1,61 @@
+"""
+Sparse user x movie interaction matrix from ratings and favorites.
+"""
+import numpy as np
+from scipy import sparse
+from django.conf import settings
+
+from ..models import MovieRating, UserFavoriteMovie
+
+
+def build_interaction_matrix(chunk_size=10000):
+    """
+    Build a user x movie matrix of interaction strengths.
+    
+    A rating contributes rating / 10 and a favorite contributes
+    RECOMMENDER_FAVORITE_WEIGHT; where a user both rated and favorited a
+    movie the stronger signal wins.
+    
+    Args:
+        chunk_size: Rows fetched per database round trip
+    
+    Returns:
+        Tuple of (csr_matrix, user_ids, movie_ids), where user_ids and
+        movie_ids are sorted int64 arrays mapping rows and columns to primary keys
+    """
+    ratings = MovieRating.objects.order_by().values_list('user_id', 'movie_id', 'rating')
+    favorites = UserFavoriteMovie.objects.order_by().values_list('user_id', 'movie_id')
+    
+    users, movies, values = [], [], []
+    for user_id, movie_id, rating in ratings.iterator(chunk_size=chunk_size):
+        users.append(user_id)
+        movies.append(movie_id)
+        values.append(rating / 10.0)
+    
+    favorite_weight = settings.RECOMMENDER_FAVORITE_WEIGHT
+    for user_id, movie_id in favorites.iterator(chunk_size=chunk_size):
+        users.append(user_id)
+        movies.append(movie_id)
+        values.append(favorite_weight)
+    
+    users = np.asarray(users, dtype=np.int64)
+    movies = np.asarray(movies, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float32)
+    
+    user_ids, rows = np.unique(users, return_inverse=True)
+    movie_ids, cols = np.unique(movies, return_inverse=True)
+    
+    # Keep the strongest signal per (user, movie): sort by value and let
+    # later duplicates win when converting from COO.
+    order = np.argsort(values, kind='stable')
+    rows, cols, values = rows[order], cols[order], values[order]
+    keys = rows * max(len(movie_ids), 1) + cols
+    _, last = np.unique(keys[::-1], return_index=True)
+    keep = len(keys) - 1 - last
+    
+    matrix = sparse.csr_matrix(
+        (values[keep], (rows[keep], cols[keep])),
+        shape=(len(user_ids), len(movie_ids)),
+        dtype=np.float32,
+    )
+    return matrix, user_ids, movie_ids
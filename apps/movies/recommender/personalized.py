@@ -0,0 +1,296 @@
+"""
+Personalized "for you" ranking from a user's ratings and favorites.
+"""
+import math
+import logging
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from ..ingestion import ingest_page
+from ..models import Movie, MovieCooccurrence, MovieRating, UserFavoriteMovie
+from ..tmdb_client import get_tmdb_client
+from .factors import get_factor_model
+from .index import get_neighbor_index
+
+logger = logging.getLogger(__name__)
+
+
+def for_you_cache_key(user_id):
+    return f"for_you_{user_id}"
+
+
+def invalidate_for_you(user_id):
+    """Drop a user's cached ranking after their history changes."""
+    cache.delete(for_you_cache_key(user_id))
+
+
+def taste_profile_cache_key(user_id):
+    return f"taste_profile_{user_id}"
+
+
+def get_taste_profile(user_id):
+    """Cached {'history': ..., 'genres': ...} folded by the updater, or None."""
+    return cache.get(taste_profile_cache_key(user_id))
+
+
+def invalidate_history(user_id):
+    """
+    Drop a user's cached ranking and taste profile after their history changes.
+    
+    The profile comes back on the updater's next fold, so a cached profile
+    is always current up to the events not yet folded.
+    """
+    cache.delete_many([for_you_cache_key(user_id), taste_profile_cache_key(user_id)])
+
+
+def _latest_per_user(queryset, user_ids, order_field, limit, fields):
+    """
+    Rows of queryset for user_ids, at most limit per user by descending order_field.
+    
+    A single user is a plain ORDER BY ... LIMIT; batches rank rows per user
+    with ROW_NUMBER() so the limit is still applied by the database.
+    """
+    queryset = queryset.filter(user_id__in=user_ids)
+    if len(user_ids) == 1:
+        return queryset.order_by(f'-{order_field}').values_list(*fields)[:limit]
+    return queryset.annotate(
+        recency=Window(RowNumber(), partition_by=[F('user_id')], order_by=F(order_field).desc())
+    ).filter(recency__lte=limit).values_list(*fields)
+
+
+def user_histories(user_ids):
+    """
+    Return {user_id: {movie_id: weight}} for users' most recent ratings and favorites.
+    
+    Ratings are centred so 1-4 push away from similar movies and 6-10 pull
+    towards them; a favorite counts as RECOMMENDER_FAVORITE_WEIGHT. Each
+    user keeps at most RECOMMENDER_FOR_YOU_HISTORY ratings and favorites.
+    """
+    limit = settings.RECOMMENDER_FOR_YOU_HISTORY
+    histories = {user_id: {} for user_id in user_ids}
+    
+    ratings = _latest_per_user(
+        MovieRating.objects.all(), list(histories), 'updated_at', limit, ('user_id', 'movie_id', 'rating')
+    )
+    for user_id, movie_id, rating in ratings:
+        histories[user_id][movie_id] = (rating - 5) / 5.0
+    
+    favorite_weight = settings.RECOMMENDER_FAVORITE_WEIGHT
+    favorites = _latest_per_user(
+        UserFavoriteMovie.objects.all(), list(histories), 'created_at', limit, ('user_id', 'movie_id')
+    )
+    for user_id, movie_id in favorites:
+        history = histories[user_id]
+        history[movie_id] = max(history.get(movie_id, favorite_weight), favorite_weight)
+    return histories
+
+
+def user_history(user):
+    """Return {movie_id: weight} for one user; see user_histories."""
+    return user_histories([user.pk])[user.pk]
+
+
+def genre_profile(history, genres_by_id):
+    """Sum of history weights per genre id."""
+    profile = {}
+    for movie_id, weight in history.items():
+        for genre in genres_by_id.get(movie_id) or []:
+            profile[genre] = profile.get(genre, 0.0) + weight
+    return profile
+
+
+def _tmdb_candidates():
+    """Movie ids from the first trending and popular pages, cached by TMDbClient."""
+    client = get_tmdb_client()
+    movie_ids = []
+    for data in (client.get_trending_movies('week', 1), client.get_popular_movies(1)):
+        if data:
+            movie_ids.extend(movie.pk for movie in ingest_page(data))
+    return movie_ids
+
+
+def _cooccurrence_similarities(movie_ids):
+    """
+    Live cosine similarities from MovieCooccurrence for liked movies.
+    
+    Returns:
+        {(movie_id, other_id): similarity}
+    """
+    if not movie_ids:
+        return {}
+    limit = settings.RECOMMENDER_COOCCURRENCE_CANDIDATES
+    pairs = list(
+        MovieCooccurrence.objects.filter(
+            Q(movie_a_id__in=movie_ids) | Q(movie_b_id__in=movie_ids)
+        ).exclude(movie_a_id=F('movie_b_id')).order_by('-count')
+        .values_list('movie_a_id', 'movie_b_id', 'count')[:limit]
+    )
+    involved = {movie_id for a, b, _ in pairs for movie_id in (a, b)}
+    totals = dict(
+        MovieCooccurrence.objects.filter(movie_a_id__in=involved, movie_b_id=F('movie_a_id'))
+        .values_list('movie_a_id', 'count')
+    )
+    
+    similarities = {}
+    for a, b, count in pairs:
+        denominator = math.sqrt(totals.get(a, 0) * totals.get(b, 0))
+        if count <= 0 or not denominator:
+            continue
+        similarity = count / denominator
+        if a in movie_ids:
+            similarities[(a, b)] = similarity
+        if b in movie_ids:
+            similarities[(b, a)] = similarity
+    return similarities
+
+
+def _neighbor_scores(history):
+    """
+    Sum of weight * similarity over history, per neighbouring movie.
+    
+    Similarities come from the precomputed item-item index and from live
+    co-occurrence counts kept by the recommendation updater; where both know
+    a pair the larger one is used.
+    """
+    similarities = {}
+    index = get_neighbor_index()
+    if index is not None:
+        for movie_id in history:
+            for neighbor_id, similarity in index.neighbors(movie_id):
+                similarities[(movie_id, neighbor_id)] = similarity
+    
+    liked = {movie_id for movie_id, weight in history.items() if weight > 0}
+    for pair, similarity in _cooccurrence_similarities(liked).items():
+        similarities[pair] = max(similarities.get(pair, 0.0), similarity)
+    
+    scores = {}
+    for (movie_id, neighbor_id), similarity in similarities.items():
+        scores[neighbor_id] = scores.get(neighbor_id, 0.0) + history[movie_id] * similarity
+    return scores
+
+
+def _peak_scaled(scores, candidates):
+    """Scores aligned with candidates, divided by their largest magnitude."""
+    values = np.array([scores.get(movie_id, 0.0) for *_, movie_id in candidates], dtype=np.float32)
+    peak = np.abs(values).max() if len(values) else 0.0
+    if peak:
+        values /= peak
+    return values
+
+
+def score_candidates(profile, candidates, neighbor_scores, weights, factor_scores=None):
+    """
+    Score candidate movies against a user's history in one vectorized pass.
+    
+    Args:
+        profile: {genre_id: weight} from genre_profile
+        candidates: List of (genre_ids, popularity, movie_id) to score
+        neighbor_scores: {movie_id: accumulated neighbour similarity}
+        weights: Dict with 'genre', 'neighbors', 'factors' and 'popularity'
+            blend weights
+        factor_scores: {movie_id: ALS affinity}, empty without a trained model
+    
+    Returns:
+        float32 array of scores aligned with candidates
+    """
+    genres = sorted({genre for genre_ids, *_ in candidates for genre in genre_ids})
+    column = {genre: position for position, genre in enumerate(genres)}
+    
+    candidate_genres = np.zeros((len(candidates), len(genres)), dtype=np.float32)
+    for row, (genre_ids, *_) in enumerate(candidates):
+        candidate_genres[row, [column[genre] for genre in genre_ids]] = 1.0
+    
+    profile_vector = np.zeros(len(genres), dtype=np.float32)
+    for genre, weight in profile.items():
+        if genre in column:
+            profile_vector[column[genre]] = weight
+    
+    genre_norms = np.linalg.norm(candidate_genres, axis=1) * (np.linalg.norm(profile_vector) or 1.0)
+    genre_norms[genre_norms == 0] = 1.0
+    genre_affinity = candidate_genres @ profile_vector / genre_norms
+    
+    neighbor = _peak_scaled(neighbor_scores, candidates)
+    factor = _peak_scaled(factor_scores or {}, candidates)
+    
+    popularity = np.log1p(np.array([max(pop or 0.0, 0.0) for _, pop, _ in candidates], dtype=np.float32))
+    if len(popularity) and popularity.max():
+        popularity /= popularity.max()
+    
+    return (
+        weights['genre'] * genre_affinity
+        + weights['neighbors'] * neighbor
+        + weights.get('factors', 0.0) * factor
+        + weights['popularity'] * popularity
+    )
+
+
+def rank_for_user(user):
+    """
+    Return [(movie_id, score), ...] best first, cached per user.
+    
+    Candidates are the first trending and popular TMDb pages, local
+    neighbours of the user's history and, once train_recommender has run,
+    the movies the ALS model rates highest for the user, excluding movies
+    the user already rated or favorited.
+    """
+    key = for_you_cache_key(user.pk)
+    ranked = cache.get(key)
+    if ranked is not None:
+        return ranked
+    
+    # A cached profile is dropped on every history change, so when present
+    # it is current and saves loading the history again
+    profile = get_taste_profile(user.pk)
+    if profile is not None:
+        history = {int(movie_id): weight for movie_id, weight in profile['history'].items()}
+    else:
+        history = user_history(user)
+    neighbor_scores = _neighbor_scores(history)
+    candidate_ids = set(neighbor_scores)
+    candidate_ids.update(_tmdb_candidates())
+    factor_model = get_factor_model()
+    if factor_model is not None:
+        limit = settings.RECOMMENDER_FOR_YOU_MAX_RESULTS + len(history)
+        candidate_ids.update(movie_id for movie_id, _ in factor_model.recommend(user.pk, limit))
+    if not candidate_ids:
+        # TMDb unavailable and no neighbours yet: fall back to local popularity
+        logger.info(f"No TMDb or neighbour candidates for user {user.pk}, using local popular movies")
+        popular = Movie.objects.order_by('-popularity').values_list('pk', flat=True)
+        candidate_ids.update(popular[:settings.RECOMMENDER_FOR_YOU_MAX_RESULTS])
+    candidate_ids.difference_update(history)
+    
+    rows = Movie.objects.filter(pk__in=set(history) | candidate_ids).values_list(
+        'pk', 'genre_ids', 'popularity'
+    )
+    genres_by_id = {}
+    candidates = []
+    for movie_id, genre_ids, popularity in rows:
+        genre_ids = genre_ids or []
+        genres_by_id[movie_id] = genre_ids
+        if movie_id in candidate_ids:
+            candidates.append((genre_ids, popularity, movie_id))
+    
+    if profile is not None:
+        genres = {int(genre): weight for genre, weight in profile['genres'].items()}
+    else:
+        genres = genre_profile(history, genres_by_id)
+    
+    factor_scores = {}
+    if factor_model is not None:
+        factor_scores = factor_model.scores(user.pk, [movie_id for *_, movie_id in candidates])
+    
+    scores = score_candidates(
+        genres,
+        candidates,
+        neighbor_scores,
+        settings.RECOMMENDER_FOR_YOU_WEIGHTS,
+        factor_scores,
+    )
+    order = np.argsort(-scores, kind='stable')[:settings.RECOMMENDER_FOR_YOU_MAX_RESULTS]
+    ranked = [(candidates[i][2], float(scores[i])) for i in order]
+    
+    cache.set(key, ranked, settings.RECOMMENDER_FOR_YOU_TTL)
+    return ranked
@@ -0,0 +1,72 @@
+"""
+Item-item cosine similarity over a sparse interaction matrix.
+"""
+import numpy as np
+from scipy import sparse
+
+
+def item_item_neighbors(matrix, top_k):
+    """
+    Compute the top_k most similar movies for every movie column.
+    
+    Columns are L2-normalised so a single sparse product X^T X gives cosine
+    similarities; only the top_k entries of each row are kept.
+    
+    Args:
+        matrix: User x movie csr_matrix
+        top_k: Neighbours kept per movie
+    
+    Returns:
+        Tuple of (neighbors, scores), both shaped (n_movies, top_k). neighbors
+        holds column indices, padded with -1 where a movie has fewer
+        neighbours; scores is float32, sorted descending per row.
+    """
+    n_movies = matrix.shape[1]
+    if n_movies == 0 or top_k == 0:
+        return (
+            np.full((n_movies, top_k), -1, dtype=np.int32),
+            np.zeros((n_movies, top_k), dtype=np.float32),
+        )
+    
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0))).ravel()
+    norms[norms == 0] = 1.0
+    normalized = sparse.csc_matrix(matrix) @ sparse.diags(1.0 / norms)
+    similarity = (normalized.T @ normalized).tocsr()
+    similarity.setdiag(0)
+    similarity.eliminate_zeros()
+    
+    return top_k_per_row(similarity, top_k)
+
+
+def top_k_per_row(similarity, top_k):
+    """
+    Keep the top_k largest entries of every row of a sparse similarity matrix.
+    
+    Args:
+        similarity: csr_matrix of scores, self-similarities already removed
+        top_k: Entries kept per row
+    
+    Returns:
+        Tuple of (columns, scores), both shaped (n_rows, top_k), sorted by
+        descending score and padded with -1 / 0
+    """
+    n_rows = similarity.shape[0]
+    neighbors = np.full((n_rows, top_k), -1, dtype=np.int32)
+    scores = np.zeros((n_rows, top_k), dtype=np.float32)
+    
+    indptr, indices, data = similarity.indptr, similarity.indices, similarity.data
+    for row in range(n_rows):
+        start, end = indptr[row], indptr[row + 1]
+        if start == end:
+            continue
+        row_scores = data[start:end]
+        row_indices = indices[start:end]
+        if end - start > top_k:
+            top = np.argpartition(-row_scores, top_k - 1)[:top_k]
+            row_scores, row_indices = row_scores[top], row_indices[top]
+        order = np.argsort(-row_scores, kind='stable')
+        count = len(order)
+        neighbors[row, :count] = row_indices[order]
+        scores[row, :count] = row_scores[order]
+    
+    return neighbors, scores
@@ -0,0 +1,192 @@
+"""
+Versioned, memory-mapped storage for recommendation artifacts.
+
+Each store keeps one directory per model version and a CURRENT file naming
+the version to serve:
+    
+    RECOMMENDER_DIR/<name>/CURRENT
+    RECOMMENDER_DIR/<name>/versions/<version>/<array>.npy
+    RECOMMENDER_DIR/<name>/versions/<version>/meta.json
+
+Arrays are opened with mmap_mode='r', so every gunicorn worker on a host
+shares the same physical pages through the OS page cache instead of holding
+its own copy. Publishing writes a complete version directory first and then
+swaps CURRENT with os.replace, so workers only ever see whole versions and
+pick new ones up without a restart.
+"""
+import os
+import json
+import time
+import uuid
+import shutil
+import logging
+import threading
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = 'CURRENT'
+META_FILE = 'meta.json'
+
+
+class LoadedModel:
+    """One memory-mapped model version."""
+    
+    def __init__(self, version, arrays, meta):
+        self.version = version
+        self.arrays = arrays
+        self.meta = meta
+    
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+
+def lookup(sorted_ids, ids):
+    """
+    Map ids to their positions in a sorted id array.
+    
+    Args:
+        sorted_ids: Sorted 1-D array of ids
+        ids: Scalar or array of ids to find
+    
+    Returns:
+        Positions with -1 where an id is missing
+    """
+    ids = np.asarray(ids)
+    positions = np.searchsorted(sorted_ids, ids)
+    clipped = np.minimum(positions, max(len(sorted_ids) - 1, 0))
+    found = (positions < len(sorted_ids)) & (sorted_ids[clipped] == ids) if len(sorted_ids) else False
+    return np.where(found, positions, -1)
+
+
+class ModelStore:
+    """
+    Versioned artifact directory shared by every worker process on a host.
+    
+    Args:
+        name: Subdirectory of RECOMMENDER_DIR for this model
+    """
+    
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._loaded = None
+        self._loaded_root = None
+        self._checked_at = 0.0
+    
+    @property
+    def root(self):
+        return os.path.join(settings.RECOMMENDER_DIR, self.name)
+    
+    @property
+    def versions_dir(self):
+        return os.path.join(self.root, 'versions')
+    
+    def version_path(self, version):
+        return os.path.join(self.versions_dir, version)
+    
+    def publish(self, arrays, meta=None, version=None):
+        """
+        Write a new version and make it current.
+        
+        Args:
+            arrays: Dict of array name to numpy array
+            meta: JSON-serializable metadata stored with the version
+            version: Version name (default: UTC timestamp plus a random suffix)
+        
+        Returns:
+            The published version name
+        """
+        version = version or f"{time.strftime('%Y%m%d%H%M%S', time.gmtime())}-{uuid.uuid4().hex[:6]}"
+        os.makedirs(self.versions_dir, exist_ok=True)
+        
+        staging = os.path.join(self.versions_dir, f'.staging-{version}')
+        os.makedirs(staging)
+        for name, array in arrays.items():
+            np.save(os.path.join(staging, f'{name}.npy'), np.ascontiguousarray(array))
+        with open(os.path.join(staging, META_FILE), 'w') as f:
+            json.dump(dict(meta or {}, version=version, arrays=sorted(arrays)), f, indent=2)
+        os.rename(staging, self.version_path(version))
+        
+        pointer = os.path.join(self.root, f'{CURRENT_FILE}.{os.getpid()}.tmp')
+        with open(pointer, 'w') as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(pointer, os.path.join(self.root, CURRENT_FILE))
+        
+        logger.info(f"Published {self.name} model version {version}")
+        # Let this process see its own version without waiting for the next check
+        self._loaded_root = None
+        self.prune()
+        return version
+    
+    def prune(self, keep=None):
+        """Delete all but the newest keep versions, never the current one."""
+        keep = keep or settings.RECOMMENDER_STORE_KEEP_VERSIONS
+        current = self.current_version()
+        versions = sorted(
+            entry for entry in os.listdir(self.versions_dir) if not entry.startswith('.')
+        )
+        for version in versions[:-keep]:
+            if version != current:
+                # Workers still mapping this version keep their pages until
+                # they switch; unlinking does not invalidate open mappings.
+                shutil.rmtree(self.version_path(version), ignore_errors=True)
+    
+    def current_version(self):
+        """Version named by CURRENT, or None if nothing was published."""
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+    
+    def load(self, version):
+        """Memory-map every array of a version."""
+        path = self.version_path(version)
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+            for name in meta['arrays']
+        }
+        return LoadedModel(version, arrays, meta)
+    
+    def get(self):
+        """
+        Return the current model for this process, or None.
+        
+        CURRENT is re-read at most every RECOMMENDER_STORE_CHECK_INTERVAL
+        seconds, also while nothing has been published; when it names a new
+        version that version is mapped and swapped in.
+        """
+        now = time.monotonic()
+        loaded = self._loaded
+        if (
+            self._loaded_root == self.root
+            and now - self._checked_at < settings.RECOMMENDER_STORE_CHECK_INTERVAL
+        ):
+            return loaded
+        
+        with self._lock:
+            root = self.root
+            version = self.current_version()
+            self._checked_at = now
+            if version is None:
+                self._loaded = None
+                self._loaded_root = root
+            elif self._loaded is None or self._loaded.version != version or self._loaded_root != root:
+                self._loaded = self.load(version)
+                self._loaded_root = root
+                logger.info(f"Serving {self.name} model version {version}")
+            return self._loaded
+    
+    def loaded_version(self):
+        """Version this process is serving, or None."""
+        return self._loaded.version if self._loaded is not None else None
+
+
+neighbor_store = ModelStore('item_neighbors')
+als_store = ModelStore('als')
@@ -0,0 +1,154 @@
+"""
+Local full-text search over stored movies.
+
+Uses the indexes created by migration 0005: a weighted tsvector plus pg_trgm
+on PostgreSQL and an FTS5 table on SQLite. Candidates are fetched by text
+relevance and re-ranked with popularity so well-known titles win ties.
+"""
+import logging
+import math
+import re
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Q
+
+from .models import Movie
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Must stay identical to the expression indexed in migration 0005
+PG_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(overview, '')), 'B')"
+)
+
+POSTGRES_SQL = f"""
+    SELECT id, ts_rank_cd({PG_DOCUMENT}, query) + similarity(title, %s) AS relevance, popularity
+    FROM movies_movie, to_tsquery('english', %s) AS query
+    WHERE {PG_DOCUMENT} @@ query OR title %% %s
+    ORDER BY relevance DESC
+    LIMIT %s
+"""
+
+# bm25() is lower-is-better; titles count ten times as much as overviews
+SQLITE_SQL = """
+    SELECT m.id, -bm25(movies_movie_fts, 10.0, 1.0) AS relevance, m.popularity
+    FROM movies_movie_fts JOIN movies_movie m ON m.id = movies_movie_fts.rowid
+    WHERE movies_movie_fts MATCH %s
+    ORDER BY bm25(movies_movie_fts, 10.0, 1.0)
+    LIMIT %s
+"""
+
+
+def tokenize_query(query):
+    """Split a search query into lowercase word tokens, dropping punctuation."""
+    return TOKEN_RE.findall((query or '').lower())
+
+
+def _postgres_candidates(query, tokens, limit):
+    tsquery = ' & '.join(f'{token}:*' for token in tokens)
+    with connection.cursor() as cursor:
+        cursor.execute(POSTGRES_SQL, [query, tsquery, query, limit])
+        return cursor.fetchall()
+
+
+def _sqlite_candidates(query, tokens, limit):
+    match = ' '.join(f'"{token}"*' for token in tokens)
+    with connection.cursor() as cursor:
+        cursor.execute(SQLITE_SQL, [match, limit])
+        return cursor.fetchall()
+
+
+def _fallback_candidates(query, tokens, limit):
+    """icontains scan for backends without a search index; title hits rank first."""
+    rows = (
+        Movie.objects.filter(Q(title__icontains=query) | Q(overview__icontains=query))
+        .order_by('-popularity')
+        .values_list('id', 'title', 'popularity')[:limit]
+    )
+    needle = query.lower()
+    return [
+        (movie_id, 2.0 if needle in title.lower() else 1.0, popularity)
+        for movie_id, title, popularity in rows
+    ]
+
+
+CANDIDATE_QUERIES = {
+    'postgresql': _postgres_candidates,
+    'sqlite': _sqlite_candidates,
+}
+
+
+def rank_candidates(candidates, popularity_weight):
+    """
+    Order (id, relevance, popularity) rows by blended relevance and popularity.
+    
+    Both signals are scaled to [0, 1] within the candidate set, popularity on
+    a log scale since TMDb popularity is heavy-tailed.
+    
+    Returns:
+        List of (movie_id, score), best first
+    """
+    if not candidates:
+        return []
+    
+    max_relevance = max(relevance for _, relevance, _ in candidates) or 1.0
+    max_popularity = math.log1p(max(max(popularity, 0.0) for _, _, popularity in candidates)) or 1.0
+    
+    scored = [
+        (
+            movie_id,
+            relevance / max_relevance
+            + popularity_weight * math.log1p(max(popularity, 0.0)) / max_popularity,
+        )
+        for movie_id, relevance, popularity in candidates
+    ]
+    scored.sort(key=lambda item: (-item[1], item[0]))
+    return scored
+
+
+def search_movie_ids(query, limit=None):
+    """
+    Return IDs of stored movies matching query, best match first.
+    
+    Args:
+        query: Free-text search string
+        limit: Maximum number of IDs (defaults to SEARCH_MAX_RESULTS)
+    
+    Returns:
+        List of Movie primary keys
+    """
+    tokens = tokenize_query(query)
+    if not tokens:
+        return []
+    limit = limit or settings.SEARCH_MAX_RESULTS
+    
+    fetch = CANDIDATE_QUERIES.get(connection.vendor, _fallback_candidates)
+    try:
+        with transaction.atomic():
+            candidates = fetch(query, tokens, limit)
+    except DatabaseError as e:
+        logger.warning(f"Search index query failed, falling back to icontains: {str(e)}")
+        candidates = _fallback_candidates(query, tokens, limit)
+    
+    ranked = rank_candidates(candidates, settings.SEARCH_POPULARITY_WEIGHT)
+    return [movie_id for movie_id, _ in ranked]
+
+
+def search_movies(query, limit=None):
+    """
+    Return stored movies matching query, best match first.
+    
+    Args:
+        query: Free-text search string
+        limit: Maximum number of movies (defaults to SEARCH_MAX_RESULTS)
+    
+    Returns:
+        List of Movie instances
+    """
+    ids = search_movie_ids(query, limit)
+    movies = Movie.objects.in_bulk(ids)
+    return [movies[movie_id] for movie_id in ids if movie_id in movies]
@@ -1,8 +1,115 @@
+from django.conf import settings
 from rest_framework import serializers
-from .models import Movie, UserFavoriteMovie, MovieRating
+from .models import Movie, UserFavoriteMovie, MovieRating, MovieRatingSummary
 
+USER_MOVIE_STATE = 'user_movie_state'
 
-class MovieSerializer(serializers.ModelSerializer):
+
+def _context_user(context):
+    """Return the authenticated user from serializer context, or None."""
+    request = context.get('request')
+    if request and request.user.is_authenticated:
+        return request.user
+    return None
+
+
+def preload_user_movie_state(context, movies):
+    """
+    Load the user's favorites and ratings for a page of movies into context.
+    
+    Runs two queries for the whole page so MovieSerializer can answer
+    is_favorite and user_rating without a query per movie.
+    
+    Args:
+        context: Serializer context, shared by the root serializer and its children
+        movies: Movie instances about to be serialized
+    """
+    user = _context_user(context)
+    if user is None:
+        return
+    
+    movie_ids = [movie.pk for movie in movies]
+    favorite_ids = set(
+        UserFavoriteMovie.objects.filter(user=user, movie_id__in=movie_ids)
+        .values_list('movie_id', flat=True)
+    )
+    ratings = {
+        movie_id: {'rating': rating, 'review': review, 'created_at': created_at}
+        for movie_id, rating, review, created_at in MovieRating.objects.filter(
+            user=user, movie_id__in=movie_ids
+        ).values_list('movie_id', 'rating', 'review', 'created_at')
+    }
+    context[USER_MOVIE_STATE] = (favorite_ids, ratings)
+
+
+class MovieListSerializer(serializers.ListSerializer):
+    """
+    List serializer that batches per-user movie state for the whole page.
+    
+    Set movie_field to the attribute holding the Movie when serializing
+    objects that wrap a movie (favorites, ratings).
+    """
+    movie_field = None
+    
+    def to_representation(self, data):
+        items = list(data.all() if hasattr(data, 'all') else data)
+        if self.movie_field:
+            movies = [getattr(item, self.movie_field) for item in items]
+        else:
+            movies = items
+        preload_user_movie_state(self.context, movies)
+        return super().to_representation(items)
+
+
+class RelatedMovieListSerializer(MovieListSerializer):
+    """MovieListSerializer for objects with a 'movie' foreign key."""
+    movie_field = 'movie'
+
+
+class UserMovieStateMixin:
+    """
+    is_favorite and user_rating fields for movie serializers.
+    
+    Answers from the maps loaded by MovieListSerializer when serializing a
+    list, and falls back to per-movie queries for a single object.
+    """
+    
+    def get_is_favorite(self, obj):
+        """Check if movie is in user's favorites."""
+        state = self.context.get(USER_MOVIE_STATE)
+        if state is not None:
+            return obj.pk in state[0]
+        
+        user = _context_user(self.context)
+        if user is not None:
+            return UserFavoriteMovie.objects.filter(
+                user=user,
+                movie=obj
+            ).exists()
+        return False
+    
+    def get_user_rating(self, obj):
+        """Get user's rating for the movie."""
+        state = self.context.get(USER_MOVIE_STATE)
+        if state is not None:
+            return state[1].get(obj.pk)
+        
+        user = _context_user(self.context)
+        if user is not None:
+            rating = MovieRating.objects.filter(
+                user=user,
+                movie=obj
+            ).first()
+            if rating:
+                return {
+                    'rating': rating.rating,
+                    'review': rating.review,
+                    'created_at': rating.created_at
+                }
+        return None
+
+
+class MovieSerializer(UserMovieStateMixin, serializers.ModelSerializer):
     """Serializer for Movie model."""
     poster_url = serializers.SerializerMethodField()
     backdrop_url = serializers.SerializerMethodField()
@@ -18,6 +125,7 @@ class MovieSerializer(serializers.ModelSerializer):
             'genre_ids', 'is_favorite', 'user_rating', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+        list_serializer_class = MovieListSerializer
     
     def get_poster_url(self, obj):
         """Generate full poster URL."""
@@ -31,40 +139,17 @@ class MovieSerializer(serializers.ModelSerializer):
             return f"https://image.tmdb.org/t/p/w1280{obj.backdrop_path}"
         return None
     
-    def get_is_favorite(self, obj):
-        """Check if movie is in user's favorites."""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return UserFavoriteMovie.objects.filter(
-                user=request.user,
-                movie=obj
-            ).exists()
-        return False
-    
-    def get_user_rating(self, obj):
-        """Get user's rating for the movie."""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            rating = MovieRating.objects.filter(
-                user=request.user,
-                movie=obj
-            ).first()
-            if rating:
-                return {
-                    'rating': rating.rating,
-                    'review': rating.review,
-                    'created_at': rating.created_at
-                }
-        return None
 
 
-class MovieDetailSerializer(serializers.ModelSerializer):
+class MovieDetailSerializer(UserMovieStateMixin, serializers.ModelSerializer):
     """Detailed serializer for Movie model."""
     poster_url = serializers.SerializerMethodField()
     backdrop_url = serializers.SerializerMethodField()
     is_favorite = serializers.SerializerMethodField()
     user_rating = serializers.SerializerMethodField()
     average_rating = serializers.SerializerMethodField()
+    rating_count = serializers.SerializerMethodField()
+    rating_histogram = serializers.SerializerMethodField()
     
     class Meta:
         model = Movie
@@ -73,9 +158,10 @@ class MovieDetailSerializer(serializers.ModelSerializer):
             'poster_path', 'poster_url', 'backdrop_path', 'backdrop_url',
             'popularity', 'vote_average', 'vote_count', 'original_language',
             'genre_ids', 'is_favorite', 'user_rating', 'average_rating',
-            'created_at', 'updated_at'
+            'rating_count', 'rating_histogram', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+        list_serializer_class = MovieListSerializer
     
     def get_poster_url(self, obj):
         """Generate full poster URL."""
@@ -89,39 +175,29 @@ class MovieDetailSerializer(serializers.ModelSerializer):
             return f"https://image.tmdb.org/t/p/w1280{obj.backdrop_path}"
         return None
     
-    def get_is_favorite(self, obj):
-        """Check if movie is in user's favorites."""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return UserFavoriteMovie.objects.filter(
-                user=request.user,
-                movie=obj
-            ).exists()
-        return False
     
-    def get_user_rating(self, obj):
-        """Get user's rating for the movie."""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            rating = MovieRating.objects.filter(
-                user=request.user,
-                movie=obj
-            ).first()
-            if rating:
-                return {
-                    'rating': rating.rating,
-                    'review': rating.review,
-                    'created_at': rating.created_at
-                }
-        return None
+    def _rating_summary(self, obj):
+        try:
+            return obj.rating_summary
+        except MovieRatingSummary.DoesNotExist:
+            return None
     
     def get_average_rating(self, obj):
         """Get average rating from all users."""
-        ratings = MovieRating.objects.filter(movie=obj)
-        if ratings.exists():
-            avg = sum(r.rating for r in ratings) / ratings.count()
-            return round(avg, 2)
-        return None
+        summary = self._rating_summary(obj)
+        return summary.average if summary else None
+    
+    def get_rating_count(self, obj):
+        """Get number of user ratings."""
+        summary = self._rating_summary(obj)
+        return summary.rating_count if summary else 0
+    
+    def get_rating_histogram(self, obj):
+        """Get number of user ratings for each score 1-10."""
+        summary = self._rating_summary(obj)
+        if summary:
+            return summary.histogram
+        return {score: 0 for score in range(1, 11)}
 
 
 class UserFavoriteMovieSerializer(serializers.ModelSerializer):
@@ -132,6 +208,7 @@ class UserFavoriteMovieSerializer(serializers.ModelSerializer):
         model = UserFavoriteMovie
         fields = ['id', 'movie', 'created_at']
         read_only_fields = ['id', 'created_at']
+        list_serializer_class = RelatedMovieListSerializer
 
 
 class MovieRatingSerializer(serializers.ModelSerializer):
@@ -142,6 +219,7 @@ class MovieRatingSerializer(serializers.ModelSerializer):
         model = MovieRating
         fields = ['id', 'movie', 'rating', 'review', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
+        list_serializer_class = RelatedMovieListSerializer
 
 
 class MovieRatingCreateSerializer(serializers.ModelSerializer):
@@ -150,3 +228,38 @@ class MovieRatingCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = MovieRating
         fields = ['rating', 'review']
+
+
+class MovieBatchLookupSerializer(serializers.Serializer):
+    """Validate a batch lookup of movies by primary key or TMDb ID."""
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+    tmdb_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+    
+    def validate(self, attrs):
+        keys = [key for key in ('ids', 'tmdb_ids') if attrs.get(key)]
+        if len(keys) != 1:
+            raise serializers.ValidationError('Provide exactly one of ids or tmdb_ids.')
+        
+        key = keys[0]
+        if len(attrs[key]) > settings.MOVIE_BATCH_MAX_IDS:
+            raise serializers.ValidationError(
+                {key: f'At most {settings.MOVIE_BATCH_MAX_IDS} IDs per request.'}
+            )
+        return {'field': 'pk' if key == 'ids' else 'tmdb_id', 'values': attrs[key]}
+
+
+class MovieReferenceSerializer(serializers.Serializer):
+    """A movie named by primary key or TMDb ID, for bulk writes."""
+    movie_id = serializers.IntegerField(min_value=1, required=False)
+    tmdb_id = serializers.IntegerField(min_value=1, required=False)
+    
+    def validate(self, attrs):
+        if ('movie_id' in attrs) == ('tmdb_id' in attrs):
+            raise serializers.ValidationError('Provide exactly one of movie_id or tmdb_id.')
+        return attrs
+
+
+class BulkRatingItemSerializer(MovieReferenceSerializer):
+    """One entry of a bulk rating import."""
+    rating = serializers.IntegerField(min_value=1, max_value=10)
+    review = serializers.CharField(required=False, allow_blank=True, allow_null=True)
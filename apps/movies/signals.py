@@ -0,0 +1,7 @@
+"""
+Signals sent by the movies app.
+"""
+from django.dispatch import Signal
+
+# Sent by ingestion after TMDb results are saved, with movies=[Movie, ...]
+movies_ingested = Signal()
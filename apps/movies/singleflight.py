@@ -0,0 +1,162 @@
+"""
+Single-flight request coalescing for TMDb cache misses.
+
+When a cached TMDb payload expires, every worker that misses at the same
+moment would otherwise call TMDb for the same data. ``SingleFlight`` makes
+sure only one caller refreshes a given key:
+
+- inside a process, concurrent callers wait on the in-flight call;
+- across processes, a short lock in the shared cache (SET NX on Redis)
+  elects one refresher while the others poll the cache for its result.
+
+Callers that already hold a stale copy get it back immediately instead of
+waiting. Callers that time out waiting get None rather than loading
+themselves, so a slow refresh never turns into a stampede.
+"""
+import time
+import threading
+import logging
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Delete the lock only if it still holds our token (compare-and-delete)
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def release_lock(lock_key, token):
+    """
+    Delete lock_key only if it still holds token.
+    
+    A holder that overran the lock timeout must not delete the lock a later
+    holder acquired. On Redis the check and delete run atomically in a Lua
+    script; other backends fall back to get-then-delete.
+    """
+    if 'django_redis' in settings.CACHES['default']['BACKEND']:
+        from django_redis import get_redis_connection
+        client = cache.client
+        get_redis_connection('default').eval(
+            RELEASE_SCRIPT, 1, client.make_key(lock_key), client.encode(token)
+        )
+        return
+    if cache.get(lock_key) == token:
+        cache.delete(lock_key)
+
+
+class _Call:
+    """An in-flight load shared by every caller of the same key."""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class SingleFlight:
+    """Coalesce concurrent loads of the same cache key."""
+    
+    def __init__(self, lock_timeout=None, wait_timeout=None, poll_interval=None):
+        self._lock_timeout = lock_timeout
+        self._wait_timeout = wait_timeout
+        self._poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._calls = {}
+    
+    @property
+    def lock_timeout(self):
+        return self._lock_timeout or settings.TMDB_LOCK_TIMEOUT
+    
+    @property
+    def wait_timeout(self):
+        return self._wait_timeout or settings.TMDB_LOCK_WAIT
+    
+    @property
+    def poll_interval(self):
+        return self._poll_interval or settings.TMDB_LOCK_POLL_INTERVAL
+    
+    def fetch(self, key, load, read=None, stale=None):
+        """
+        Run load() for key unless another caller is already doing so.
+        
+        Args:
+            key: Cache key being refreshed
+            load: Callable that fetches the payload and stores it in the cache
+            read: Callable(key) used to poll the cache while another process
+                refreshes it (default: cache.get)
+            stale: Stale payload to return instead of waiting, if any
+        
+        Returns:
+            The loaded payload, or stale/None if the refresh failed
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        
+        if not leader:
+            metrics.incr('singleflight.coalesced_local')
+            if stale is not None:
+                return stale
+            call.done.wait(self.wait_timeout)
+            return call.result
+        
+        try:
+            call.result = self._fetch_with_lock(key, load, read or cache.get, stale)
+            return call.result
+        finally:
+            call.done.set()
+            with self._lock:
+                self._calls.pop(key, None)
+    
+    def _fetch_with_lock(self, key, load, read, stale):
+        """Load key while holding the cross-process lock, or wait for its holder."""
+        lock_key = f"lock:{key}"
+        
+        result = self._load_if_elected(lock_key, load)
+        if result is not _NOT_ELECTED:
+            return result
+        
+        metrics.incr('singleflight.coalesced_remote')
+        if stale is not None:
+            return stale
+        
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            data = read(key)
+            if data:
+                return data
+            if cache.get(lock_key) is None:
+                # The holder gave up without a result; let one waiter retry
+                result = self._load_if_elected(lock_key, load)
+                if result is not _NOT_ELECTED:
+                    return result
+        
+        metrics.incr('singleflight.wait_timeouts')
+        logger.warning(f"Timed out waiting for refresh of {key}")
+        return None
+    
+    def _load_if_elected(self, lock_key, load):
+        """Run load() if this caller wins the lock, else return _NOT_ELECTED."""
+        token = uuid.uuid4().hex
+        if not cache.add(lock_key, token, self.lock_timeout):
+            return _NOT_ELECTED
+        try:
+            metrics.incr('singleflight.loads')
+            return load()
+        finally:
+            release_lock(lock_key, token)
+
+
+_NOT_ELECTED = object()
+
+coalescer = SingleFlight()
@@ -1,8 +1,53 @@
-from django.test import TestCase
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+
+import httpx
+import numpy as np
+from scipy import sparse
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
-from .models import Movie, UserFavoriteMovie, MovieRating
+from django.core.management import call_command
+from .models import (
+    InteractionEvent,
+    Movie,
+    MovieCooccurrence,
+    MovieRating,
+    MovieRatingSummary,
+    UserFavoriteMovie,
+    UserTasteProfile,
+)
+from . import autocomplete, metrics, tmdb_client, views
+from .autocomplete import TitleIndex, normalize, title_index
+from .cache_codec import decode_entry, decoded_size, encode_entry, project_page
+from .ingestion import ingest_page, upsert_movies
+from .rating_aggregates import compute_summaries
+from .search import search_movie_ids, search_movies
+from .recommender import NeighborIndex, build_interaction_matrix, get_factor_model, item_item_neighbors
+from .recommender import personalized
+from .recommender.als import train_als
+from .recommender.store import ModelStore, als_store, lookup
+from .recommender import content
+from .recommender.ann import IVFIndex, exact_search
+from .recommender import events
+from .serializers import MovieRatingSerializer, UserFavoriteMovieSerializer
+from .circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from .local_cache import LocalLRUCache, local_cache
+from .rate_limit import BATCH, INTERACTIVE, LocalTokenBucket, RateLimiter
+from .singleflight import SingleFlight
+from .async_tmdb_client import AsyncTMDbClient
+from utils import pagination
 
 User = get_user_model()
 
@@ -125,3 +170,1628 @@ class MovieRatingTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         rating = MovieRating.objects.get(user=self.user, movie=self.movie)
         self.assertEqual(rating.rating, 9)
+    
+    
+    def test_rating_summary_tracks_writes(self):
+        """Test rating, re-rating and removing keep the summary in step."""
+        self.client.post(f'/api/movies/{self.movie.id}/rate/', {'rating': 6})
+        self.client.put(f'/api/movies/{self.movie.id}/rate/', {'rating': 9})
+        other = User.objects.create_user(username='other', password='testpass123')
+        other_client = APIClient()
+        other_client.force_authenticate(user=other)
+        other_client.post(f'/api/movies/{self.movie.id}/rate/', {'rating': 4})
+        
+        summary = MovieRatingSummary.objects.get(movie=self.movie)
+        self.assertEqual((summary.rating_sum, summary.rating_count), (13, 2))
+        self.assertEqual(summary.histogram[9], 1)
+        self.assertEqual(summary.histogram[6], 0)
+        
+        response = self.client.get(f'/api/movies/{self.movie.id}/')
+        self.assertEqual(response.data['average_rating'], 6.5)
+        self.assertEqual(response.data['rating_count'], 2)
+        
+        self.client.delete(f'/api/movies/{self.movie.id}/remove_rating/')
+        summary.refresh_from_db()
+        self.assertEqual((summary.rating_sum, summary.rating_count), (4, 1))
+        self.assertEqual(summary.histogram[9], 0)
+    
+    def test_rating_endpoint_updates_summary(self):
+        """Test PATCH and DELETE on a rating keep the summary in step."""
+        self.client.post(f'/api/movies/{self.movie.id}/rate/', {'rating': 6})
+        rating = MovieRating.objects.get(user=self.user, movie=self.movie)
+        
+        response = self.client.patch(f'/api/movies/ratings/{rating.id}/', {'rating': 8}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        summary = MovieRatingSummary.objects.get(movie=self.movie)
+        self.assertEqual((summary.rating_sum, summary.rating_count), (8, 1))
+        self.assertEqual((summary.histogram[6], summary.histogram[8]), (0, 1))
+        
+        response = self.client.delete(f'/api/movies/ratings/{rating.id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        summary.refresh_from_db()
+        self.assertEqual((summary.rating_sum, summary.rating_count, summary.histogram[8]), (0, 0, 0))
+    
+    def test_rating_endpoint_does_not_create(self):
+        """Test ratings are created through the rate action, not the ratings list."""
+        response = self.client.post('/api/movies/ratings/', {'rating': 6}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+    
+    def test_reconcile_resets_orphaned_summary(self):
+        """Test reconciliation zeroes summaries of movies without ratings."""
+        MovieRatingSummary.objects.create(movie=self.movie, rating_sum=10, rating_count=1, count_10=1)
+        call_command('reconcile_rating_summaries', stdout=mock.Mock())
+        summary = MovieRatingSummary.objects.get(movie=self.movie)
+        self.assertEqual((summary.rating_sum, summary.rating_count, summary.count_10), (0, 0, 0))
+        self.assertIsNone(summary.average)
+
+
+class MovieSerializerQueryTestCase(TestCase):
+    """Test cases for batched per-user movie fields."""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.movies = [
+            Movie.objects.create(tmdb_id=i, title=f'Movie {i}', popularity=i)
+            for i in range(1, 21)
+        ]
+        UserFavoriteMovie.objects.create(user=self.user, movie=self.movies[0])
+        MovieRating.objects.create(user=self.user, movie=self.movies[1], rating=8, review='Good')
+        self.client.force_authenticate(user=self.user)
+    
+    def test_movie_list_query_count(self):
+        """Test a page of movies costs a fixed number of queries for a logged-in user."""
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/movies/?page_size=20')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        by_id = {movie['id']: movie for movie in response.data['results']}
+        self.assertTrue(by_id[self.movies[0].id]['is_favorite'])
+        self.assertFalse(by_id[self.movies[1].id]['is_favorite'])
+        self.assertEqual(by_id[self.movies[1].id]['user_rating']['rating'], 8)
+        self.assertIsNone(by_id[self.movies[0].id]['user_rating'])
+    
+    def test_nested_movie_list_query_count(self):
+        """Test favorites and ratings lists batch their nested movie fields."""
+        request = mock.Mock(user=self.user)
+        for movie in self.movies[2:]:
+            UserFavoriteMovie.objects.create(user=self.user, movie=movie)
+        
+        favorites = UserFavoriteMovie.objects.filter(user=self.user).select_related('movie')
+        with self.assertNumQueries(3):
+            data = UserFavoriteMovieSerializer(favorites, many=True, context={'request': request}).data
+        self.assertEqual(len(data), 19)
+        self.assertTrue(all(item['movie']['is_favorite'] for item in data))
+        
+        ratings = MovieRating.objects.filter(user=self.user).select_related('movie')
+        with self.assertNumQueries(3):
+            data = MovieRatingSerializer(ratings, many=True, context={'request': request}).data
+        self.assertEqual(data[0]['movie']['user_rating']['review'], 'Good')
+
+
+class TMDbClientTestCase(TestCase):
+    """Test cases for the TMDb HTTP client."""
+    
+    def test_client_and_session_are_shared(self):
+        """Test the process-wide client reuses one pooled session."""
+        client = tmdb_client.get_tmdb_client()
+        self.assertIs(client, tmdb_client.get_tmdb_client())
+        self.assertIs(client.session, tmdb_client.get_session())
+    
+    def test_session_only_retries_connections(self):
+        """Test urllib3 leaves 429/5xx retries to the client, which rate-limits them."""
+        adapter = tmdb_client.build_session().get_adapter('https://api.themoviedb.org/3')
+        retry = adapter.max_retries
+        self.assertGreater(retry.connect, 0)
+        self.assertEqual((retry.read, retry.status), (0, 0))
+    
+    @override_settings(TMDB_RETRY_AFTER_MAX=2)
+    def test_retry_after_is_capped(self):
+        """Test a long Retry-After header does not stall the worker."""
+        response = mock.Mock(headers={'Retry-After': '120'})
+        self.assertEqual(tmdb_client.retry_delay(0, response), 2)
+    
+    @override_settings(TMDB_API_KEY='test-key', TMDB_MAX_RETRIES=3)
+    def test_each_retry_takes_a_token(self):
+        """Test throttled responses are retried only with a fresh rate-limit token."""
+        throttled = mock.Mock(status_code=429, headers={'Retry-After': '0'})
+        ok = mock.Mock(status_code=200)
+        ok.json.return_value = {'results': []}
+        session = mock.Mock()
+        session.get.side_effect = [throttled, throttled, ok]
+        limiter = mock.Mock()
+        limiter.acquire.return_value = True
+        client = tmdb_client.TMDbClient(session=session)
+        with mock.patch.object(tmdb_client, 'get_rate_limiter', return_value=limiter):
+            self.assertEqual(client._make_request('/movie/popular'), {'results': []})
+        self.assertEqual(limiter.acquire.call_count, 3)
+        
+        session.get.side_effect = [throttled, ok]
+        limiter.acquire.side_effect = [True, False]
+        with mock.patch.object(tmdb_client, 'get_rate_limiter', return_value=limiter):
+            self.assertIsNone(client._make_request('/movie/popular'))
+        self.assertEqual(session.get.call_count, 4)
+    
+    @override_settings(
+        TMDB_API_KEY='test-key', TMDB_MAX_RETRIES=3, TMDB_RETRY_AFTER_MAX=10,
+        TMDB_RETRY_BUDGET={'interactive': 5, 'batch': 60},
+    )
+    def test_retries_stop_at_the_budget(self):
+        """Test a retry whose sleep would overrun the priority's budget is not made."""
+        throttled = mock.Mock(status_code=429, headers={'Retry-After': '10'})
+        throttled.raise_for_status.side_effect = tmdb_client.requests.exceptions.HTTPError(response=throttled)
+        session = mock.Mock()
+        session.get.return_value = throttled
+        client = tmdb_client.TMDbClient(session=session)
+        with mock.patch.object(tmdb_client, 'get_rate_limiter', return_value=None), \
+                mock.patch.object(tmdb_client.time, 'sleep') as sleep:
+            self.assertIsNone(client._make_request('/movie/popular'))
+        sleep.assert_not_called()
+        session.get.assert_called_once()
+        
+        throttled.headers = {'Retry-After': '2'}
+        clock = [0.0]
+        
+        def advance(seconds):
+            clock[0] += seconds
+        
+        with mock.patch.object(tmdb_client, 'get_rate_limiter', return_value=None), \
+                mock.patch.object(tmdb_client.time, 'monotonic', side_effect=lambda: clock[0]), \
+                mock.patch.object(tmdb_client.time, 'sleep', side_effect=advance) as sleep:
+            client._make_request('/movie/popular')
+        self.assertEqual(sleep.call_count, 2)
+    
+    @override_settings(TMDB_API_KEY='test-key')
+    def test_make_request_uses_session(self):
+        """Test requests go through the pooled session."""
+        session = mock.Mock()
+        session.get.return_value.json.return_value = {'results': []}
+        client = tmdb_client.TMDbClient(session=session)
+        self.assertEqual(client._make_request('/movie/popular', {'page': 1}), {'results': []})
+        session.get.assert_called_once()
+
+
+@override_settings(TMDB_API_KEY='test-key')
+class AsyncTMDbClientTestCase(TestCase):
+    """Test cases for the async TMDb client."""
+    
+    def setUp(self):
+        cache.clear()
+        self.in_flight = 0
+        self.max_in_flight = 0
+    
+    def tearDown(self):
+        cache.clear()
+    
+    async def handler(self, request):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        page = int(request.url.params['page'])
+        return httpx.Response(200, json={'page': page, 'results': [{'id': page}]})
+    
+    def fetch(self, pages, concurrency):
+        async def run():
+            transport = httpx.MockTransport(self.handler)
+            async with AsyncTMDbClient(concurrency=concurrency, transport=transport) as client:
+                return await client.get_popular_movies_pages(pages)
+        return asyncio.run(run())
+    
+    def test_pages_are_returned_in_order(self):
+        """Test concurrent page fetches come back in page order."""
+        pages = self.fetch(6, concurrency=3)
+        self.assertEqual([data['page'] for data in pages], [1, 2, 3, 4, 5, 6])
+    
+    def test_concurrency_is_bounded(self):
+        """Test no more than `concurrency` requests are in flight."""
+        self.fetch(6, concurrency=2)
+        self.assertLessEqual(self.max_in_flight, 2)
+        self.assertEqual(decode_entry(cache.get('popular_movies_page_3'))['data']['page'], 3)
+
+
+class SingleFlightTestCase(TestCase):
+    """Test cases for cache-miss request coalescing."""
+    
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.flight = SingleFlight(lock_timeout=5, wait_timeout=2, poll_interval=0.01)
+    
+    def tearDown(self):
+        cache.clear()
+    
+    def test_concurrent_misses_share_one_load(self):
+        """Test concurrent callers in one process trigger a single load."""
+        calls = []
+        
+        def load():
+            calls.append(1)
+            time.sleep(0.1)
+            cache.set('key', 'fresh')
+            return 'fresh'
+        
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.flight.fetch('key', load)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['fresh'] * 5)
+        self.assertEqual(metrics.snapshot()['singleflight.coalesced_local'], 4)
+    
+    def test_remote_lock_returns_stale(self):
+        """Test a caller returns its stale copy while another process refreshes."""
+        cache.add('lock:key', 1, 5)
+        load = mock.Mock(return_value='fresh')
+        self.assertEqual(self.flight.fetch('key', load, stale='stale'), 'stale')
+        load.assert_not_called()
+        self.assertEqual(metrics.snapshot()['singleflight.coalesced_remote'], 1)
+    
+    def test_remote_lock_waits_for_result(self):
+        """Test a caller polls the cache for the lock holder's result."""
+        cache.add('lock:key', 1, 5)
+        threading.Timer(0.05, lambda: cache.set('key', 'fresh')).start()
+        load = mock.Mock(return_value='own')
+        self.assertEqual(self.flight.fetch('key', load), 'fresh')
+        load.assert_not_called()
+    
+    def test_wait_timeout_does_not_load(self):
+        """Test waiters that time out return None instead of calling TMDb themselves."""
+        flight = SingleFlight(lock_timeout=5, wait_timeout=0.05, poll_interval=0.01)
+        cache.add('lock:key', 'other', 5)
+        load = mock.Mock(return_value='own')
+        self.assertIsNone(flight.fetch('key', load))
+        load.assert_not_called()
+        self.assertEqual(metrics.snapshot()['singleflight.wait_timeouts'], 1)
+    
+    def test_release_keeps_a_later_holders_lock(self):
+        """Test a holder whose lock expired does not delete the next holder's lock."""
+        def load():
+            cache.set('lock:key', 'next-holder', 5)
+            return 'fresh'
+        
+        self.assertEqual(self.flight.fetch('key', load), 'fresh')
+        self.assertEqual(cache.get('lock:key'), 'next-holder')
+
+
+@override_settings(TMDB_API_KEY='test-key', TMDB_SWR_ENABLED=True)
+class StaleWhileRevalidateTestCase(TestCase):
+    """Test cases for stale-while-revalidate caching of TMDb payloads."""
+    
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        self.session = mock.Mock()
+        self.session.get.return_value.json.return_value = {'page': 1, 'results': [{'id': 2}]}
+        self.client = tmdb_client.TMDbClient(session=self.session)
+    
+    def tearDown(self):
+        cache.clear()
+    
+    def wait_for_refresh(self):
+        for _ in range(100):
+            if not tmdb_client._refreshing:
+                return
+            time.sleep(0.01)
+    
+    def test_fresh_entry_is_served_without_request(self):
+        """Test a fresh entry does not call TMDb."""
+        entry, timeout = tmdb_client.make_cache_entry({'results': [{'id': 1}]}, 'popular')
+        cache.set('popular_movies_page_1', encode_entry(entry), timeout)
+        self.assertEqual(self.client.get_popular_movies(1)['results'][0]['id'], 1)
+        self.session.get.assert_not_called()
+    
+    def test_stale_entry_is_served_and_refreshed(self):
+        """Test a soft-expired entry is returned at once and refreshed in the background."""
+        stale, timeout = tmdb_client.make_cache_entry({'results': [{'id': 1}]}, 'popular')
+        stale['soft_expires'] = time.time() - 1
+        cache.set('popular_movies_page_1', encode_entry(stale), 60)
+        self.assertEqual(self.client.get_popular_movies(1), stale['data'])
+        self.wait_for_refresh()
+        self.session.get.assert_called_once()
+        self.assertEqual(self.client.get_popular_movies(1)['results'][0]['id'], 2)
+    
+    @override_settings(TMDB_CACHE_TTLS={'popular': (30, 300)})
+    def test_hard_timeout_includes_grace(self):
+        """Test entries are kept for the soft TTL plus the grace period."""
+        entry, timeout = tmdb_client.make_cache_entry({}, 'popular')
+        self.assertEqual(timeout, 330)
+        self.assertAlmostEqual(entry['soft_expires'], time.time() + 30, delta=1)
+
+
+class LocalLRUCacheTestCase(TestCase):
+    """Test cases for the in-process LRU tier."""
+    
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.lru = LocalLRUCache(max_entries=2, max_bytes=100, ttl=60)
+    
+    def tearDown(self):
+        cache.clear()
+    
+    def test_evicts_least_recently_used(self):
+        """Test the entry limit evicts the least recently used key."""
+        self.lru.set('a', 1, 10)
+        self.lru.set('b', 2, 10)
+        self.lru.get('a')
+        self.lru.set('c', 3, 10)
+        self.assertIsNone(self.lru.get('b'))
+        self.assertEqual(self.lru.get('a'), 1)
+    
+    def test_byte_limit(self):
+        """Test the byte limit evicts entries and rejects oversized values."""
+        self.lru.set('a', 1, 60)
+        self.lru.set('b', 2, 60)
+        self.assertIsNone(self.lru.get('a'))
+        self.lru.set('huge', 3, 1000)
+        self.assertIsNone(self.lru.get('huge'))
+        self.assertEqual(self.lru.stats(), {'entries': 1, 'bytes': 60})
+    
+    @override_settings(TMDB_L1_GENERATION_CHECK_INTERVAL=0)
+    def test_generation_bump_invalidates(self):
+        """Test bumping the shared generation clears every worker's copy."""
+        self.lru.get('a')
+        self.lru.set('a', 1, 10)
+        cache.set('tmdb_l1_generation', 99)
+        self.assertIsNone(self.lru.get('a'))
+    
+    @override_settings(TMDB_L1_GENERATION_CHECK_INTERVAL=0)
+    def test_invalidate_all_reaches_other_workers(self):
+        """Test invalidate_all and clear_tmdb_cache drop other workers' copies."""
+        from .local_cache import invalidate_all
+        other_worker = LocalLRUCache(max_entries=2, max_bytes=100, ttl=60)
+        other_worker.get('a')
+        other_worker.set('a', 1, 10)
+        invalidate_all()
+        self.assertIsNone(other_worker.get('a'))
+        
+        other_worker.set('a', 1, 10)
+        cache.set('popular_movies_page_1', b'payload')
+        call_command('clear_tmdb_cache', stdout=mock.Mock())
+        self.assertIsNone(other_worker.get('a'))
+        self.assertIsNone(cache.get('popular_movies_page_1'))
+    
+    @override_settings(TMDB_API_KEY='test-key')
+    def test_client_counts_hits_per_tier(self):
+        """Test TMDbClient reads L1 before the shared cache."""
+        local_cache.clear()
+        entry, timeout = tmdb_client.make_cache_entry({'results': []}, 'popular')
+        cache.set('popular_movies_page_1', encode_entry(entry), timeout)
+        client = tmdb_client.TMDbClient(session=mock.Mock())
+        client.get_popular_movies(1)
+        client.get_popular_movies(1)
+        counters = metrics.snapshot()
+        self.assertEqual(counters['l2.hits'], 1)
+        self.assertEqual(counters['l1.hits'], 1)
+        local_cache.clear()
+
+
+@override_settings(
+    TMDB_RATE_LIMIT_BATCH_RESERVE=0.5,
+    TMDB_RATE_LIMIT_MAX_WAIT={'interactive': 0, 'batch': 0},
+)
+class RateLimiterTestCase(TestCase):
+    """Test cases for the TMDb token-bucket rate limiter."""
+    
+    def setUp(self):
+        metrics.reset()
+        self.limiter = RateLimiter(LocalTokenBucket(rate=0.001, capacity=4))
+    
+    def test_batch_leaves_reserve_for_interactive(self):
+        """Test batch calls stop at the reserve while interactive calls continue."""
+        self.assertTrue(self.limiter.acquire(BATCH))
+        self.assertTrue(self.limiter.acquire(BATCH))
+        self.assertFalse(self.limiter.acquire(BATCH))
+        self.assertTrue(self.limiter.acquire(INTERACTIVE))
+        self.assertTrue(self.limiter.acquire(INTERACTIVE))
+        self.assertFalse(self.limiter.acquire(INTERACTIVE))
+        self.assertEqual(metrics.snapshot()['rate_limit.shed.batch'], 1)
+    
+    @override_settings(TMDB_RATE_LIMIT_MAX_WAIT={'interactive': 1, 'batch': 1})
+    def test_waits_for_refill(self):
+        """Test a caller queues for a token that frees up within its budget."""
+        limiter = RateLimiter(LocalTokenBucket(rate=100, capacity=1))
+        self.assertTrue(limiter.acquire(INTERACTIVE))
+        self.assertTrue(limiter.acquire(INTERACTIVE))
+        self.assertEqual(metrics.snapshot()['rate_limit.waits.interactive'], 1)
+    
+    @override_settings(TMDB_API_KEY='test-key')
+    def test_shed_request_does_not_hit_tmdb(self):
+        """Test TMDbClient skips the HTTP call when the limiter sheds it."""
+        session = mock.Mock()
+        client = tmdb_client.TMDbClient(session=session)
+        with mock.patch.object(tmdb_client, 'get_rate_limiter', return_value=self.limiter):
+            self.limiter.bucket._tokens = 0
+            self.assertIsNone(client._make_request('/movie/popular'))
+        session.get.assert_not_called()
+
+
+class CircuitBreakerTestCase(TestCase):
+    """Test cases for the TMDb circuit breaker and degraded responses."""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.breaker = CircuitBreaker(failure_threshold=2, slow_call_seconds=1, reset_timeout=0.05)
+    
+    def test_opens_after_failures_and_recovers(self):
+        """Test the breaker opens, fails fast, then closes after a good trial call."""
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.allow_request())
+        
+        time.sleep(0.06)
+        self.assertTrue(self.breaker.allow_request())
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertFalse(self.breaker.allow_request())
+        self.breaker.record_success(0.1)
+        self.assertEqual(self.breaker.state, CLOSED)
+    
+    def test_slow_calls_count_as_failures(self):
+        """Test responses slower than the threshold open the breaker."""
+        self.breaker.record_success(5)
+        self.breaker.record_success(5)
+        self.assertEqual(self.breaker.state, OPEN)
+    
+    def test_degraded_response_from_local_movies(self):
+        """Test list endpoints fall back to the Movie table with a degraded header."""
+        Movie.objects.create(tmdb_id=1, title='Low', popularity=1, vote_average=9)
+        Movie.objects.create(tmdb_id=2, title='High', popularity=50, vote_average=5)
+        tmdb = mock.Mock()
+        tmdb.get_popular_movies.return_value = None
+        tmdb.get_top_rated_movies.return_value = None
+        with mock.patch.object(views, 'get_tmdb_client', return_value=tmdb):
+            popular = self.client.get('/api/movies/popular/')
+            top_rated = self.client.get('/api/movies/top_rated/')
+        
+        self.assertEqual(popular.status_code, status.HTTP_200_OK)
+        self.assertEqual(popular[views.DEGRADED_HEADER], 'tmdb-unavailable')
+        self.assertEqual([m['title'] for m in popular.data['results']], ['High', 'Low'])
+        self.assertEqual([m['title'] for m in top_rated.data['results']], ['Low', 'High'])
+    
+    def test_degraded_response_without_local_movies(self):
+        """Test the endpoint still returns 503 when nothing is stored locally."""
+        tmdb = mock.Mock()
+        tmdb.get_trending_movies.return_value = None
+        with mock.patch.object(views, 'get_tmdb_client', return_value=tmdb):
+            response = self.client.get('/api/movies/trending/')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+class CacheCodecTestCase(TestCase):
+    """Test cases for the compact TMDb cache format."""
+    
+    def page(self):
+        return {
+            'page': 1,
+            'total_pages': 500,
+            'total_results': 10000,
+            'results': [
+                {
+                    'id': 550 + i,
+                    'title': f'Movie {i}',
+                    'overview': f'An insomniac office worker number {i} forms a fight club.',
+                    'release_date': '1999-10-15',
+                    'poster_path': None,
+                    'popularity': 26.5,
+                    'vote_average': 8.4,
+                    'vote_count': 15000,
+                    'genre_ids': [18, 53],
+                    'adult': False,
+                    'original_title': f'Movie {i}',
+                }
+                for i in range(20)
+            ],
+        }
+    
+    def test_page_round_trip_keeps_used_fields(self):
+        """Test pages decode to the projected fields and drop unused ones."""
+        entry, timeout = tmdb_client.make_cache_entry(self.page(), 'popular')
+        decoded = decode_entry(encode_entry(entry))
+        self.assertEqual(decoded, entry)
+        movie = decoded['data']['results'][0]
+        self.assertEqual(movie['title'], 'Movie 0')
+        self.assertEqual(movie['genre_ids'], [18, 53])
+        self.assertNotIn('adult', movie)
+        self.assertIsNone(movie['poster_path'])
+        self.assertIsNone(movie['backdrop_path'])
+        self.assertEqual(decoded['data']['total_pages'], 500)
+    
+    def test_non_page_payload_round_trip(self):
+        """Test detail payloads are stored whole."""
+        entry = {'data': {'id': 550, 'genres': [{'id': 18, 'name': 'Drama'}]}, 'soft_expires': 1.5}
+        self.assertEqual(decode_entry(encode_entry(entry)), entry)
+    
+    def test_encoded_page_is_smaller_than_pickle(self):
+        """Test the encoded page is smaller than the pickled raw payload."""
+        import pickle
+        page = self.page()
+        entry, timeout = tmdb_client.make_cache_entry(page, 'popular')
+        self.assertLess(len(encode_entry(entry, compress=False)), len(pickle.dumps(page)))
+        self.assertLess(len(encode_entry(entry, compress=True)), len(pickle.dumps(page)) / 2)
+    
+    def test_legacy_values_are_ignored(self):
+        """Test values in an unknown format decode to None."""
+        import msgpack
+        self.assertIsNone(decode_entry({'results': []}))
+        self.assertIsNone(decode_entry(None))
+        self.assertIsNone(decode_entry(b'\x02' + msgpack.packb([1, 1.5, [1, 2, 3, None], []])))
+    
+    def test_corrupt_values_are_misses(self):
+        """Test truncated or garbled bytes decode to None instead of raising."""
+        entry, timeout = tmdb_client.make_cache_entry(self.page(), 'popular')
+        for compress in (False, True):
+            raw = encode_entry(entry, compress=compress)
+            self.assertIsNone(decode_entry(raw[:len(raw) // 2]))
+        self.assertIsNone(decode_entry(b'\x01not zlib'))
+        self.assertIsNone(decode_entry(b'\x00\xc1'))
+    
+    def test_compression_is_off_by_default(self):
+        """Test entries are only compressed when TMDB_CACHE_COMPRESS is enabled."""
+        entry, timeout = tmdb_client.make_cache_entry(self.page(), 'popular')
+        self.assertEqual(encode_entry(entry), encode_entry(entry, compress=False))
+    
+    def test_decoded_size_exceeds_encoded_size(self):
+        """Test the L1 charge reflects the decoded dicts, not the encoded bytes."""
+        entry, timeout = tmdb_client.make_cache_entry(self.page(), 'popular')
+        self.assertGreater(decoded_size(entry), len(encode_entry(entry, compress=False)))
+
+
+class MovieIngestionTestCase(TestCase):
+    """Test cases for bulk ingestion of TMDb results."""
+    
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+    
+    def tearDown(self):
+        cache.clear()
+        local_cache.clear()
+    
+    def test_upsert_returns_movies_in_tmdb_order(self):
+        """Test a page is saved in one upsert and returned in TMDb order."""
+        Movie.objects.create(tmdb_id=2, title='Old title', popularity=1)
+        results = [
+            {'id': 3, 'title': 'Third', 'popularity': 5, 'release_date': ''},
+            {'id': 2, 'title': 'New title', 'popularity': 9, 'genre_ids': [18]},
+            {'id': 1, 'title': 'First', 'popularity': None},
+            {'id': 3, 'title': 'Duplicate'},
+        ]
+        with self.assertNumQueries(2):
+            movies = upsert_movies(results)
+        
+        self.assertEqual([movie.tmdb_id for movie in movies], [3, 2, 1])
+        self.assertEqual(Movie.objects.count(), 3)
+        updated = Movie.objects.get(tmdb_id=2)
+        self.assertEqual(updated.title, 'New title')
+        self.assertEqual(updated.popularity, 9)
+        self.assertEqual(updated.genre_ids, [18])
+        self.assertIsNone(Movie.objects.get(tmdb_id=3).release_date)
+    
+    def test_list_action_uses_bulk_upsert(self):
+        """Test a list action saves its page with a constant number of queries."""
+        tmdb = mock.Mock()
+        tmdb.get_popular_movies.return_value = {
+            'page': 1,
+            'total_pages': 1,
+            'total_results': 20,
+            'results': [{'id': i, 'title': f'Movie {i}'} for i in range(20)],
+        }
+        with mock.patch.object(views, 'get_tmdb_client', return_value=tmdb):
+            with self.assertNumQueries(2):
+                response = APIClient().get('/api/movies/popular/')
+        self.assertEqual([m['tmdb_id'] for m in response.data['results']], list(range(20)))
+    
+    def test_ingested_page_skips_writes(self):
+        """Test a page seen before is read back in one query without writes."""
+        page = project_page({
+            'page': 1,
+            'results': [{'id': i, 'title': f'Movie {i}'} for i in range(5, 0, -1)],
+        })
+        with self.assertNumQueries(2):
+            ingest_page(page)
+        with self.assertNumQueries(1):
+            movies = ingest_page(page)
+        self.assertEqual([movie.tmdb_id for movie in movies], [5, 4, 3, 2, 1])
+        
+        changed = project_page({'page': 1, 'results': [{'id': 5, 'title': 'Renamed'}]})
+        self.assertNotEqual(changed['fingerprint'], page['fingerprint'])
+        ingest_page(changed)
+        self.assertEqual(Movie.objects.get(tmdb_id=5).title, 'Renamed')
+    
+    def test_ingested_page_with_missing_rows_is_rewritten(self):
+        """Test a remembered page is upserted again if its rows were deleted."""
+        page = project_page({'page': 1, 'results': [{'id': 7, 'title': 'Seven'}]})
+        ingest_page(page)
+        Movie.objects.all().delete()
+        
+        movies = ingest_page(page)
+        self.assertEqual([movie.tmdb_id for movie in movies], [7])
+        self.assertTrue(Movie.objects.filter(tmdb_id=7).exists())
+
+
+class ItemSimilarityTestCase(TestCase):
+    """Test cases for the local item-item recommender."""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.override = override_settings(RECOMMENDER_DIR=self.tmpdir.name)
+        self.override.enable()
+        
+        self.movies = [
+            Movie.objects.create(tmdb_id=i, title=f'Movie {i}', popularity=i)
+            for i in range(1, 5)
+        ]
+        users = [
+            User.objects.create_user(username=f'user{i}', email=f'user{i}@example.com', password='testpass123')
+            for i in range(3)
+        ]
+        a, b, c, d = self.movies
+        for user in users:
+            MovieRating.objects.create(user=user, movie=a, rating=9)
+            MovieRating.objects.create(user=user, movie=b, rating=8)
+        MovieRating.objects.create(user=users[0], movie=c, rating=3)
+        UserFavoriteMovie.objects.create(user=users[0], movie=a)
+        UserFavoriteMovie.objects.create(user=users[2], movie=d)
+    
+    def tearDown(self):
+        self.override.disable()
+        self.tmpdir.cleanup()
+    
+    def test_interaction_matrix_keeps_strongest_signal(self):
+        """Test a rated favorite counts once with the favorite weight."""
+        matrix, user_ids, movie_ids = build_interaction_matrix()
+        self.assertEqual(matrix.shape, (3, 4))
+        self.assertEqual(matrix.nnz, 8)
+        self.assertAlmostEqual(matrix[0, 0], 1.0)
+        self.assertAlmostEqual(matrix[1, 0], 0.9)
+    
+    def test_neighbors_ranked_by_cosine(self):
+        """Test co-rated movies rank first and lookups use primary keys."""
+        matrix, _, movie_ids = build_interaction_matrix()
+        neighbors, scores = item_item_neighbors(matrix, 2)
+        index = NeighborIndex.from_matrix(movie_ids, neighbors, scores)
+        
+        a, b, c, d = self.movies
+        self.assertEqual([movie_id for movie_id, _ in index.neighbors(a.pk)], [b.pk, c.pk])
+        self.assertEqual([movie_id for movie_id, _ in index.neighbors(d.pk)], [b.pk, a.pk])
+        self.assertEqual(len(index.neighbors(c.pk, limit=1)), 1)
+        self.assertEqual(index.neighbors(10 ** 6), [])
+        self.assertAlmostEqual(index.neighbors(a.pk)[0][1], 0.9987, places=4)
+    
+    def test_similar_endpoint_serves_built_index(self):
+        """Test /similar/ serves neighbours after the build command runs."""
+        a, b, c, d = self.movies
+        response = APIClient().get(f'/api/movies/{a.pk}/similar/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 0)
+        
+        call_command('build_similarity_index', top_k=3, stdout=mock.Mock())
+        response = APIClient().get(f'/api/movies/{a.pk}/similar/?limit=2')
+        self.assertEqual([movie['id'] for movie in response.data['results']], [b.pk, c.pk])
+        self.assertGreater(response.data['results'][0]['similarity'], 0.9)
+
+
+class ForYouTestCase(TestCase):
+    """Test cases for personalized recommendations."""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.seen = Movie.objects.create(tmdb_id=1, title='Seen drama', popularity=50, genre_ids=[18])
+        self.drama = Movie.objects.create(tmdb_id=2, title='Drama', popularity=10, genre_ids=[18])
+        self.action = Movie.objects.create(tmdb_id=3, title='Action', popularity=30, genre_ids=[28])
+        MovieRating.objects.create(user=self.user, movie=self.seen, rating=10)
+        self.client.force_authenticate(user=self.user)
+        
+        tmdb = mock.Mock()
+        tmdb.get_trending_movies.return_value = None
+        tmdb.get_popular_movies.return_value = {
+            'page': 1,
+            'results': [
+                {'id': 1, 'title': 'Seen drama', 'popularity': 50, 'genre_ids': [18]},
+                {'id': 2, 'title': 'Drama', 'popularity': 10, 'genre_ids': [18]},
+                {'id': 3, 'title': 'Action', 'popularity': 30, 'genre_ids': [28]},
+            ],
+        }
+        patcher = mock.patch.object(personalized, 'get_tmdb_client', return_value=tmdb)
+        self.tmdb = patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def tearDown(self):
+        cache.clear()
+    
+    def test_for_you_ranks_by_genre_affinity(self):
+        """Test unseen movies are ranked by the user's genre history."""
+        response = self.client.get('/api/movies/for_you/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ids = [movie['id'] for movie in response.data['results']]
+        self.assertEqual(ids, [self.drama.id, self.action.id])
+        self.assertEqual(response.data['count'], 2)
+        self.assertGreater(response.data['results'][0]['score'], response.data['results'][1]['score'])
+    
+    def test_for_you_is_cached_per_user(self):
+        """Test a warm request skips scoring and a new rating invalidates it."""
+        self.client.get('/api/movies/for_you/')
+        with self.assertNumQueries(3):
+            self.client.get('/api/movies/for_you/')
+        self.assertEqual(self.tmdb.call_count, 1)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/movies/{self.drama.id}/rate/', {'rating': 2})
+        response = self.client.get('/api/movies/for_you/')
+        self.assertEqual([movie['id'] for movie in response.data['results']], [self.action.id])
+    
+    def test_cached_taste_profile_is_served_until_history_changes(self):
+        """Test a folded profile replaces the history queries and a new rating drops it."""
+        cache.set(
+            personalized.taste_profile_cache_key(self.user.pk),
+            {'history': {str(self.seen.pk): 1.0}, 'genres': {'28': 5.0}},
+        )
+        with mock.patch.object(personalized, 'user_history') as user_history:
+            response = self.client.get('/api/movies/for_you/')
+        user_history.assert_not_called()
+        self.assertEqual([movie['id'] for movie in response.data['results']], [self.action.id, self.drama.id])
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/movies/{self.drama.id}/rate/', {'rating': 9})
+        self.assertIsNone(personalized.get_taste_profile(self.user.pk))
+    
+    def test_history_keeps_latest_per_user(self):
+        """Test the history limit is applied per user for one user and for batches."""
+        other = User.objects.create_user(username='other', password='testpass123')
+        MovieRating.objects.create(user=other, movie=self.drama, rating=8)
+        MovieRating.objects.create(user=self.user, movie=self.action, rating=3)
+        MovieRating.objects.filter(movie=self.seen).update(updated_at=timezone.now() - timedelta(days=1))
+        
+        with override_settings(RECOMMENDER_FOR_YOU_HISTORY=1):
+            self.assertEqual(personalized.user_history(self.user), {self.action.pk: -0.4})
+            histories = personalized.user_histories([self.user.pk, other.pk])
+        self.assertEqual(histories, {self.user.pk: {self.action.pk: -0.4}, other.pk: {self.drama.pk: 0.6}})
+    
+    def test_for_you_blends_als_factors(self):
+        """Test a published ALS model adds candidates and outweighs genre affinity."""
+        hidden = Movie.objects.create(tmdb_id=4, title='Hidden', popularity=1, genre_ids=[35])
+        movie_ids = np.array([self.seen.pk, self.drama.pk, self.action.pk, hidden.pk])
+        with tempfile.TemporaryDirectory() as tmpdir, override_settings(RECOMMENDER_DIR=tmpdir):
+            als_store.publish({
+                'user_ids': np.array([self.user.pk]),
+                'movie_ids': movie_ids,
+                'user_factors': np.array([[1.0]], dtype=np.float32),
+                'item_factors': np.array([[1.0], [-1.0], [1.0], [0.5]], dtype=np.float32),
+            })
+            response = self.client.get('/api/movies/for_you/')
+        
+        ids = [movie['id'] for movie in response.data['results']]
+        self.assertEqual(ids[0], self.action.id)
+        self.assertIn(hidden.id, ids)
+    
+    def test_for_you_requires_authentication(self):
+        """Test anonymous users cannot get personalized recommendations."""
+        response = APIClient().get('/api/movies/for_you/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class ALSTrainingTestCase(TestCase):
+    """Test cases for ALS matrix factorization."""
+    
+    def test_als_recovers_low_rank_ratings(self):
+        """Test ALS fits a low-rank matrix and the process pool gives the same result."""
+        rng = np.random.default_rng(1)
+        full = rng.normal(size=(30, 3)) @ rng.normal(size=(20, 3)).T
+        rows, cols = np.nonzero(rng.random(full.shape) < 0.6)
+        matrix = sparse.csr_matrix((full[rows, cols], (rows, cols)), shape=full.shape)
+        
+        user_factors, item_factors = train_als(matrix, factors=3, iterations=15, regularization=0.01)
+        predicted = np.einsum('ij,ij->i', user_factors[rows], item_factors[cols])
+        self.assertLess(np.sqrt(np.mean((predicted - full[rows, cols]) ** 2)), 0.1)
+        
+        parallel = train_als(matrix, factors=3, iterations=15, regularization=0.01, workers=2, block_size=8)
+        np.testing.assert_allclose(parallel[0], user_factors, rtol=1e-5, atol=1e-5)
+    
+    def test_train_recommender_writes_versioned_factors(self):
+        """Test the command saves memory-mappable factors and metadata."""
+        users = [
+            User.objects.create_user(username=f'user{i}', email=f'user{i}@example.com', password='testpass123')
+            for i in range(4)
+        ]
+        movies = [Movie.objects.create(tmdb_id=i, title=f'Movie {i}') for i in range(5)]
+        for i, user in enumerate(users):
+            for j, movie in enumerate(movies):
+                MovieRating.objects.create(user=user, movie=movie, rating=(i + j) % 10 + 1)
+        
+        with tempfile.TemporaryDirectory() as tmpdir, override_settings(
+            RECOMMENDER_DIR=tmpdir, RECOMMENDER_ANN_MIN_ITEMS=1
+        ):
+            stdout = mock.Mock()
+            call_command(
+                'train_recommender', factors=2, iterations=3, workers=1,
+                holdout=0.2, stdout=stdout
+            )
+            self.assertIn('Holdout RMSE', stdout.write.call_args[0][0])
+            
+            model = als_store.get()
+            self.assertIsInstance(model['item_factors'], np.memmap)
+            self.assertEqual(model['item_factors'].shape, (5, 2))
+            self.assertEqual(len(model['movie_ids']), 5)
+            self.assertEqual(model.meta['factors'], 2)
+            self.assertFalse(model.meta['implicit'])
+            
+            ann = IVFIndex.from_arrays(model.arrays, prefix='ann_')
+            self.assertEqual(sorted(ann.ids.tolist()), list(range(5)))
+            
+            factors = get_factor_model()
+            self.assertIsNotNone(factors.ann)
+            vector = factors.user_vector(users[0].pk)
+            exact_ids, _ = exact_search(model['item_factors'], model['movie_ids'], vector[None, :], 3)
+            with mock.patch.object(factors.ann, 'search', wraps=factors.ann.search) as search:
+                recommended = factors.recommend(users[0].pk, 3)
+            search.assert_called_once()
+            self.assertEqual([movie_id for movie_id, _ in recommended], exact_ids[0].tolist())
+
+
+class ModelStoreTestCase(TestCase):
+    """Test cases for the versioned model store."""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.override = override_settings(
+            RECOMMENDER_DIR=self.tmpdir.name,
+            RECOMMENDER_STORE_CHECK_INTERVAL=0,
+            RECOMMENDER_STORE_KEEP_VERSIONS=2,
+        )
+        self.override.enable()
+        self.store = ModelStore('test')
+    
+    def tearDown(self):
+        self.override.disable()
+        self.tmpdir.cleanup()
+    
+    def test_publish_swaps_current_version(self):
+        """Test readers move to a new version once it is published."""
+        self.assertIsNone(self.store.get())
+        
+        first = self.store.publish({'ids': np.array([1, 2, 3])}, {'note': 'first'}, version='v1')
+        model = self.store.get()
+        self.assertEqual(model.version, first)
+        self.assertIsInstance(model['ids'], np.memmap)
+        self.assertEqual(model.meta['note'], 'first')
+        
+        self.store.publish({'ids': np.array([4, 5])}, version='v2')
+        self.assertEqual(self.store.get()['ids'].tolist(), [4, 5])
+        self.assertEqual(self.store.loaded_version(), 'v2')
+        self.assertEqual(model['ids'].tolist(), [1, 2, 3])
+    
+    def test_missing_model_is_not_rechecked_every_call(self):
+        """Test an unpublished store re-reads CURRENT only once per check interval."""
+        with override_settings(RECOMMENDER_STORE_CHECK_INTERVAL=60):
+            self.assertIsNone(self.store.get())
+            ModelStore('test').publish({'ids': np.array([1])}, version='v1')
+            with mock.patch.object(self.store, 'current_version') as current_version:
+                self.assertIsNone(self.store.get())
+            current_version.assert_not_called()
+            
+            self.store.publish({'ids': np.array([2])}, version='v2')
+            self.assertEqual(self.store.get().version, 'v2')
+    
+    def test_prune_keeps_recent_versions(self):
+        """Test old versions are removed and the current one is kept."""
+        for version in ('v1', 'v2', 'v3'):
+            self.store.publish({'ids': np.array([1])}, version=version)
+        self.assertEqual(sorted(os.listdir(self.store.versions_dir)), ['v2', 'v3'])
+        self.assertEqual(self.store.current_version(), 'v3')
+    
+    def test_lookup_maps_ids_to_positions(self):
+        """Test id lookups return positions and -1 for unknown ids."""
+        ids = np.array([3, 7, 10])
+        self.assertEqual(lookup(ids, [10, 3, 5, 11]).tolist(), [2, 0, -1, -1])
+        self.assertEqual(int(lookup(ids, 7)), 1)
+        self.assertEqual(int(lookup(np.array([], dtype=np.int64), 7)), -1)
+
+
+class ContentIndexTestCase(TestCase):
+    """Test cases for the content-based similarity index."""
+    
+    def setUp(self):
+        cache.clear()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.override = override_settings(RECOMMENDER_DIR=self.tmpdir.name, RECOMMENDER_STORE_CHECK_INTERVAL=0)
+        self.override.enable()
+        
+        self.space = Movie.objects.create(
+            tmdb_id=1, title='Space', genre_ids=[878], overview='Astronauts travel to a distant planet.'
+        )
+        self.orbit = Movie.objects.create(
+            tmdb_id=2, title='Orbit', genre_ids=[878, 12], overview='A crew of astronauts is stranded on a planet.'
+        )
+        self.romance = Movie.objects.create(
+            tmdb_id=3, title='Romance', genre_ids=[10749], overview='Two strangers fall in love in Paris.'
+        )
+    
+    def tearDown(self):
+        self.override.disable()
+        self.tmpdir.cleanup()
+        cache.clear()
+    
+    def test_tokenize_drops_stop_words(self):
+        """Test tokenization lowercases and removes stop words."""
+        self.assertEqual(content.tokenize('The Crew of a Ship, in 2049!'), ['crew', 'ship', '2049'])
+    
+    def test_build_ranks_shared_genres_and_words(self):
+        """Test movies sharing genres and overview words are neighbours."""
+        call_command('build_content_index', top_k=2, stdout=mock.Mock())
+        index = content.get_content_index()
+        self.assertEqual(index.neighbors(self.space.pk)[0][0], self.orbit.pk)
+        self.assertEqual([movie_id for movie_id, _ in index.neighbors(self.romance.pk)], [])
+    
+    def test_ingested_movies_are_folded_in(self):
+        """Test an ingestion burst schedules one delayed update covering every movie."""
+        content.build_content_index(top_k=2)
+        
+        with mock.patch.object(content.threading, 'Timer') as timer:
+            upsert_movies([{
+                'id': 4, 'title': 'Planet', 'genre_ids': [878],
+                'overview': 'Astronauts explore a distant planet.',
+            }])
+            upsert_movies([{'id': 6, 'title': 'Moon', 'genre_ids': [878], 'overview': 'A lunar base.'}])
+        timer.assert_called_once()
+        self.assertTrue(timer.return_value.daemon)
+        
+        self.assertIsNotNone(content.run_content_update())
+        self.assertIsNone(content.run_content_update())
+        planet = Movie.objects.get(tmdb_id=4)
+        self.assertIn(Movie.objects.get(tmdb_id=6).pk, content.get_content_index())
+        index = content.get_content_index()
+        self.assertIn(planet.pk, index)
+        self.assertEqual(index.neighbors(planet.pk)[0][0], self.space.pk)
+        self.assertIn(planet.pk, [movie_id for movie_id, _ in index.neighbors(self.space.pk)])
+        self.assertIsNone(content.update_content_index())
+    
+    def test_similar_falls_back_to_content(self):
+        """Test /similar/ uses the content index when there are no ratings."""
+        content.build_content_index(top_k=2)
+        response = APIClient().get(f'/api/movies/{self.space.pk}/similar/')
+        self.assertEqual(response.data['source'], 'content')
+        self.assertEqual(response.data['results'][0]['id'], self.orbit.pk)
+        
+        unindexed = Movie.objects.create(
+            tmdb_id=5, title='Unindexed', genre_ids=[10749], overview='Love in Paris.'
+        )
+        response = APIClient().get(f'/api/movies/{unindexed.pk}/similar/')
+        self.assertEqual(response.data['results'][0]['id'], self.romance.pk)
+
+
+class IVFIndexTestCase(TestCase):
+    """Test cases for the IVF approximate nearest-neighbour index."""
+    
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        centres = rng.standard_normal((20, 16))
+        data = centres[rng.integers(0, 20, 2050)] + 0.5 * rng.standard_normal((2050, 16))
+        data = (data / np.linalg.norm(data, axis=1, keepdims=True)).astype(np.float32)
+        self.vectors, self.queries = data[:2000], data[2000:]
+        self.ids = np.arange(1000, 3000)
+        self.index = IVFIndex.build(self.ids, self.vectors, n_lists=20, seed=0)
+        self.exact_ids, _ = exact_search(self.vectors, self.ids, self.queries, 10)
+    
+    def recall(self, found):
+        hits = sum(len(np.intersect1d(found[row], self.exact_ids[row])) for row in range(len(found)))
+        return hits / self.exact_ids.size
+    
+    def test_recall_grows_with_probes(self):
+        """Test probing every cell is exact and a few cells keep most neighbours."""
+        exhaustive, _ = self.index.search(self.queries, 10, n_probe=20)
+        self.assertEqual(self.recall(exhaustive), 1.0)
+        
+        few, _ = self.index.search(self.queries, 10, n_probe=3)
+        self.assertGreater(self.recall(few), 0.8)
+        self.assertLessEqual(self.recall(self.index.search(self.queries, 10, n_probe=1)[0]), self.recall(few))
+    
+    def test_save_and_load_round_trip(self):
+        """Test a saved index loads memory-mapped and returns the same results."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.index.save(tmpdir)
+            loaded = IVFIndex.load(tmpdir, n_probe=4)
+            self.assertIsInstance(loaded.vectors, np.memmap)
+            np.testing.assert_array_equal(
+                loaded.search(self.queries, 10)[0], self.index.search(self.queries, 10, n_probe=4)[0]
+            )
+
+
+class RecommendationEventsTestCase(TestCase):
+    """Test cases for incremental recommendation updates."""
+    
+    def setUp(self):
+        cache.clear()
+        self.users = [
+            User.objects.create_user(username=f'user{i}', email=f'user{i}@example.com', password='testpass123')
+            for i in range(2)
+        ]
+        self.movies = [
+            Movie.objects.create(tmdb_id=i, title=f'Movie {i}', genre_ids=[18 + i]) for i in range(3)
+        ]
+    
+    def tearDown(self):
+        cache.clear()
+    
+    def counts(self):
+        return {
+            (row.movie_a_id, row.movie_b_id): row.count for row in MovieCooccurrence.objects.all()
+        }
+    
+    def test_writes_append_events(self):
+        """Test rating and favorite writes are logged."""
+        user, movie = self.users[0], self.movies[0]
+        rating = MovieRating.objects.create(user=user, movie=movie, rating=8)
+        rating.delete()
+        favorite = UserFavoriteMovie.objects.create(user=user, movie=movie)
+        favorite.delete()
+        self.assertEqual(
+            list(InteractionEvent.objects.values_list('kind', 'rating')),
+            [('rating', 8), ('rating_removed', None), ('favorite', None), ('favorite_removed', None)],
+        )
+    
+    def test_events_fold_into_cooccurrence_and_profile(self):
+        """Test folded events match a full rebuild and only touch changed pairs."""
+        a, b, c = self.movies
+        first, second = self.users
+        MovieRating.objects.create(user=first, movie=a, rating=9)
+        MovieRating.objects.create(user=first, movie=b, rating=8)
+        MovieRating.objects.create(user=first, movie=c, rating=2)
+        UserFavoriteMovie.objects.create(user=second, movie=a)
+        UserFavoriteMovie.objects.create(user=second, movie=b)
+        
+        self.assertEqual(events.process_events(), 5)
+        expected = {(a.pk, a.pk): 2, (b.pk, b.pk): 2, (a.pk, b.pk): 2}
+        self.assertEqual(self.counts(), expected)
+        profile = personalized.get_taste_profile(first.pk)
+        self.assertGreater(profile['genres'][str(a.genre_ids[0])], 0)
+        self.assertLess(profile['genres'][str(c.genre_ids[0])], 0)
+        
+        MovieRating.objects.filter(user=first, movie=b).delete()
+        MovieRating.objects.get(user=first, movie=a).delete()
+        for rating in MovieRating.objects.filter(user=first, movie=c):
+            rating.rating = 10
+            rating.save()
+        self.assertEqual(events.process_events(), 3)
+        self.assertEqual(self.counts(), {(a.pk, a.pk): 1, (b.pk, b.pk): 1, (a.pk, b.pk): 1, (c.pk, c.pk): 1})
+        
+        incremental = self.counts()
+        call_command('update_recommendations', rebuild=True, stdout=mock.Mock())
+        self.assertEqual(self.counts(), incremental)
+        self.assertEqual(UserTasteProfile.objects.count(), 2)
+        self.assertFalse(InteractionEvent.objects.filter(processed=False).exists())
+    
+    def test_folded_events_are_purged_after_retention(self):
+        """Test only folded events older than the retention window are deleted."""
+        a, b, _ = self.movies
+        first = self.users[0]
+        MovieRating.objects.create(user=first, movie=a, rating=9)
+        events.process_events()
+        InteractionEvent.objects.update(created_at=timezone.now() - timedelta(days=2))
+        MovieRating.objects.create(user=first, movie=b, rating=8)
+        
+        self.assertEqual(events.purge_processed_events(retention=60 * 60 * 24), 1)
+        self.assertEqual(list(InteractionEvent.objects.values_list('movie_id', 'processed')), [(b.pk, False)])
+        
+        call_command('update_recommendations', retention=0, stdout=mock.Mock())
+        self.assertFalse(InteractionEvent.objects.exists())
+
+
+class CascadeDeleteTestCase(TransactionTestCase):
+    """Test users and movies with interactions can be deleted and committed."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.movie = Movie.objects.create(tmdb_id=1, title='Movie')
+        MovieRating.objects.create(user=self.user, movie=self.movie, rating=8)
+        UserFavoriteMovie.objects.create(user=self.user, movie=self.movie)
+    
+    def test_delete_user(self):
+        """Test deleting a user does not log events for its cascaded rows."""
+        self.user.delete()
+        self.assertFalse(InteractionEvent.objects.exists())
+        self.assertFalse(MovieRating.objects.exists())
+    
+    def test_delete_movie(self):
+        """Test deleting a movie does not log events for its cascaded rows."""
+        self.movie.delete()
+        self.assertFalse(InteractionEvent.objects.exists())
+        self.assertFalse(UserFavoriteMovie.objects.exists())
+    
+    def test_direct_delete_still_logs_event(self):
+        """Test removing a rating on its own is still recorded."""
+        MovieRating.objects.filter(user=self.user).delete()
+        self.assertTrue(InteractionEvent.objects.filter(kind=InteractionEvent.RATING_REMOVED).exists())
+
+
+class MovieSearchTestCase(TestCase):
+    """Test cases for local full-text movie search."""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.movies = [
+            Movie.objects.create(tmdb_id=1, title='Star Wars', overview='A farm boy joins the rebellion.', popularity=80),
+            Movie.objects.create(tmdb_id=2, title='The Star Chamber', overview='A judge turns vigilante.', popularity=5),
+            Movie.objects.create(tmdb_id=3, title='Galaxy Quest', overview='Actors from a space show meet real stars.', popularity=40),
+            Movie.objects.create(tmdb_id=4, title='Heat', overview='A detective hunts a crew of thieves.', popularity=60),
+        ]
+        tmdb = mock.Mock()
+        tmdb.search_movies.return_value = {
+            'page': 1,
+            'total_pages': 1,
+            'total_results': 1,
+            'results': [{'id': 10, 'title': 'Star Trek', 'popularity': 70}],
+        }
+        patcher = mock.patch.object(views, 'get_tmdb_client', return_value=tmdb)
+        self.tmdb = patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_search_ranks_by_relevance_and_popularity(self):
+        """Test title matches beat overview matches and prefixes match."""
+        star_wars, chamber, galaxy, _ = self.movies
+        self.assertEqual(search_movie_ids('star'), [star_wars.pk, chamber.pk, galaxy.pk])
+        self.assertEqual(search_movie_ids('Star Wa'), [star_wars.pk])
+        self.assertEqual(search_movie_ids('"); DROP TABLE --'), [])
+    
+    def test_search_index_follows_writes(self):
+        """Test the index picks up inserts, upserts and deletes."""
+        heat = self.movies[3]
+        upsert_movies([{'id': 4, 'title': 'Heat Wave', 'popularity': 60}])
+        self.assertEqual([movie.title for movie in search_movies('wave')], ['Heat Wave'])
+        heat.delete()
+        self.assertEqual(search_movies('wave'), [])
+    
+    @override_settings(SEARCH_LOCAL_MIN_RESULTS=3)
+    def test_search_answers_locally_when_enough_matches(self):
+        """Test enough local matches skip TMDb."""
+        response = self.client.get('/api/movies/search/?q=star')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['source'], 'local')
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(response.data['results'][0]['title'], 'Star Wars')
+        self.tmdb.return_value.search_movies.assert_not_called()
+    
+    @override_settings(SEARCH_LOCAL_MIN_RESULTS=5)
+    def test_search_falls_back_to_tmdb(self):
+        """Test too few local matches go to TMDb, and to local results when it fails."""
+        response = self.client.get('/api/movies/search/?q=star')
+        self.assertEqual(response.data['source'], 'tmdb')
+        self.assertEqual([movie['title'] for movie in response.data['results']], ['Star Trek'])
+        
+        self.tmdb.return_value.search_movies.return_value = None
+        response = self.client.get('/api/movies/search/?q=heat')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['source'], 'local')
+        self.assertTrue(response.data['degraded'])
+
+
+class AutocompleteTestCase(TestCase):
+    """Test cases for the in-memory title autocomplete index."""
+    
+    def setUp(self):
+        cache.clear()
+        title_index.clear()
+        self.addCleanup(title_index.clear)
+        self.client = APIClient()
+        Movie.objects.create(tmdb_id=1, title='Star Wars', popularity=80, release_date='1977-05-25')
+        Movie.objects.create(tmdb_id=2, title='Stardust', popularity=20)
+        Movie.objects.create(tmdb_id=3, title='A Star Is Born', popularity=50)
+        Movie.objects.create(tmdb_id=4, title='Amélie', popularity=30)
+    
+    def titles(self, query, limit=10):
+        return [movie['title'] for movie in title_index.search(query, limit)]
+    
+    def test_prefix_matches_any_word_by_popularity(self):
+        """Test prefixes match at word starts and rank by popularity."""
+        self.assertEqual(self.titles('star'), ['Star Wars', 'A Star Is Born', 'Stardust'])
+        self.assertEqual(self.titles('s'), ['Star Wars', 'A Star Is Born', 'Stardust'])
+        self.assertEqual(self.titles('st', limit=1), ['Star Wars'])
+        self.assertEqual(self.titles('wa'), ['Star Wars'])
+        self.assertEqual(self.titles('AMELIE'), ['Amélie'])
+        self.assertEqual(self.titles('  '), [])
+        self.assertEqual(normalize("Ocean's  Eleven!"), 'ocean s eleven')
+    
+    def test_endpoint_serves_from_memory(self):
+        """Test warm lookups hit neither the database nor the cache."""
+        title_index.ensure_current()
+        with self.assertNumQueries(0), mock.patch.object(cache, 'get') as cache_get:
+            response = self.client.get('/api/movies/autocomplete/?q=star&limit=2')
+        cache_get.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([movie['title'] for movie in response.data['results']], ['Star Wars', 'A Star Is Born'])
+        self.assertEqual(response.data['results'][0]['year'], 1977)
+    
+    def test_ingestion_updates_index(self):
+        """Test ingested movies are added and renamed titles drop old keys."""
+        title_index.ensure_current()
+        upsert_movies([
+            {'id': 2, 'title': 'Moon', 'popularity': 20},
+            {'id': 5, 'title': 'Star Trek', 'popularity': 90},
+        ])
+        self.assertEqual(self.titles('star'), ['Star Trek', 'Star Wars', 'A Star Is Born'])
+        self.assertEqual(self.titles('s'), ['Star Trek', 'Star Wars', 'A Star Is Born'])
+        self.assertEqual(self.titles('moo'), ['Moon'])
+        self.assertEqual(cache.get('autocomplete_generation'), 1)
+    
+    def test_other_workers_replay_ingested_ids(self):
+        """Test another worker folds in the published IDs instead of rebuilding."""
+        other = TitleIndex()
+        other.ensure_current()
+        title_index.ensure_current()
+        upsert_movies([{'id': 5, 'title': 'Star Trek', 'popularity': 90}])
+        
+        with mock.patch.object(other, 'build') as build:
+            other.catch_up(cache.get('autocomplete_generation'))
+        build.assert_not_called()
+        self.assertEqual([movie['title'] for movie in other.search('st', 2)], ['Star Trek', 'Star Wars'])
+        
+        cache.delete('autocomplete_changes_1')
+        stale = TitleIndex()
+        stale.ensure_current()
+        stale._generation = 0
+        with mock.patch.object(stale, 'build') as build:
+            stale.catch_up(1)
+        build.assert_called_once()
+    
+    @override_settings(AUTOCOMPLETE_MAX_LIMIT=2)
+    def test_demoted_top_hit_falls_back_to_a_scan(self):
+        """Test a top hit that lost popularity is not served from the stale top list."""
+        title_index.ensure_current()
+        with mock.patch.object(autocomplete.threading, 'Thread'):
+            upsert_movies([{'id': 1, 'title': 'Star Wars', 'popularity': 10}])
+        self.assertNotIn('s', title_index._top)
+        self.assertEqual(self.titles('s', limit=2), ['A Star Is Born', 'Stardust'])
+        
+        title_index._refresh_top()
+        self.assertEqual(self.titles('s', limit=2), ['A Star Is Born', 'Stardust'])
+        self.assertEqual(title_index._top['s'], [3, 2])
+
+
+class KeysetPaginationTestCase(TestCase):
+    """Test cases for opt-in keyset pagination."""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.movies = [
+            Movie.objects.create(tmdb_id=i, title=f'Movie {i}', popularity=i // 3)
+            for i in range(1, 24)
+        ]
+        self.client.force_authenticate(user=self.user)
+    
+    def walk(self, url):
+        """Follow next links from url and return the ids served, page by page."""
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            pages.append([item['id'] for item in response.data['results']])
+            url = response.data['next']
+        return pages
+    
+    def test_movie_list_walks_popularity_ties_in_order(self):
+        """Test every movie is served once, ordered by (popularity, id) despite ties."""
+        pages = self.walk('/api/movies/?pagination=cursor&page_size=5')
+        expected = [movie.id for movie in sorted(self.movies, key=lambda m: (-m.popularity, -m.id))]
+        self.assertEqual([len(page) for page in pages], [5, 5, 5, 5, 3])
+        self.assertEqual(sum(pages, []), expected)
+    
+    def test_ranked_list_actions_ignore_cursor_opt_in(self):
+        """Test for_you, which pages a ranked list, keeps page-number pagination."""
+        ranked = [(movie.id, 1.0) for movie in self.movies[:3]]
+        with mock.patch.object(views, 'rank_for_user', return_value=ranked):
+            response = self.client.get('/api/movies/for_you/?pagination=cursor')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual([movie['id'] for movie in response.data['results']], [movie.id for movie in self.movies[:3]])
+    
+    def test_previous_link_and_constant_queries(self):
+        """Test previous links return the prior page and deep pages skip COUNT and OFFSET."""
+        first = self.client.get('/api/movies/?pagination=cursor&page_size=5')
+        self.assertIsNone(first.data['previous'])
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(back.data['results'], first.data['results'])
+        self.assertIsNone(back.data['previous'])
+        
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(second.data['next'])
+        sql = ' '.join(query['sql'] for query in queries.captured_queries).upper()
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('OFFSET', sql)
+    
+    def test_favorites_and_ratings_with_identical_timestamps(self):
+        """Test rows sharing created_at are neither skipped nor repeated."""
+        for movie in self.movies[:7]:
+            UserFavoriteMovie.objects.create(user=self.user, movie=movie)
+            MovieRating.objects.create(user=self.user, movie=movie, rating=5)
+        UserFavoriteMovie.objects.update(created_at=self.movies[0].created_at)
+        
+        favorites = self.walk('/api/movies/favorites/my_favorites/?pagination=cursor&page_size=3')
+        expected = list(UserFavoriteMovie.objects.order_by('-id').values_list('id', flat=True))
+        self.assertEqual(sum(favorites, []), expected)
+        
+        ratings = self.walk('/api/movies/ratings/my_ratings/?pagination=cursor&page_size=3')
+        self.assertEqual(len(sum(ratings, [])), 7)
+    
+    def test_page_number_stays_default_and_bad_cursor_404s(self):
+        """Test clients that do not opt in keep page numbers."""
+        response = self.client.get('/api/movies/?page_size=5')
+        self.assertEqual(response.data['count'], 23)
+        response = self.client.get('/api/movies/?pagination=cursor&cursor=bm9wZQ')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class EstimatedCountPaginationTestCase(TestCase):
+    """Test cases for planner-estimated pagination counts."""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        for i in range(1, 24):
+            Movie.objects.create(tmdb_id=i, title=f'Movie {i}', popularity=i)
+    
+    def tearDown(self):
+        cache.clear()
+    
+    def test_sqlite_counts_exactly(self):
+        """Test backends without planner estimates report exact counts."""
+        self.assertIsNone(pagination.estimate_count(Movie.objects.all()))
+        response = self.client.get('/api/movies/?page_size=10')
+        self.assertEqual(response.data['count'], 23)
+        self.assertFalse(response.data['count_is_estimated'])
+    
+    def test_large_estimate_replaces_count(self):
+        """Test estimates above the threshold skip COUNT(*) and allow pages past the estimate."""
+        with mock.patch.object(pagination, 'estimate_count', return_value=50000), \
+                CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/movies/?page_size=10&page=2')
+        self.assertEqual(response.data['count'], 50000)
+        self.assertTrue(response.data['count_is_estimated'])
+        self.assertIsNotNone(response.data['next'])
+        self.assertNotIn('COUNT(', ' '.join(query['sql'] for query in queries.captured_queries).upper())
+        
+        with mock.patch.object(pagination, 'estimate_count', return_value=10000):
+            response = self.client.get('/api/movies/?page_size=10&page=3')
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertIsNone(response.data['next'])
+    
+    @override_settings(PAGINATION_ESTIMATE_THRESHOLD=1000)
+    def test_small_estimate_uses_cached_exact_count(self):
+        """Test estimates below the threshold fall back to a cached exact count."""
+        with mock.patch.object(pagination, 'estimate_count', return_value=20):
+            self.assertEqual(self.client.get('/api/movies/').data['count'], 23)
+            Movie.objects.create(tmdb_id=99, title='New')
+            response = self.client.get('/api/movies/')
+        self.assertEqual(response.data['count'], 23)
+        self.assertFalse(response.data['count_is_estimated'])
+    
+    @override_settings(PAGINATION_ESTIMATE_THRESHOLD=1000)
+    def test_cached_count_does_not_hide_new_pages(self):
+        """Test a favorite added after the count was cached stays reachable."""
+        user = User.objects.create_user(username='pager', password='testpass123')
+        self.client.force_authenticate(user=user)
+        movies = list(Movie.objects.order_by('tmdb_id'))
+        for movie in movies[:10]:
+            UserFavoriteMovie.objects.create(user=user, movie=movie)
+        url = '/api/movies/favorites/my_favorites/?page_size=10'
+        
+        with mock.patch.object(pagination, 'estimate_count', return_value=10):
+            self.assertEqual(self.client.get(url).data['count'], 10)
+            UserFavoriteMovie.objects.create(user=user, movie=movies[10])
+            response = self.client.get(url)
+            self.assertEqual(response.data['count'], 10)
+            self.assertIsNotNone(response.data['next'])
+            
+            response = self.client.get(url + '&page=2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNone(response.data['next'])
+
+
+class MovieBatchLookupTestCase(TestCase):
+    """Test cases for the batch movie lookup endpoint."""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.movies = [
+            Movie.objects.create(tmdb_id=100 + i, title=f'Movie {i}', popularity=i)
+            for i in range(30)
+        ]
+        UserFavoriteMovie.objects.create(user=self.user, movie=self.movies[1])
+        MovieRating.objects.create(user=self.user, movie=self.movies[2], rating=7)
+    
+    def test_get_returns_request_order_with_misses(self):
+        """Test results follow the request order and unknown IDs come back as null."""
+        first, second = self.movies[0].id, self.movies[5].id
+        response = self.client.get(f'/api/movies/batch/?ids={second},999999,{first},{second}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([item and item['id'] for item in results], [second, None, first, second])
+        self.assertEqual(response.data['missing'], [999999])
+        self.assertEqual(response.data['count'], 2)
+        self.assertIn('rating_histogram', results[0])
+    
+    def test_post_by_tmdb_id_uses_constant_queries(self):
+        """Test a large authenticated batch costs the same queries as a small one."""
+        self.client.force_authenticate(user=self.user)
+        tmdb_ids = [movie.tmdb_id for movie in self.movies]
+        with self.assertNumQueries(3):
+            response = self.client.post('/api/movies/batch/', {'tmdb_ids': tmdb_ids}, format='json')
+        self.assertEqual([item['tmdb_id'] for item in response.data['results']], tmdb_ids)
+        self.assertTrue(response.data['results'][1]['is_favorite'])
+        self.assertEqual(response.data['results'][2]['user_rating']['rating'], 7)
+    
+    @override_settings(MOVIE_BATCH_MAX_IDS=5)
+    def test_rejects_bad_requests(self):
+        """Test missing, mixed, malformed and oversized requests are rejected."""
+        for url in [
+            '/api/movies/batch/',
+            '/api/movies/batch/?ids=1&tmdb_ids=2',
+            '/api/movies/batch/?ids=1,abc',
+            '/api/movies/batch/?ids=1,2,3,4,5,6',
+        ]:
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_400_BAD_REQUEST, url)
+
+
+class BulkWriteTestCase(TestCase):
+    """Test cases for bulk rating and favorite writes."""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.movies = [
+            Movie.objects.create(tmdb_id=500 + i, title=f'Movie {i}', genre_ids=[18])
+            for i in range(40)
+        ]
+        self.client.force_authenticate(user=self.user)
+    
+    def assert_summaries_match(self):
+        expected = compute_summaries()
+        for summary in MovieRatingSummary.objects.all():
+            if summary.movie_id not in expected:
+                self.assertEqual(summary.rating_count, 0)
+                continue
+            self.assertEqual(
+                (summary.rating_sum, summary.rating_count, summary.histogram),
+                (expected[summary.movie_id].rating_sum, expected[summary.movie_id].rating_count,
+                 expected[summary.movie_id].histogram),
+            )
+    
+    def test_bulk_rate_reports_per_item_results(self):
+        """Test ratings upsert in one pass with aggregates and events kept in step."""
+        a, b, c = self.movies[:3]
+        MovieRating.objects.create(user=self.user, movie=a, rating=4)
+        MovieRating.objects.create(user=self.user, movie=b, rating=6, review='ok')
+        InteractionEvent.objects.all().delete()
+        MovieRatingSummary.objects.all().delete()
+        call_command('reconcile_rating_summaries', stdout=mock.Mock())
+        
+        response = self.client.post('/api/movies/ratings/bulk/', {'ratings': [
+            {'movie_id': a.id, 'rating': 9},
+            {'tmdb_id': b.tmdb_id, 'rating': 6, 'review': 'ok'},
+            {'tmdb_id': c.tmdb_id, 'rating': 3, 'review': 'meh'},
+            {'movie_id': 999999, 'rating': 5},
+            {'movie_id': c.id, 'rating': 11},
+            {'movie_id': c.id, 'tmdb_id': c.tmdb_id, 'rating': 5},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        statuses = [item['status'] for item in response.data['results']]
+        self.assertEqual(statuses, ['updated', 'unchanged', 'created', 'error', 'error', 'error'])
+        self.assertEqual(response.data['summary'], {'updated': 1, 'unchanged': 1, 'created': 1, 'error': 3})
+        self.assertIn('rating', response.data['results'][4]['errors'])
+        
+        self.assertEqual(MovieRating.objects.get(user=self.user, movie=a).rating, 9)
+        self.assertEqual(MovieRating.objects.get(user=self.user, movie=c).review, 'meh')
+        self.assert_summaries_match()
+        self.assertEqual(
+            sorted(InteractionEvent.objects.values_list('movie_id', 'rating')),
+            sorted([(a.id, 9), (c.id, 3)]),
+        )
+    
+    def test_bulk_rate_query_count_is_constant(self):
+        """Test a large import costs the same statements as a small one."""
+        def rate(movies, rating):
+            items = [{'movie_id': movie.id, 'rating': rating} for movie in movies]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post('/api/movies/ratings/bulk/', {'ratings': items}, format='json')
+            self.assertEqual(response.data['summary'], {'created': len(movies)})
+            return len(queries.captured_queries)
+        
+        self.assertEqual(rate(self.movies[:2], 7), rate(self.movies[2:], 7))
+        self.assert_summaries_match()
+    
+    def test_bulk_favorites_add_and_remove(self):
+        """Test favorites are added and removed in one request with events recorded."""
+        a, b, c = self.movies[:3]
+        UserFavoriteMovie.objects.create(user=self.user, movie=a)
+        InteractionEvent.objects.all().delete()
+        
+        response = self.client.post('/api/movies/favorites/bulk/', {
+            'add': [{'movie_id': a.id}, {'tmdb_id': b.tmdb_id}, {'movie_id': 999999}],
+            'remove': [{'movie_id': a.id}, {'movie_id': c.id}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['status'] for item in response.data['add']], ['unchanged', 'created', 'error'])
+        self.assertEqual([item['status'] for item in response.data['remove']], ['removed', 'unchanged'])
+        self.assertEqual(
+            list(UserFavoriteMovie.objects.filter(user=self.user).values_list('movie_id', flat=True)),
+            [b.id],
+        )
+        self.assertEqual(
+            sorted(InteractionEvent.objects.values_list('movie_id', 'kind')),
+            sorted([(b.id, InteractionEvent.FAVORITE), (a.id, InteractionEvent.FAVORITE_REMOVED)]),
+        )
+    
+    def test_bulk_rate_without_review_keeps_stored_review(self):
+        """Test an entry that omits review leaves the existing review alone."""
+        a = self.movies[0]
+        MovieRating.objects.create(user=self.user, movie=a, rating=6, review='ok')
+        response = self.client.post('/api/movies/ratings/bulk/', {
+            'ratings': [{'movie_id': a.id, 'rating': 8}],
+        }, format='json')
+        self.assertEqual(response.data['results'][0]['status'], 'updated')
+        rating = MovieRating.objects.get(user=self.user, movie=a)
+        self.assertEqual((rating.rating, rating.review), (8, 'ok'))
+    
+    def test_bulk_favorites_report_rows_actually_inserted(self):
+        """Test a favorite inserted concurrently by another request is reported unchanged."""
+        a, b = self.movies[:2]
+        bulk_create = UserFavoriteMovie.objects.bulk_create
+        
+        def race(rows, **kwargs):
+            UserFavoriteMovie.objects.create(user=self.user, movie=a)
+            return bulk_create(rows, **kwargs)
+        
+        InteractionEvent.objects.all().delete()
+        with mock.patch.object(UserFavoriteMovie.objects, 'bulk_create', side_effect=race):
+            response = self.client.post('/api/movies/favorites/bulk/', {
+                'add': [{'movie_id': a.id}, {'movie_id': b.id}],
+            }, format='json')
+        self.assertEqual([item['status'] for item in response.data['add']], ['unchanged', 'created'])
+        self.assertEqual(
+            sorted(InteractionEvent.objects.values_list('movie_id', flat=True)),
+            [a.id, b.id],
+        )
+    
+    @override_settings(BULK_WRITE_MAX_ITEMS=2)
+    def test_bulk_rejects_malformed_bodies(self):
+        """Test non-list and oversized bodies are rejected before any write."""
+        response = self.client.post('/api/movies/ratings/bulk/', {'ratings': {'movie_id': 1}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        items = [{'movie_id': movie.id} for movie in self.movies[:3]]
+        response = self.client.post('/api/movies/favorites/bulk/', {'add': items}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(UserFavoriteMovie.objects.exists())
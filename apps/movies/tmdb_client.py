@@ -1,21 +1,188 @@
 """
 TMDb API Client for fetching movie data.
 """
+import os
+import random
+import time
+import threading
 import requests
 import logging
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from django.conf import settings
 from django.core.cache import cache
 
+from . import metrics
+from .cache_codec import decode_entry, decoded_size, encode_entry, is_page, project_page
+from .circuit_breaker import breaker
+from .local_cache import local_cache
+from .rate_limit import INTERACTIVE, get_rate_limiter
+from .singleflight import coalescer
+
 logger = logging.getLogger(__name__)
 
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+_clients = {}
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def get_cache_ttls(endpoint_name):
+    """
+    Return (soft_ttl, grace) in seconds for a cached TMDb endpoint.
+    
+    Entries are fresh for soft_ttl seconds, then served stale for up to
+    grace more seconds while a background refresh runs. A grace of 0
+    disables stale-while-revalidate for the endpoint.
+    """
+    soft_ttl, grace = settings.TMDB_CACHE_TTLS.get(
+        endpoint_name, (settings.CACHE_TTL, 0)
+    )
+    if not settings.TMDB_SWR_ENABLED:
+        grace = 0
+    return soft_ttl, grace
+
+
+def make_cache_entry(data, endpoint_name):
+    """
+    Wrap a TMDb payload with its soft-expiry timestamp.
+    
+    List pages are projected down to the fields we use, so the entry holds
+    exactly what a cache hit will decode to.
+    
+    Returns:
+        Tuple of (cache entry, hard cache timeout in seconds)
+    """
+    if is_page(data):
+        data = project_page(data)
+    soft_ttl, grace = get_cache_ttls(endpoint_name)
+    entry = {'data': data, 'soft_expires': time.time() + soft_ttl}
+    return entry, soft_ttl + grace
+
+
+def retry_delay(attempt, response=None):
+    """
+    Seconds to wait before retrying a TMDb request.
+    
+    Honours Retry-After (capped at TMDB_RETRY_AFTER_MAX), otherwise uses
+    jittered exponential backoff. Callers also check within_retry_budget,
+    which bounds the total time spent on one request.
+    
+    Args:
+        attempt: Zero-based retry attempt
+        response: Response that triggered the retry, if any
+    """
+    if response is not None:
+        retry_after = response.headers.get('Retry-After')
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), settings.TMDB_RETRY_AFTER_MAX)
+    
+    delay = settings.TMDB_BACKOFF_FACTOR * (2 ** attempt)
+    delay += random.uniform(0, settings.TMDB_BACKOFF_JITTER)
+    return min(delay, settings.TMDB_BACKOFF_MAX)
+
+
+def within_retry_budget(priority, started, delay):
+    """
+    Check whether sleeping delay seconds keeps a request inside its budget.
+    
+    TMDB_RETRY_BUDGET caps the seconds a request may spend from its first
+    attempt until its last retry starts, per rate-limit priority, so that
+    interactive requests stay well inside the gunicorn worker timeout.
+    
+    Args:
+        priority: rate_limit.INTERACTIVE or rate_limit.BATCH
+        started: time.monotonic() when the first attempt started
+        delay: Seconds the next retry would sleep
+    """
+    return time.monotonic() - started + delay <= settings.TMDB_RETRY_BUDGET[priority]
+
+
+def build_session():
+    """
+    Build a pooled keep-alive session for TMDb.
+    
+    urllib3 only retries failed connections, which never reach TMDb.
+    Retries of 429/5xx responses happen in TMDbClient._make_request so that
+    each attempt takes its own rate-limit token.
+    
+    Returns:
+        Configured requests.Session
+    """
+    retry = Retry(
+        total=settings.TMDB_MAX_RETRIES,
+        connect=settings.TMDB_MAX_RETRIES,
+        read=0,
+        status=0,
+        other=0,
+        backoff_factor=settings.TMDB_BACKOFF_FACTOR,
+        allowed_methods=frozenset(['GET']),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=settings.TMDB_POOL_SIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'Accept': 'application/json'})
+    return session
+
+
+def get_session():
+    """
+    Return the process-wide TMDb session, creating it on first use.
+    
+    The session is rebuilt after a fork so that gunicorn workers never share
+    sockets inherited from the master process.
+    """
+    global _session, _session_pid
+    
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                _session = build_session()
+                _session_pid = pid
+    return _session
+
+
+def get_tmdb_client(priority=INTERACTIVE):
+    """
+    Return the process-wide TMDb client for a rate-limit priority.
+    
+    Args:
+        priority: rate_limit.INTERACTIVE or rate_limit.BATCH
+    """
+    client = _clients.get(priority)
+    if client is None:
+        with _session_lock:
+            client = _clients.get(priority)
+            if client is None:
+                client = _clients[priority] = TMDbClient(priority=priority)
+    return client
+
 
 class TMDbClient:
     """Client for interacting with The Movie Database (TMDb) API."""
     
-    def __init__(self):
+    def __init__(self, session=None, priority=INTERACTIVE):
         self.api_key = settings.TMDB_API_KEY
         self.base_url = settings.TMDB_BASE_URL
-        self.timeout = 10
+        self.timeout = settings.TMDB_TIMEOUT
+        self.priority = priority
+        self._session = session
+    
+    @property
+    def session(self):
+        """HTTP session used for requests; shared across the process by default."""
+        return self._session or get_session()
     
     def _make_request(self, endpoint, params=None):
         """
@@ -37,14 +204,165 @@ class TMDbClient:
         
         params['api_key'] = self.api_key
         
+        if not breaker.allow_request():
+            logger.warning(f"TMDb request to {endpoint} rejected: circuit breaker open")
+            return None
+        
+        rate_limiter = get_rate_limiter()
+        url = f"{self.base_url}{endpoint}"
+        started = time.monotonic()
+        response = None
+        
+        # Every attempt, retries included, takes a token, so retrying while
+        # TMDb throttles us cannot push the shared rate over its limit
+        for attempt in range(settings.TMDB_MAX_RETRIES + 1):
+            if rate_limiter and not rate_limiter.acquire(self.priority):
+                logger.warning(f"TMDb request to {endpoint} shed by rate limiter")
+                if response is None:
+                    breaker.release()
+                else:
+                    breaker.record_failure()
+                return None
+            
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                logger.error(f"TMDb API request failed: {str(e)}")
+                breaker.record_failure()
+                return None
+            
+            if response.status_code not in RETRY_STATUS_CODES or attempt == settings.TMDB_MAX_RETRIES:
+                break
+            delay = retry_delay(attempt, response)
+            if not within_retry_budget(self.priority, started, delay):
+                logger.warning(f"TMDb request to {endpoint} out of retry budget")
+                break
+            metrics.incr('tmdb.retries')
+            time.sleep(delay)
+        
         try:
-            url = f"{self.base_url}{endpoint}"
-            response = requests.get(url, params=params, timeout=self.timeout)
             response.raise_for_status()
-            return response.json()
+            data = response.json()
         except requests.exceptions.RequestException as e:
             logger.error(f"TMDb API request failed: {str(e)}")
+            if self._is_server_failure(e):
+                breaker.record_failure()
+            else:
+                breaker.record_success(time.monotonic() - started)
             return None
+        
+        breaker.record_success(time.monotonic() - started)
+        return data
+    
+    def _is_server_failure(self, error):
+        """Check whether a request error means TMDb is unhealthy, not that the request was bad."""
+        response = getattr(error, 'response', None)
+        if response is None:
+            return True
+        return response.status_code in RETRY_STATUS_CODES
+    
+    def _read_entry(self, cache_key):
+        """
+        Return the cache entry stored under cache_key, or None.
+        
+        Looks in the in-process LRU first and falls back to the shared cache,
+        promoting entries found there into the LRU.
+        """
+        entry = local_cache.get(cache_key)
+        if entry is not None:
+            return entry
+        
+        raw = cache.get(cache_key)
+        entry = decode_entry(raw)
+        if entry:
+            metrics.incr('l2.hits')
+            local_cache.set(cache_key, entry, decoded_size(entry))
+            return entry
+        
+        metrics.incr('l2.misses')
+        return None
+    
+    def _read_cache(self, cache_key):
+        """Return the cached payload for cache_key, fresh or stale, or None."""
+        entry = self._read_entry(cache_key)
+        return entry['data'] if entry else None
+    
+    def _fetch_and_cache(self, cache_key, endpoint, params, endpoint_name):
+        """Fetch a payload from TMDb and store it under cache_key."""
+        data = self._make_request(endpoint, params)
+        
+        if data:
+            entry, timeout = make_cache_entry(data, endpoint_name)
+            raw = encode_entry(entry)
+            cache.set(cache_key, raw, timeout)
+            local_cache.set(cache_key, entry, decoded_size(entry))
+            return entry['data']
+        
+        return None
+    
+    def _refresh_in_background(self, cache_key, endpoint, params, endpoint_name, stale):
+        """Refresh a stale entry on a daemon thread unless one is already running."""
+        with _refreshing_lock:
+            if cache_key in _refreshing:
+                return
+            _refreshing.add(cache_key)
+        
+        def refresh():
+            try:
+                coalescer.fetch(
+                    cache_key,
+                    lambda: self._fetch_and_cache(cache_key, endpoint, params, endpoint_name),
+                    read=self._read_cache,
+                    stale=stale,
+                )
+            except Exception as e:
+                logger.error(f"Background refresh of {cache_key} failed: {str(e)}")
+            finally:
+                with _refreshing_lock:
+                    _refreshing.discard(cache_key)
+        
+        metrics.incr('tmdb.background_refreshes')
+        threading.Thread(target=refresh, daemon=True).start()
+    
+    def _cached_request(self, cache_key, endpoint, params, endpoint_name):
+        """
+        Return a cached TMDb payload, fetching it on a cache miss.
+        
+        Fresh entries are returned as is. Entries past their soft expiry are
+        still returned immediately while a background refresh fetches a new
+        copy (stale-while-revalidate). Concurrent misses for the same key are
+        coalesced so that only one caller, per process and across processes,
+        calls TMDb.
+        
+        Args:
+            cache_key: Cache key for the payload
+            endpoint: API endpoint path
+            params: Query parameters
+            endpoint_name: Key into settings.TMDB_CACHE_TTLS
+        
+        Returns:
+            Response data or None if request fails
+        """
+        entry = self._read_entry(cache_key)
+        
+        if entry:
+            if entry['soft_expires'] > time.time():
+                metrics.incr('tmdb.cache_hits')
+                logger.info(f"Returning cached data for {cache_key}")
+            else:
+                metrics.incr('tmdb.cache_stale_hits')
+                logger.info(f"Returning stale data for {cache_key}")
+                self._refresh_in_background(
+                    cache_key, endpoint, params, endpoint_name, entry['data']
+                )
+            return entry['data']
+        
+        metrics.incr('tmdb.cache_misses')
+        return coalescer.fetch(
+            cache_key,
+            lambda: self._fetch_and_cache(cache_key, endpoint, params, endpoint_name),
+            read=self._read_cache,
+        )
     
     def get_trending_movies(self, time_window='week', page=1):
         """
@@ -57,23 +375,12 @@ class TMDbClient:
         Returns:
             List of trending movies
         """
-        cache_key = f"trending_movies_{time_window}_page_{page}"
-        cached_data = cache.get(cache_key)
-        
-        if cached_data:
-            logger.info(f"Returning cached trending movies for {time_window}")
-            return cached_data
-        
-        endpoint = f"/trending/movie/{time_window}"
-        params = {'page': page}
-        
-        data = self._make_request(endpoint, params)
-        
-        if data:
-            cache.set(cache_key, data, settings.CACHE_TTL)
-            return data
-        
-        return None
+        return self._cached_request(
+            f"trending_movies_{time_window}_page_{page}",
+            f"/trending/movie/{time_window}",
+            {'page': page},
+            'trending',
+        )
     
     def get_recommended_movies(self, movie_id, page=1):
         """
@@ -86,23 +393,12 @@ class TMDbClient:
         Returns:
             List of recommended movies
         """
-        cache_key = f"recommended_movies_{movie_id}_page_{page}"
-        cached_data = cache.get(cache_key)
-        
-        if cached_data:
-            logger.info(f"Returning cached recommendations for movie {movie_id}")
-            return cached_data
-        
-        endpoint = f"/movie/{movie_id}/recommendations"
-        params = {'page': page}
-        
-        data = self._make_request(endpoint, params)
-        
-        if data:
-            cache.set(cache_key, data, settings.CACHE_TTL)
-            return data
-        
-        return None
+        return self._cached_request(
+            f"recommended_movies_{movie_id}_page_{page}",
+            f"/movie/{movie_id}/recommendations",
+            {'page': page},
+            'recommended',
+        )
     
     def get_movie_details(self, movie_id):
         """
@@ -114,22 +410,12 @@ class TMDbClient:
         Returns:
             Movie details
         """
-        cache_key = f"movie_details_{movie_id}"
-        cached_data = cache.get(cache_key)
-        
-        if cached_data:
-            logger.info(f"Returning cached details for movie {movie_id}")
-            return cached_data
-        
-        endpoint = f"/movie/{movie_id}"
-        
-        data = self._make_request(endpoint)
-        
-        if data:
-            cache.set(cache_key, data, settings.CACHE_TTL)
-            return data
-        
-        return None
+        return self._cached_request(
+            f"movie_details_{movie_id}",
+            f"/movie/{movie_id}",
+            None,
+            'details',
+        )
     
     def search_movies(self, query, page=1):
         """
@@ -142,23 +428,12 @@ class TMDbClient:
         Returns:
             Search results
         """
-        cache_key = f"search_movies_{query}_page_{page}"
-        cached_data = cache.get(cache_key)
-        
-        if cached_data:
-            logger.info(f"Returning cached search results for '{query}'")
-            return cached_data
-        
-        endpoint = "/search/movie"
-        params = {'query': query, 'page': page}
-        
-        data = self._make_request(endpoint, params)
-        
-        if data:
-            cache.set(cache_key, data, settings.CACHE_TTL)
-            return data
-        
-        return None
+        return self._cached_request(
+            f"search_movies_{query}_page_{page}",
+            "/search/movie",
+            {'query': query, 'page': page},
+            'search',
+        )
     
     def get_popular_movies(self, page=1):
         """
@@ -170,23 +445,12 @@ class TMDbClient:
         Returns:
             List of popular movies
         """
-        cache_key = f"popular_movies_page_{page}"
-        cached_data = cache.get(cache_key)
-        
-        if cached_data:
-            logger.info(f"Returning cached popular movies")
-            return cached_data
-        
-        endpoint = "/movie/popular"
-        params = {'page': page}
-        
-        data = self._make_request(endpoint, params)
-        
-        if data:
-            cache.set(cache_key, data, settings.CACHE_TTL)
-            return data
-        
-        return None
+        return self._cached_request(
+            f"popular_movies_page_{page}",
+            "/movie/popular",
+            {'page': page},
+            'popular',
+        )
     
     def get_top_rated_movies(self, page=1):
         """
@@ -198,20 +462,9 @@ class TMDbClient:
         Returns:
             List of top-rated movies
         """
-        cache_key = f"top_rated_movies_page_{page}"
-        cached_data = cache.get(cache_key)
-        
-        if cached_data:
-            logger.info(f"Returning cached top-rated movies")
-            return cached_data
-        
-        endpoint = "/movie/top_rated"
-        params = {'page': page}
-        
-        data = self._make_request(endpoint, params)
-        
-        if data:
-            cache.set(cache_key, data, settings.CACHE_TTL)
-            return data
-        
-        return None
+        return self._cached_request(
+            f"top_rated_movies_page_{page}",
+            "/movie/top_rated",
+            {'page': page},
+            'top_rated',
+        )
@@ -1,33 +1,80 @@
-from rest_framework import viewsets, status
+from rest_framework import mixins, viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework.pagination import PageNumberPagination
 from django.shortcuts import get_object_or_404
+from django.conf import settings
+from django.db import transaction
 from django.db.models import Q
 import logging
 
+from utils.pagination import (
+    CursorOptInMixin,
+    EstimatedCountPagination,
+    MovieCursorPagination,
+    PopularityCursorPagination,
+)
+from utils.permissions import IsAdmin
+from . import bulk, metrics
+from .autocomplete import title_index
+from .circuit_breaker import breaker
+from .ingestion import ingest_page
+from .local_cache import local_cache
+from .rating_aggregates import apply_rating_change, lock_summaries
+from .search import search_movies
+from .recommender import get_neighbor_index, rank_for_user
+from .recommender.content import content_store, get_content_index
+from .recommender.store import als_store, neighbor_store
 from .models import Movie, UserFavoriteMovie, MovieRating
 from .serializers import (
+    MovieBatchLookupSerializer,
     MovieSerializer,
     MovieDetailSerializer,
     UserFavoriteMovieSerializer,
     MovieRatingSerializer,
     MovieRatingCreateSerializer
 )
-from .tmdb_client import TMDbClient
+from .tmdb_client import get_tmdb_client
 
 logger = logging.getLogger(__name__)
 
 
-class MoviePagination(PageNumberPagination):
+DEGRADED_HEADER = 'X-Degraded'
+DEGRADED_PAGE_SIZE = 20
+
+
+def page_number(request):
+    """Return the 1-based ?page= value, treating junk as the first page."""
+    try:
+        return max(int(request.query_params.get('page', 1)), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+def bulk_items(data, key):
+    """
+    Return the list under key in a bulk request body.
+    
+    Raises:
+        ValidationError: If it is not a list or holds too many entries
+    """
+    items = data.get(key, []) if hasattr(data, 'get') else None
+    if not isinstance(items, list):
+        raise ValidationError({key: ['Expected a list.']})
+    if len(items) > settings.BULK_WRITE_MAX_ITEMS:
+        raise ValidationError({key: [f'At most {settings.BULK_WRITE_MAX_ITEMS} entries per request.']})
+    return items
+
+
+class MoviePagination(EstimatedCountPagination):
     """Custom pagination for movies."""
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
 
 
-class MovieViewSet(viewsets.ModelViewSet):
+class MovieViewSet(CursorOptInMixin, viewsets.ModelViewSet):
     """
     ViewSet for movie management.
     
@@ -44,22 +91,104 @@ class MovieViewSet(viewsets.ModelViewSet):
     queryset = Movie.objects.all()
     serializer_class = MovieSerializer
     pagination_class = MoviePagination
+    cursor_pagination_class = PopularityCursorPagination
     permission_classes = [IsAuthenticated]
     
     def get_permissions(self):
         """Override permissions based on action."""
-        if self.action in ['list', 'retrieve', 'trending', 'popular', 'top_rated', 'search']:
+        if self.action in ['list', 'retrieve', 'trending', 'popular', 'top_rated', 'search', 'autocomplete', 'batch', 'similar']:
             permission_classes = [AllowAny]
+        elif self.action == 'stats':
+            permission_classes = [IsAdmin]
         else:
             permission_classes = [IsAuthenticated]
         return [permission() for permission in permission_classes]
     
+    def get_queryset(self):
+        """Join rating summaries for the detail view."""
+        queryset = super().get_queryset()
+        if self.action in ('retrieve', 'batch'):
+            queryset = queryset.select_related('rating_summary')
+        return queryset
+    
     def get_serializer_class(self):
         """Return appropriate serializer based on action."""
-        if self.action == 'retrieve':
+        if self.action in ('retrieve', 'batch'):
             return MovieDetailSerializer
         return MovieSerializer
     
+    def degraded_response(self, request, queryset, error):
+        """
+        Serve movies from the local database when TMDb is unavailable.
+        
+        The page mirrors TMDb's 20-result pages and the response carries the
+        X-Degraded header so clients can tell it did not come from TMDb.
+        Returns 503 when there is nothing stored locally either.
+        """
+        page = page_number(request)
+        offset = (page - 1) * DEGRADED_PAGE_SIZE
+        movies = list(queryset[offset:offset + DEGRADED_PAGE_SIZE])
+        if not movies:
+            return Response(
+                {'error': error},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        
+        count = queryset.count()
+        serializer = self.get_serializer(movies, many=True, context={'request': request})
+        response = Response({
+            'count': count,
+            'page': page,
+            'total_pages': (count + DEGRADED_PAGE_SIZE - 1) // DEGRADED_PAGE_SIZE,
+            'results': serializer.data,
+            'degraded': True,
+        })
+        response[DEGRADED_HEADER] = 'tmdb-unavailable'
+        logger.warning(f"Serving degraded {self.action} response from local database")
+        return response
+    
+    def local_search_response(self, request, movies, degraded=False):
+        """
+        Serve a page of ranked local search results in TMDb's page shape.
+        
+        Args:
+            request: Incoming request, read for ?page=
+            movies: Every local match, best first
+            degraded: True when TMDb was needed but unavailable
+        """
+        page = page_number(request)
+        offset = (page - 1) * DEGRADED_PAGE_SIZE
+        serializer = self.get_serializer(
+            movies[offset:offset + DEGRADED_PAGE_SIZE], many=True, context={'request': request}
+        )
+        data = {
+            'count': len(movies),
+            'page': page,
+            'total_pages': (len(movies) + DEGRADED_PAGE_SIZE - 1) // DEGRADED_PAGE_SIZE,
+            'results': serializer.data,
+            'source': 'local',
+        }
+        if not degraded:
+            return Response(data)
+        
+        data['degraded'] = True
+        response = Response(data)
+        response[DEGRADED_HEADER] = 'tmdb-unavailable'
+        logger.warning("Serving degraded search response from local database")
+        return response
+    
+    def tmdb_page_response(self, request, data):
+        """Save a page of TMDb results and return it serialized in TMDb order."""
+        movies = ingest_page(data)
+        
+        serializer = self.get_serializer(movies, many=True, context={'request': request})
+        return Response({
+            'count': data.get('total_results', 0),
+            'page': data.get('page', 1),
+            'total_pages': data.get('total_pages', 1),
+            'results': serializer.data
+        })
+    
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
     def trending(self, request):
         """
@@ -78,130 +207,60 @@ class MovieViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        tmdb_client = TMDbClient()
+        tmdb_client = get_tmdb_client()
         data = tmdb_client.get_trending_movies(time_window, page)
         
         if not data:
-            return Response(
-                {'error': 'Failed to fetch trending movies'},
-                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            return self.degraded_response(
+                request,
+                Movie.objects.order_by('-popularity'),
+                'Failed to fetch trending movies'
             )
         
-        # Save movies to database
-        movies = []
-        for movie_data in data.get('results', []):
-            movie, created = Movie.objects.get_or_create(
-                tmdb_id=movie_data['id'],
-                defaults={
-                    'title': movie_data.get('title', ''),
-                    'overview': movie_data.get('overview', ''),
-                    'release_date': movie_data.get('release_date'),
-                    'poster_path': movie_data.get('poster_path'),
-                    'backdrop_path': movie_data.get('backdrop_path'),
-                    'popularity': movie_data.get('popularity', 0),
-                    'vote_average': movie_data.get('vote_average', 0),
-                    'vote_count': movie_data.get('vote_count', 0),
-                    'original_language': movie_data.get('original_language'),
-                    'genre_ids': movie_data.get('genre_ids', []),
-                }
-            )
-            movies.append(movie)
-        
-        serializer = self.get_serializer(movies, many=True, context={'request': request})
-        return Response({
-            'count': data.get('total_results', 0),
-            'page': data.get('page', 1),
-            'total_pages': data.get('total_pages', 1),
-            'results': serializer.data
-        })
+        return self.tmdb_page_response(request, data)
     
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
     def popular(self, request):
         """Get popular movies."""
         page = request.query_params.get('page', 1)
         
-        tmdb_client = TMDbClient()
+        tmdb_client = get_tmdb_client()
         data = tmdb_client.get_popular_movies(page)
         
         if not data:
-            return Response(
-                {'error': 'Failed to fetch popular movies'},
-                status=status.HTTP_503_SERVICE_UNAVAILABLE
-            )
-        
-        # Save movies to database
-        movies = []
-        for movie_data in data.get('results', []):
-            movie, created = Movie.objects.get_or_create(
-                tmdb_id=movie_data['id'],
-                defaults={
-                    'title': movie_data.get('title', ''),
-                    'overview': movie_data.get('overview', ''),
-                    'release_date': movie_data.get('release_date'),
-                    'poster_path': movie_data.get('poster_path'),
-                    'backdrop_path': movie_data.get('backdrop_path'),
-                    'popularity': movie_data.get('popularity', 0),
-                    'vote_average': movie_data.get('vote_average', 0),
-                    'vote_count': movie_data.get('vote_count', 0),
-                    'original_language': movie_data.get('original_language'),
-                    'genre_ids': movie_data.get('genre_ids', []),
-                }
+            return self.degraded_response(
+                request,
+                Movie.objects.order_by('-popularity'),
+                'Failed to fetch popular movies'
             )
-            movies.append(movie)
         
-        serializer = self.get_serializer(movies, many=True, context={'request': request})
-        return Response({
-            'count': data.get('total_results', 0),
-            'page': data.get('page', 1),
-            'total_pages': data.get('total_pages', 1),
-            'results': serializer.data
-        })
+        return self.tmdb_page_response(request, data)
     
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
     def top_rated(self, request):
         """Get top-rated movies."""
         page = request.query_params.get('page', 1)
         
-        tmdb_client = TMDbClient()
+        tmdb_client = get_tmdb_client()
         data = tmdb_client.get_top_rated_movies(page)
         
         if not data:
-            return Response(
-                {'error': 'Failed to fetch top-rated movies'},
-                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            return self.degraded_response(
+                request,
+                Movie.objects.order_by('-vote_average'),
+                'Failed to fetch top-rated movies'
             )
         
-        # Save movies to database
-        movies = []
-        for movie_data in data.get('results', []):
-            movie, created = Movie.objects.get_or_create(
-                tmdb_id=movie_data['id'],
-                defaults={
-                    'title': movie_data.get('title', ''),
-                    'overview': movie_data.get('overview', ''),
-                    'release_date': movie_data.get('release_date'),
-                    'poster_path': movie_data.get('poster_path'),
-                    'backdrop_path': movie_data.get('backdrop_path'),
-                    'popularity': movie_data.get('popularity', 0),
-                    'vote_average': movie_data.get('vote_average', 0),
-                    'vote_count': movie_data.get('vote_count', 0),
-                    'original_language': movie_data.get('original_language'),
-                    'genre_ids': movie_data.get('genre_ids', []),
-                }
-            )
-            movies.append(movie)
-        
-        serializer = self.get_serializer(movies, many=True, context={'request': request})
-        return Response({
-            'count': data.get('total_results', 0),
-            'page': data.get('page', 1),
-            'total_pages': data.get('total_pages', 1),
-            'results': serializer.data
-        })
+        return self.tmdb_page_response(request, data)
     
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
     def search(self, request):
-        """Search for movies by title."""
+        """
+        Search for movies by title and overview.
+        
+        Answers from the local search index when it has enough matches and
+        asks TMDb otherwise; the response's source field says which.
+        """
         query = request.query_params.get('q', '')
         page = request.query_params.get('page', 1)
         
@@ -211,42 +270,79 @@ class MovieViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        tmdb_client = TMDbClient()
+        local_movies = search_movies(query)
+        if len(local_movies) >= settings.SEARCH_LOCAL_MIN_RESULTS:
+            metrics.incr('search.local')
+            return self.local_search_response(request, local_movies)
+        
+        tmdb_client = get_tmdb_client()
         data = tmdb_client.search_movies(query, page)
         
         if not data:
-            return Response(
-                {'error': 'Failed to search movies'},
-                status=status.HTTP_503_SERVICE_UNAVAILABLE
-            )
-        
-        # Save movies to database
-        movies = []
-        for movie_data in data.get('results', []):
-            if 'id' in movie_data:
-                movie, created = Movie.objects.get_or_create(
-                    tmdb_id=movie_data['id'],
-                    defaults={
-                        'title': movie_data.get('title', ''),
-                        'overview': movie_data.get('overview', ''),
-                        'release_date': movie_data.get('release_date'),
-                        'poster_path': movie_data.get('poster_path'),
-                        'backdrop_path': movie_data.get('backdrop_path'),
-                        'popularity': movie_data.get('popularity', 0),
-                        'vote_average': movie_data.get('vote_average', 0),
-                        'vote_count': movie_data.get('vote_count', 0),
-                        'original_language': movie_data.get('original_language'),
-                        'genre_ids': movie_data.get('genre_ids', []),
-                    }
+            if not local_movies:
+                return Response(
+                    {'error': 'Failed to search movies'},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE
                 )
-                movies.append(movie)
+            return self.local_search_response(request, local_movies, degraded=True)
+        
+        metrics.incr('search.tmdb')
+        response = self.tmdb_page_response(request, data)
+        response.data['source'] = 'tmdb'
+        return response
+    
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    def autocomplete(self, request):
+        """
+        Suggest titles starting with a prefix, most popular first.
+        
+        Served from the worker's in-memory title index, so it is cheap enough
+        to call on every keystroke.
+        """
+        query = request.query_params.get('q', '')
+        try:
+            limit = int(request.query_params.get('limit', settings.AUTOCOMPLETE_LIMIT))
+        except (TypeError, ValueError):
+            limit = settings.AUTOCOMPLETE_LIMIT
+        limit = min(max(limit, 1), settings.AUTOCOMPLETE_MAX_LIMIT)
         
-        serializer = self.get_serializer(movies, many=True, context={'request': request})
         return Response({
-            'count': data.get('total_results', 0),
-            'page': data.get('page', 1),
-            'total_pages': data.get('total_pages', 1),
-            'results': serializer.data
+            'query': query,
+            'results': title_index.search(query, limit),
+        })
+    
+    @action(detail=False, methods=['get', 'post'], permission_classes=[AllowAny])
+    def batch(self, request):
+        """
+        Fetch many stored movies in one request.
+        
+        Takes ids or tmdb_ids, as comma-separated query parameters on GET or
+        JSON lists on POST. Movies, rating summaries and the user's favorite
+        and rating state load in a constant number of queries. results follows
+        the request order with null for IDs that are not stored, and missing
+        lists those IDs.
+        """
+        if request.method == 'GET':
+            data = {
+                key: [value for value in request.query_params[key].split(',') if value.strip()]
+                for key in ('ids', 'tmdb_ids') if key in request.query_params
+            }
+        else:
+            data = request.data
+        lookup = MovieBatchLookupSerializer(data=data)
+        lookup.is_valid(raise_exception=True)
+        field, values = lookup.validated_data['field'], lookup.validated_data['values']
+        
+        movies = list(self.get_queryset().filter(**{f'{field}__in': set(values)}))
+        serialized = self.get_serializer(movies, many=True).data
+        by_key = {
+            getattr(movie, field): item for movie, item in zip(movies, serialized)
+        }
+        
+        return Response({
+            'count': len(by_key),
+            'results': [by_key.get(value) for value in values],
+            'missing': [value for value in dict.fromkeys(values) if value not in by_key],
         })
     
     @action(detail=True, methods=['get'], permission_classes=[AllowAny])
@@ -255,7 +351,7 @@ class MovieViewSet(viewsets.ModelViewSet):
         movie = self.get_object()
         page = request.query_params.get('page', 1)
         
-        tmdb_client = TMDbClient()
+        tmdb_client = get_tmdb_client()
         data = tmdb_client.get_recommended_movies(movie.tmdb_id, page)
         
         if not data:
@@ -264,32 +360,91 @@ class MovieViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_503_SERVICE_UNAVAILABLE
             )
         
-        # Save movies to database
-        movies = []
-        for movie_data in data.get('results', []):
-            recommended_movie, created = Movie.objects.get_or_create(
-                tmdb_id=movie_data['id'],
-                defaults={
-                    'title': movie_data.get('title', ''),
-                    'overview': movie_data.get('overview', ''),
-                    'release_date': movie_data.get('release_date'),
-                    'poster_path': movie_data.get('poster_path'),
-                    'backdrop_path': movie_data.get('backdrop_path'),
-                    'popularity': movie_data.get('popularity', 0),
-                    'vote_average': movie_data.get('vote_average', 0),
-                    'vote_count': movie_data.get('vote_count', 0),
-                    'original_language': movie_data.get('original_language'),
-                    'genre_ids': movie_data.get('genre_ids', []),
-                }
+        return self.tmdb_page_response(request, data)
+    
+    @action(detail=True, methods=['get'], permission_classes=[AllowAny])
+    def similar(self, request, pk=None):
+        """
+        Get movies similar to this one from the local item-item index.
+        
+        Query parameters:
+        - limit: Number of movies (default: 10, max: RECOMMENDER_TOP_K)
+        """
+        movie = self.get_object()
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            return Response(
+                {'error': 'limit must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            movies.append(recommended_movie)
+        limit = max(1, min(limit, settings.RECOMMENDER_TOP_K))
+        
+        index = get_neighbor_index()
+        neighbors = index.neighbors(movie.pk, limit) if index is not None else []
+        source = 'collaborative'
+        
+        if not neighbors:
+            # No rating data for this movie yet: fall back to genres and overview
+            content_index = get_content_index()
+            if content_index is not None:
+                source = 'content'
+                if movie.pk in content_index:
+                    neighbors = content_index.neighbors(movie.pk, limit)
+                else:
+                    neighbors = content_index.similar_to(movie, limit)
+        
+        saved = Movie.objects.in_bulk([movie_id for movie_id, _ in neighbors])
+        ranked = [(saved[movie_id], score) for movie_id, score in neighbors if movie_id in saved]
+        serializer = self.get_serializer(
+            [similar_movie for similar_movie, _ in ranked], many=True, context={'request': request}
+        )
+        results = serializer.data
+        for item, (_, score) in zip(results, ranked):
+            item['similarity'] = round(score, 4)
         
-        serializer = self.get_serializer(movies, many=True, context={'request': request})
         return Response({
-            'count': data.get('total_results', 0),
-            'page': data.get('page', 1),
-            'total_pages': data.get('total_pages', 1),
-            'results': serializer.data
+            'count': len(results),
+            'source': source,
+            'results': results
+        })
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def for_you(self, request):
+        """
+        Get personalized recommendations for the current user.
+        
+        Query parameters:
+        - page: Page number (default: 1)
+        - page_size: Results per page (default: 10)
+        """
+        ranked = self.paginate_queryset(rank_for_user(request.user))
+        
+        saved = Movie.objects.in_bulk([movie_id for movie_id, _ in ranked])
+        ranked = [(saved[movie_id], score) for movie_id, score in ranked if movie_id in saved]
+        serializer = self.get_serializer(
+            [movie for movie, _ in ranked], many=True, context={'request': request}
+        )
+        results = serializer.data
+        for item, (_, score) in zip(results, ranked):
+            item['score'] = round(score, 4)
+        
+        return self.get_paginated_response(results)
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAdmin])
+    def stats(self, request):
+        """Get cache and TMDb client counters for the worker serving this request."""
+        return Response({
+            'counters': metrics.snapshot(),
+            'local_cache': local_cache.stats(),
+            'circuit_breaker': breaker.state,
+            'recommender': {
+                store.name: {
+                    'serving': store.loaded_version(),
+                    'current': store.current_version(),
+                }
+                for store in (neighbor_store, content_store, als_store)
+            },
         })
     
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
@@ -338,11 +493,18 @@ class MovieViewSet(viewsets.ModelViewSet):
         serializer = MovieRatingCreateSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        rating, created = MovieRating.objects.update_or_create(
-            user=request.user,
-            movie=movie,
-            defaults=serializer.validated_data
-        )
+        with transaction.atomic():
+            lock_summaries([movie.pk])
+            previous = MovieRating.objects.select_for_update().filter(
+                user=request.user,
+                movie=movie
+            ).values_list('rating', flat=True).first()
+            rating, created = MovieRating.objects.update_or_create(
+                user=request.user,
+                movie=movie,
+                defaults=serializer.validated_data
+            )
+            apply_rating_change(movie.pk, previous, rating.rating)
         
         response_serializer = MovieRatingSerializer(rating)
         status_code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
@@ -355,8 +517,11 @@ class MovieViewSet(viewsets.ModelViewSet):
         movie = self.get_object()
         
         try:
-            rating = MovieRating.objects.get(user=request.user, movie=movie)
-            rating.delete()
+            with transaction.atomic():
+                lock_summaries([movie.pk])
+                rating = MovieRating.objects.select_for_update().get(user=request.user, movie=movie)
+                rating.delete()
+                apply_rating_change(movie.pk, rating.rating, None)
             return Response(
                 {'message': 'Rating removed'},
                 status=status.HTTP_204_NO_CONTENT
@@ -368,17 +533,39 @@ class MovieViewSet(viewsets.ModelViewSet):
             )
 
 
-class FavoriteMovieViewSet(viewsets.ModelViewSet):
+class FavoriteMovieViewSet(CursorOptInMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing user's favorite movies.
     """
     serializer_class = UserFavoriteMovieSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = MoviePagination
+    cursor_pagination_class = MovieCursorPagination
     
     def get_queryset(self):
         """Return favorite movies for the current user."""
-        return UserFavoriteMovie.objects.filter(user=self.request.user)
+        return UserFavoriteMovie.objects.filter(user=self.request.user).select_related('movie')
+    
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Add and remove many favorites in one request.
+        
+        Body: {"add": [{"movie_id": 1}, {"tmdb_id": 550}], "remove": [...]}.
+        Returns a per-item status (created, removed, unchanged or error) in
+        request order.
+        """
+        add = bulk_items(request.data, 'add')
+        remove = bulk_items(request.data, 'remove')
+        if len(add) + len(remove) > settings.BULK_WRITE_MAX_ITEMS:
+            raise ValidationError(f'At most {settings.BULK_WRITE_MAX_ITEMS} entries per request.')
+        
+        results = bulk.bulk_favorite(request.user, add, remove)
+        return Response({
+            'summary': bulk.summarize(results['add'] + results['remove']),
+            'add': results['add'],
+            'remove': results['remove'],
+        })
     
     @action(detail=False, methods=['get'])
     def my_favorites(self, request):
@@ -393,17 +580,67 @@ class FavoriteMovieViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class MovieRatingViewSet(viewsets.ModelViewSet):
+class MovieRatingViewSet(
+    CursorOptInMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.UpdateModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
     """
     ViewSet for managing movie ratings.
+    
+    New ratings are created through the movie rate action or bulk; updates
+    and deletes here keep the movie's rating summary in step.
     """
     serializer_class = MovieRatingSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = MoviePagination
+    cursor_pagination_class = MovieCursorPagination
     
     def get_queryset(self):
         """Return ratings for the current user."""
-        return MovieRating.objects.filter(user=self.request.user)
+        return MovieRating.objects.filter(user=self.request.user).select_related('movie')
+    
+    def perform_update(self, serializer):
+        """Save the rating and apply the score change to the summary."""
+        movie_id = serializer.instance.movie_id
+        with transaction.atomic():
+            lock_summaries([movie_id])
+            previous = MovieRating.objects.select_for_update().filter(
+                pk=serializer.instance.pk
+            ).values_list('rating', flat=True).first()
+            rating = serializer.save()
+            apply_rating_change(movie_id, previous, rating.rating)
+    
+    def perform_destroy(self, instance):
+        """Delete the rating and remove its score from the summary."""
+        with transaction.atomic():
+            lock_summaries([instance.movie_id])
+            previous = MovieRating.objects.select_for_update().filter(
+                pk=instance.pk
+            ).values_list('rating', flat=True).first()
+            if previous is None:
+                return
+            instance.delete()
+            apply_rating_change(instance.movie_id, previous, None)
+    
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Create or update many ratings in one request.
+        
+        Body: {"ratings": [{"movie_id": 1, "rating": 8, "review": "..."},
+        {"tmdb_id": 550, "rating": 9}]}. Returns a per-item status (created,
+        updated, unchanged or error) in request order.
+        """
+        items = bulk_items(request.data, 'ratings')
+        results = bulk.bulk_rate(request.user, items)
+        return Response({
+            'summary': bulk.summarize(results),
+            'results': results,
+        })
     
     @action(detail=False, methods=['get'])
     def my_ratings(self, request):
@@ -211,6 +211,153 @@ TMDB_API_KEY = os.getenv('TMDB_API_KEY', '')
 TMDB_BASE_URL = os.getenv('TMDB_BASE_URL', 'https://api.themoviedb.org/3')
 TMDB_IMAGE_BASE_URL = 'https://image.tmdb.org/t/p/w500'
 
+# TMDb HTTP connection pool and retry policy
+TMDB_TIMEOUT = float(os.getenv('TMDB_TIMEOUT', 10))
+TMDB_POOL_SIZE = int(os.getenv('TMDB_POOL_SIZE', 10))
+TMDB_MAX_RETRIES = int(os.getenv('TMDB_MAX_RETRIES', 3))
+TMDB_BACKOFF_FACTOR = float(os.getenv('TMDB_BACKOFF_FACTOR', 0.5))
+TMDB_BACKOFF_JITTER = float(os.getenv('TMDB_BACKOFF_JITTER', 0.5))
+TMDB_BACKOFF_MAX = float(os.getenv('TMDB_BACKOFF_MAX', 8))
+TMDB_RETRY_AFTER_MAX = float(os.getenv('TMDB_RETRY_AFTER_MAX', 10))
+# Seconds one request may spend retrying, per rate-limit priority; a retry
+# whose sleep would overrun it is not made. Keep interactive well below the
+# gunicorn worker timeout.
+TMDB_RETRY_BUDGET = {
+    'interactive': float(os.getenv('TMDB_INTERACTIVE_RETRY_BUDGET', 5)),
+    'batch': float(os.getenv('TMDB_BATCH_RETRY_BUDGET', 60)),
+}
+TMDB_ASYNC_CONCURRENCY = int(os.getenv('TMDB_ASYNC_CONCURRENCY', 8))
+
+# Per-endpoint TMDb cache TTLs as (soft_ttl, grace) in seconds. After soft_ttl
+# the stale payload is served while a background refresh runs; entries are
+# dropped only once the grace period has also passed.
+TMDB_SWR_ENABLED = os.getenv('TMDB_SWR_ENABLED', 'True') == 'True'
+TMDB_CACHE_TTLS = {
+    'trending': (CACHE_TTL, 60 * 60 * 6),
+    'popular': (CACHE_TTL, 60 * 60 * 6),
+    'top_rated': (60 * 60, 60 * 60 * 24),
+    'recommended': (60 * 60, 60 * 60 * 24),
+    'details': (60 * 60, 60 * 60 * 24),
+    'search': (CACHE_TTL, 60 * 60),
+}
+
+# Cached TMDb list pages are projected to the fields we use and pickled; with
+# TMDB_CACHE_COMPRESS entries are also zlib-compressed once they reach
+# TMDB_CACHE_COMPRESS_MIN_BYTES. Off by default: it saves Redis memory but
+# makes every decode slower.
+TMDB_CACHE_COMPRESS = os.getenv('TMDB_CACHE_COMPRESS', 'False') == 'True'
+TMDB_CACHE_COMPRESS_MIN_BYTES = int(os.getenv('TMDB_CACHE_COMPRESS_MIN_BYTES', 1024))
+TMDB_CACHE_COMPRESSION_LEVEL = int(os.getenv('TMDB_CACHE_COMPRESSION_LEVEL', 1))
+
+# How long to remember that a cached TMDb page has been written to the DB
+TMDB_INGESTED_PAGE_TTL = int(os.getenv('TMDB_INGESTED_PAGE_TTL', 60 * 60 * 6))
+
+# In-process LRU (L1) in front of the shared cache for hot TMDb payloads
+TMDB_L1_MAX_ENTRIES = int(os.getenv('TMDB_L1_MAX_ENTRIES', 256))
+TMDB_L1_MAX_BYTES = int(os.getenv('TMDB_L1_MAX_BYTES', 16 * 1024 * 1024))
+TMDB_L1_TTL = float(os.getenv('TMDB_L1_TTL', 5))
+TMDB_L1_GENERATION_CHECK_INTERVAL = float(os.getenv('TMDB_L1_GENERATION_CHECK_INTERVAL', 1))
+
+# Shared token bucket for outbound TMDb calls (tokens per second and burst).
+# Batch callers leave TMDB_RATE_LIMIT_BATCH_RESERVE of the burst for
+# interactive requests; callers wait up to MAX_WAIT seconds before being shed.
+TMDB_RATE_LIMIT_ENABLED = os.getenv('TMDB_RATE_LIMIT_ENABLED', 'True') == 'True'
+TMDB_RATE_LIMIT_RATE = float(os.getenv('TMDB_RATE_LIMIT_RATE', 40))
+TMDB_RATE_LIMIT_BURST = float(os.getenv('TMDB_RATE_LIMIT_BURST', 40))
+TMDB_RATE_LIMIT_BATCH_RESERVE = float(os.getenv('TMDB_RATE_LIMIT_BATCH_RESERVE', 0.25))
+TMDB_RATE_LIMIT_MAX_WAIT = {
+    'interactive': 1.0,
+    'batch': 30.0,
+}
+
+# Circuit breaker: open after this many consecutive failed or slow TMDb calls,
+# then let a trial call through after the reset timeout (seconds)
+TMDB_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('TMDB_CIRCUIT_FAILURE_THRESHOLD', 5))
+TMDB_CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv('TMDB_CIRCUIT_SLOW_CALL_SECONDS', 3))
+TMDB_CIRCUIT_RESET_TIMEOUT = float(os.getenv('TMDB_CIRCUIT_RESET_TIMEOUT', 30))
+
+# Single-flight refresh lock for TMDb cache misses (seconds)
+TMDB_LOCK_TIMEOUT = int(os.getenv('TMDB_LOCK_TIMEOUT', 30))
+TMDB_LOCK_WAIT = float(os.getenv('TMDB_LOCK_WAIT', 5))
+TMDB_LOCK_POLL_INTERVAL = float(os.getenv('TMDB_LOCK_POLL_INTERVAL', 0.05))
+
+# Local recommender: artifacts directory, neighbours kept per movie and the
+# interaction weight of a favorite (ratings count as rating / 10)
+RECOMMENDER_DIR = os.getenv('RECOMMENDER_DIR', os.path.join(BASE_DIR, 'var', 'recommender'))
+RECOMMENDER_TOP_K = int(os.getenv('RECOMMENDER_TOP_K', 50))
+RECOMMENDER_FAVORITE_WEIGHT = float(os.getenv('RECOMMENDER_FAVORITE_WEIGHT', 1.0))
+
+# Content index: hashed feature dimensions, weight of genre features relative
+# to overview text, whether newly ingested movies are folded in automatically
+# on a background thread, and how long that thread waits so ingestion bursts
+# share one update (seconds)
+RECOMMENDER_CONTENT_DIM = int(os.getenv('RECOMMENDER_CONTENT_DIM', 2 ** 18))
+RECOMMENDER_CONTENT_GENRE_WEIGHT = float(os.getenv('RECOMMENDER_CONTENT_GENRE_WEIGHT', 1.0))
+RECOMMENDER_CONTENT_AUTO_UPDATE = os.getenv('RECOMMENDER_CONTENT_AUTO_UPDATE', 'True') == 'True'
+RECOMMENDER_CONTENT_UPDATE_DELAY = float(os.getenv('RECOMMENDER_CONTENT_UPDATE_DELAY', 30))
+
+# Model store: versions kept on disk per model and how often workers check
+# for a newly published version (seconds)
+RECOMMENDER_STORE_KEEP_VERSIONS = int(os.getenv('RECOMMENDER_STORE_KEEP_VERSIONS', 3))
+RECOMMENDER_STORE_CHECK_INTERVAL = float(os.getenv('RECOMMENDER_STORE_CHECK_INTERVAL', 5))
+
+# ALS matrix factorization defaults for train_recommender
+RECOMMENDER_ALS_FACTORS = int(os.getenv('RECOMMENDER_ALS_FACTORS', 32))
+RECOMMENDER_ALS_ITERATIONS = int(os.getenv('RECOMMENDER_ALS_ITERATIONS', 10))
+RECOMMENDER_ALS_REGULARIZATION = float(os.getenv('RECOMMENDER_ALS_REGULARIZATION', 0.1))
+
+# IVF approximate nearest-neighbour index over movie vectors: built once a
+# model has at least MIN_ITEMS movies; NPROBE cells are scored per query
+RECOMMENDER_ANN_MIN_ITEMS = int(os.getenv('RECOMMENDER_ANN_MIN_ITEMS', 20000))
+RECOMMENDER_ANN_NPROBE = int(os.getenv('RECOMMENDER_ANN_NPROBE', 8))
+
+# "For you" recommendations: blend of genre affinity, neighbour similarity,
+# ALS factor affinity (zero until train_recommender has run) and popularity,
+# how much history and how many candidates to score, and how long each
+# user's ranked list is cached (seconds)
+RECOMMENDER_FOR_YOU_WEIGHTS = {'genre': 0.3, 'neighbors': 0.35, 'factors': 0.2, 'popularity': 0.15}
+RECOMMENDER_FOR_YOU_HISTORY = int(os.getenv('RECOMMENDER_FOR_YOU_HISTORY', 200))
+RECOMMENDER_FOR_YOU_MAX_RESULTS = int(os.getenv('RECOMMENDER_FOR_YOU_MAX_RESULTS', 200))
+RECOMMENDER_FOR_YOU_TTL = int(os.getenv('RECOMMENDER_FOR_YOU_TTL', 60 * 10))
+
+# Co-occurrence pairs read per "for you" request, how often the
+# update_recommendations loop folds new rating/favorite events and how long
+# folded events are kept before it deletes them (seconds)
+RECOMMENDER_COOCCURRENCE_CANDIDATES = int(os.getenv('RECOMMENDER_COOCCURRENCE_CANDIDATES', 500))
+RECOMMENDER_UPDATE_INTERVAL = float(os.getenv('RECOMMENDER_UPDATE_INTERVAL', 2))
+RECOMMENDER_EVENT_RETENTION = int(os.getenv('RECOMMENDER_EVENT_RETENTION', 60 * 60 * 24 * 7))
+
+# Local full-text search: movie search answers from the database when it has
+# at least SEARCH_LOCAL_MIN_RESULTS matches and only asks TMDb otherwise.
+# SEARCH_POPULARITY_WEIGHT blends log-scaled popularity into text relevance.
+SEARCH_LOCAL_MIN_RESULTS = int(os.getenv('SEARCH_LOCAL_MIN_RESULTS', 5))
+SEARCH_MAX_RESULTS = int(os.getenv('SEARCH_MAX_RESULTS', 200))
+SEARCH_POPULARITY_WEIGHT = float(os.getenv('SEARCH_POPULARITY_WEIGHT', 0.3))
+
+# In-memory title autocomplete: default and maximum results per lookup, how
+# many leading characters get precomputed top hits, how often a worker
+# checks whether another worker ingested movies (seconds), and how long the
+# IDs of each ingestion stay in the cache for other workers to replay
+# (seconds; a worker that misses them rebuilds its index instead)
+AUTOCOMPLETE_LIMIT = int(os.getenv('AUTOCOMPLETE_LIMIT', 10))
+AUTOCOMPLETE_MAX_LIMIT = int(os.getenv('AUTOCOMPLETE_MAX_LIMIT', 25))
+AUTOCOMPLETE_SHORT_PREFIX = int(os.getenv('AUTOCOMPLETE_SHORT_PREFIX', 2))
+AUTOCOMPLETE_CHECK_INTERVAL = float(os.getenv('AUTOCOMPLETE_CHECK_INTERVAL', 30))
+AUTOCOMPLETE_CHANGES_TTL = int(os.getenv('AUTOCOMPLETE_CHANGES_TTL', 60 * 10))
+
+# Paginated counts on PostgreSQL: querysets the planner estimates at or above
+# PAGINATION_ESTIMATE_THRESHOLD rows report that estimate instead of running
+# COUNT(*); smaller ones cache their exact count for PAGINATION_COUNT_CACHE_TTL
+# seconds. Other databases always count exactly.
+PAGINATION_ESTIMATE_THRESHOLD = int(os.getenv('PAGINATION_ESTIMATE_THRESHOLD', 10000))
+PAGINATION_COUNT_CACHE_TTL = int(os.getenv('PAGINATION_COUNT_CACHE_TTL', 30))
+
+# Maximum IDs accepted by the batch movie lookup endpoint
+MOVIE_BATCH_MAX_IDS = int(os.getenv('MOVIE_BATCH_MAX_IDS', 250))
+
+# Maximum entries accepted by the bulk rating and favorite endpoints
+BULK_WRITE_MAX_ITEMS = int(os.getenv('BULK_WRITE_MAX_ITEMS', 500))
+
 # Logging Configuration
 LOGGING = {
     'version': 1,
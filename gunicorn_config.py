@@ -42,3 +42,9 @@ suppress_ragged_eof = True
 
 # Application
 raw_env = []
+
+
+def post_worker_init(worker):
+    """Build the in-memory autocomplete index before the worker takes requests."""
+    from apps.movies.autocomplete import title_index
+    title_index.ensure_current()
@@ -3,8 +3,10 @@ Custom filter classes for the API.
 """
 
 from rest_framework import filters
+from django.db.models import Case, IntegerField, When
 from django_filters import rest_framework as django_filters
 from apps.movies.models import Movie
+from apps.movies.search import search_movie_ids
 
 
 class MovieFilter(django_filters.FilterSet):
@@ -45,6 +47,25 @@ class MovieFilter(django_filters.FilterSet):
 
 
 class MovieSearchFilter(filters.SearchFilter):
-    """Custom search filter for movies."""
+    """
+    Search filter for movies backed by the local full-text index.
+    
+    Matches title and overview through apps.movies.search instead of
+    icontains scans, and orders results by search rank.
+    """
     search_param = 'q'
-    search_fields = ['title', 'overview', 'original_language']
+    
+    def filter_queryset(self, request, queryset, view):
+        query = ' '.join(self.get_search_terms(request))
+        if not query:
+            return queryset
+        
+        ids = search_movie_ids(query)
+        if not ids:
+            return queryset.none()
+        
+        rank = Case(
+            *[When(pk=pk, then=position) for position, pk in enumerate(ids)],
+            output_field=IntegerField(),
+        )
+        return queryset.filter(pk__in=ids).order_by(rank)
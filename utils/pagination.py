@@ -2,8 +2,161 @@
 Custom pagination classes for the API.
 """
 
-from rest_framework.pagination import PageNumberPagination, CursorPagination
+import base64
+import hashlib
+import json
+import logging
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_count(queryset):
+    """
+    Return the PostgreSQL planner's row estimate for queryset, or None.
+    
+    Unfiltered querysets read pg_class.reltuples for the table; filtered
+    ones read the top-level "Plan Rows" from EXPLAIN. Both are maintained
+    by ANALYZE/autovacuum and cost no table scan. Returns None on other
+    backends, for tables that were never analyzed, or if the query fails.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    
+    query = queryset.query
+    unfiltered = (
+        not query.where and not query.distinct and not query.group_by
+        and query.low_mark == 0 and query.high_mark is None
+    )
+    try:
+        with connection.cursor() as cursor:
+            if unfiltered:
+                cursor.execute(
+                    "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+            else:
+                sql, params = queryset.order_by().query.sql_with_params()
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            row = cursor.fetchone()
+    except EmptyResultSet:
+        return None
+    except DatabaseError as e:
+        logger.warning(f"Row estimate failed, using an exact count: {str(e)}")
+        return None
+    
+    if row is None:
+        return None
+    value = row[0]
+    if isinstance(value, str):
+        value = json.loads(value)
+    if isinstance(value, list):
+        value = value[0]['Plan']['Plan Rows']
+    return int(value) if value >= 0 else None
+
+
+def count_cache_key(queryset):
+    sql, params = queryset.order_by().query.sql_with_params()
+    digest = hashlib.blake2b(f"{sql}|{params!r}".encode(), digest_size=16).hexdigest()
+    return f"paginator_count_{queryset.db}_{digest}"
+
+
+class EstimatedCountPage(Page):
+    """Page whose next link does not trust an estimated or cached total."""
+    
+    def has_next(self):
+        if self.paginator.count_may_be_stale:
+            return len(self.object_list) == self.paginator.per_page
+        return super().has_next()
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that avoids exact COUNT(*) on large PostgreSQL querysets.
+    
+    When the planner estimates at least PAGINATION_ESTIMATE_THRESHOLD rows
+    the estimate is used as the count and count_is_estimated is set. Smaller
+    querysets get an exact count cached for PAGINATION_COUNT_CACHE_TTL
+    seconds. Other backends, and plain lists, always get an exact count.
+    Both an estimate and a cached count can lag behind the table, e.g.
+    right after a user adds a favorite, so with either one pages past the
+    counted end are allowed and the next link follows page fullness.
+    """
+    count_is_estimated = False
+    count_is_cached = False
+    
+    @property
+    def count_may_be_stale(self):
+        return self.count_is_estimated or self.count_is_cached
+    
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, 'query'):
+            return super().count
+        
+        estimate = estimate_count(queryset)
+        if estimate is None:
+            return super().count
+        if estimate >= settings.PAGINATION_ESTIMATE_THRESHOLD:
+            self.count_is_estimated = True
+            return estimate
+        
+        key = count_cache_key(queryset)
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, settings.PAGINATION_COUNT_CACHE_TTL)
+        else:
+            self.count_is_cached = True
+        return count
+    
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except InvalidPage:
+            if self.count_may_be_stale and int(number) >= 1:
+                return int(number)
+            raise
+    
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.count_may_be_stale:
+            return super().page(number)
+        # Slice a full page rather than stopping at a count that may be low.
+        bottom = (number - 1) * self.per_page
+        return self._get_page(self.object_list[bottom:bottom + self.per_page], number, self)
+    
+    def _get_page(self, *args, **kwargs):
+        return EstimatedCountPage(*args, **kwargs)
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    """Page-number pagination that reports whether count is an estimate."""
+    django_paginator_class = EstimatedCountPaginator
+    
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['count_is_estimated'] = self.page.paginator.count_is_estimated
+        return response
+    
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_is_estimated'] = {'type': 'boolean'}
+        return response_schema
 
 
 class StandardPagination(PageNumberPagination):
@@ -29,13 +182,172 @@ class SmallPagination(PageNumberPagination):
     max_page_size = 20
 
 
-class MovieCursorPagination(CursorPagination):
-    """Cursor-based pagination for movies."""
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over a unique, composite ordering.
+    
+    The cursor holds the ordering values of the last row served, and the
+    next page is fetched with a row-value comparison such as
+    (created_at, id) < (cursor_created_at, cursor_id) instead of OFFSET,
+    so page cost stays constant however deep the client goes. There is no
+    COUNT(*). The ordering must end with a unique field and its fields must
+    be non-null; back it with a composite index in the same order.
+    """
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
-    ordering = '-created_at'
-    template = 'rest_framework/pagination/numbers.html'
+    cursor_query_param = 'cursor'
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        
+        position, reverse = self.decode_cursor(request, queryset.model)
+        ordering = self.flip(self.ordering) if reverse else self.ordering
+        
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.seek_filter(ordering, position))
+        
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+        
+        if reverse:
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.page = rows
+        return rows
+    
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, TypeError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+    
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+    
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+    
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+    
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+    
+    @staticmethod
+    def flip(ordering):
+        return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+    
+    @staticmethod
+    def seek_filter(ordering, position):
+        """
+        Build the row-value comparison "strictly after position" for ordering.
+        
+        Expands (a, b) < (x, y) into a < x OR (a = x AND b < y), which
+        databases can satisfy with a range scan on an (a, b) index.
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+    
+    def encode_cursor(self, row, reverse):
+        position = []
+        for field in self.ordering:
+            value = getattr(row, field.lstrip('-'))
+            position.append(value.isoformat() if isinstance(value, (date, datetime)) else value)
+        payload = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+    
+    def decode_cursor(self, request, model):
+        """
+        Return (position, reverse) from the request, or (None, False) on the first page.
+        
+        Raises:
+            NotFound: If the cursor is malformed
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            raw = payload['p']
+            if len(raw) != len(self.ordering):
+                raise ValueError(encoded)
+            position = tuple(
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, raw)
+            )
+            return position, bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class MovieCursorPagination(KeysetPagination):
+    """Keyset pagination newest first, for favorites and ratings."""
+    ordering = ('-created_at', '-id')
+
+
+class PopularityCursorPagination(KeysetPagination):
+    """Keyset pagination for movies, most popular first."""
+    ordering = ('-popularity', '-id')
+
+
+class CursorOptInMixin:
+    """
+    ViewSet mixin that switches to keyset pagination on ?pagination=cursor.
+    
+    Page-number pagination (pagination_class) stays the default so existing
+    clients keep count and page links; cursor_pagination_class is used when
+    the client opts in on one of cursor_actions. Other actions, such as
+    those paginating ranked lists rather than querysets, ignore the opt-in.
+    """
+    cursor_pagination_class = MovieCursorPagination
+    cursor_actions = ('list', 'my_favorites', 'my_ratings')
+    pagination_query_param = 'pagination'
+    
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if (
+                getattr(self, 'action', None) in self.cursor_actions
+                and self.request.query_params.get(self.pagination_query_param) == 'cursor'
+            ):
+                self._paginator = self.cursor_pagination_class()
+            else:
+                return super().paginator
+        return self._paginator
 
 
 class CustomPagination(PageNumberPagination):
@@ -43,12 +355,14 @@ class CustomPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
+    django_paginator_class = EstimatedCountPaginator
     
     def get_paginated_response(self, data):
         """Override to provide custom response format."""
         return Response({
             'pagination': {
                 'count': self.page.paginator.count,
+                'count_is_estimated': self.page.paginator.count_is_estimated,
                 'next': self.get_next_link(),
                 'previous': self.get_previous_link(),
                 'page_size': self.page_size,